@@ -3,7 +3,9 @@ from setuptools import setup, find_packages
 setup(
     name="writing-cpec-web-app3",
     version="0.1.0",
-    packages=find_packages(),
+    package_dir={"": "src"},
+    packages=find_packages("src"),
+    py_modules=["cli", "main", "pipeline", "service", "worker"],
     install_requires=[
         "openai>=1.0.0",
         "pytest>=8.0.0", 
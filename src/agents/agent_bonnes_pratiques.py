@@ -1,44 +1,132 @@
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional
 import structlog
-from src.utils.openai_client import OpenAIClient
+from utils.openai_client import OpenAIClient, json_schema_format
+from utils.client_registry import get_openai_client
+from utils.json_stream import JsonItemParser
+from utils.metrics import instrument
+from utils.practices import PracticesCatalog, get_practices_catalog
+from utils.prompts import BEST_PRACTICES, join_items
 
 logger = structlog.get_logger(__name__)
 
+_LISTE = {"type": "array", "items": {"type": "string"}}
+
+# Sortie structurée : la réponse suit ce schéma, ce qui évite les échecs d'analyse
+BEST_PRACTICES_FORMAT = json_schema_format("bonnes_pratiques", {
+    "type": "object",
+    "properties": {
+        "pratiques": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "titre": {"type": "string"},
+                    "description": {"type": "string"},
+                    "technologies": _LISTE,
+                    "domaines": _LISTE,
+                    "tags": _LISTE,
+                    "source": {"type": "string"}
+                },
+                "required": ["titre", "description", "technologies", "domaines", "tags", "source"],
+                "additionalProperties": False
+            }
+        }
+    },
+    "required": ["pratiques"],
+    "additionalProperties": False
+})
+
 class BonnesPratiquesAgent:
-    def __init__(self, client: OpenAIClient = None):
+    def __init__(self, client: OpenAIClient = None, catalog: Optional[PracticesCatalog] = None):
         self.logger = logger.bind(agent="bonnes_pratiques")
-        self.client = client or OpenAIClient()
+        self.client = client or get_openai_client()
+        self._catalog = catalog
 
-    def rechercher(self, spec: Dict) -> List[Dict]:
-        """Recherche des bonnes pratiques correspondant à la spécification"""
-        self.logger.info("Recherche de bonnes pratiques", spec=spec)
-        
-        prompt = f"""
-        En tant qu'expert en bonnes pratiques de développement logiciel, recommande des bonnes pratiques pour :
-        - Technologies : {', '.join(spec['technologies'])}
-        - Domaine : {spec['domaine']}
-        - Contraintes : {', '.join(spec['contraintes']) if spec['contraintes'] else 'Aucune'}
-        
-        Format de réponse attendu (JSON) :
-        {{
-            "pratiques": [
-                {{
-                    "titre": "Titre de la bonne pratique",
-                    "description": "Description détaillée",
-                    "technologies": ["liste", "des", "technologies"],
-                    "domaines": ["liste", "des", "domaines"],
-                    "tags": ["liste", "des", "tags"],
-                    "source": "Source de la bonne pratique"
-                }}
-            ]
-        }}
+    @property
+    def catalog(self) -> PracticesCatalog:
+        """Catalogue local, chargé au premier usage"""
+        if self._catalog is None:
+            self._catalog = get_practices_catalog()
+        return self._catalog
+
+    def rechercher_stream(self, spec: Dict) -> Iterator[Dict]:
+        """
+        Recherche des bonnes pratiques correspondant à la spécification : d'abord
+        celles du catalogue local, puis, pour les technologies qu'il ne couvre pas
+        dans ce domaine, celles générées par le modèle au fil de sa réponse. Ces
+        dernières sont ajoutées au catalogue, sauf celle réparée d'une réponse
+        interrompue, qui peut être incomplète.
         """
-        
-        response = self.client.generate(prompt, model="gpt-4")
+        self.logger.info("Recherche de bonnes pratiques", spec=spec)
+        technologies, domaine, contraintes = spec['technologies'], spec['domaine'], spec['contraintes']
+
+        found = self.catalog.search(technologies, domaine, contraintes)
+        yield from found
+        missing = self.catalog.missing_technologies(technologies, domaine)
+        if found and not missing:
+            self.logger.info("Bonnes pratiques trouvées dans le catalogue", count=len(found))
+            return
+
+        parser = JsonItemParser("pratiques")
+        learned, incomplete = [], 0
+        for pratique in self._generer_stream({**spec, 'technologies': missing or technologies}, parser):
+            if any(pratique is repaired for repaired in parser.repaired):
+                # Pratique réparée d'une réponse interrompue : affichée, mais pas apprise
+                incomplete += 1
+            else:
+                learned.append(pratique)
+            yield pratique
+        added = self.catalog.add(learned, domaine)
+        if added:
+            self.catalog.persist()
+        self.logger.info("Bonnes pratiques trouvées", count=len(found) + len(learned) + incomplete,
+                         catalog_added=added, incomplete=incomplete)
+
+    def _generer_stream(self, spec: Dict, parser: JsonItemParser) -> Iterator[Dict]:
+        """Génère les bonnes pratiques avec le modèle, chacune dès que son objet JSON est complet"""
+        prompt = BEST_PRACTICES.render(
+            technologies=join_items(spec['technologies'], empty="Non précisées"),
+            domaine=spec['domaine'],
+            contraintes=join_items(spec['contraintes'])
+        )
+
         try:
-            resultats = response["pratiques"]
-            self.logger.info("Bonnes pratiques trouvées", count=len(resultats))
-            return resultats
-        except (KeyError, TypeError) as e:
+            chunks = self.client.generate_stream(prompt, response_format=BEST_PRACTICES_FORMAT)
+            yield from parser.items(chunks)
+        except Exception as e:
             self.logger.error("Erreur lors de la récupération des bonnes pratiques", error=str(e))
-            return []
+
+    @instrument
+    def rechercher(self, spec: Dict) -> List[Dict]:
+        """Recherche des bonnes pratiques correspondant à la spécification"""
+        return list(self.rechercher_stream(spec))
+
+    def _criteres(self, spec: Dict) -> Dict:
+        """
+        Critères de recherche tirés de la spécification : technologies et domaine
+        précisés, sinon ceux du vocabulaire du catalogue cités dans le texte.
+        """
+        sections = {section["title"]: section.get("content") or [] for section in spec.get("sections", [])}
+        texte = "\n".join(
+            [spec.get("title") or "", spec.get("description") or ""]
+            + [str(item) for content in sections.values() for item in content]
+        )
+        domaines = self.catalog.mentions("domaines", texte)
+        return {
+            "technologies": spec.get("technologies") or self.catalog.mentions("technologies", texte),
+            "domaine": spec.get("domaine") or (domaines[0] if domaines else "général"),
+            "contraintes": sections.get("Contraintes", [])
+        }
+
+    @instrument
+    def appliquer_bonnes_pratiques(self, spec: Dict) -> Dict:
+        """Renvoie la spécification enrichie des bonnes pratiques applicables"""
+        criteres = self._criteres(spec)
+        if criteres["technologies"]:
+            pratiques = self.rechercher(criteres)
+        else:
+            # Aucune technologie identifiée : le catalogue seul, sans appel au modèle
+            pratiques = self.catalog.search([], criteres["domaine"], criteres["contraintes"])
+        return {**spec, "bonnes_pratiques": pratiques}
+
+AgentBonnesPratiques = BonnesPratiquesAgent
@@ -1,13 +1,111 @@
-from utils.openai_client import OpenAIClient
-from typing import Dict, List, Optional
+from utils.openai_client import OpenAIClient, AsyncOpenAIClient
+from utils.client_registry import get_openai_client, get_async_openai_client
+from utils.metrics import instrument
+from utils.practices import normalize_key
+from utils.prompts import TASKS, serialize_spec
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import hashlib
 import logging
+import os
+import re
 
 logger = logging.getLogger(__name__)
 
+# Nombre maximal d'exigences par prompt : au-delà, la liste de tâches dépasserait la limite de sortie du modèle
+CHUNK_SIZE = 20
+# Nombre maximal de parties générées simultanément
+MAX_WORKERS = 8
+# Tentatives par partie : une partie en échec est relancée une fois
+PART_ATTEMPTS = 2
+
+_TASK = re.compile(r"^\s*[-*]\s+\[[ xX]\]\s+(?P<text>.+)$")
+_CATEGORY = re.compile(r"^##+\s+(?P<title>.+?)\s*$")
+
+
+def _partition(exigences: List[str], chunk_size: int) -> List[List[str]]:
+    """Découpe les exigences en parties de tailles égales, d'au plus chunk_size exigences"""
+    count = -(-len(exigences) // chunk_size)
+    size, extra = divmod(len(exigences), count)
+    chunks, start = [], 0
+    for index in range(count):
+        end = start + size + (index < extra)
+        chunks.append(exigences[start:end])
+        start = end
+    return chunks
+
+
+def _task_hash(text: str) -> bytes:
+    """Empreinte d'une tâche, insensible à la casse, aux accents et à la ponctuation"""
+    normalized = " ".join(re.sub(r"[^\w]+", " ", normalize_key(text)).split())
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest()
+
+
+def fusionner_taches(reponses: List[str]) -> str:
+    """
+    Fusionne les listes de tâches Markdown des différentes parties : les tâches
+    sont regroupées par catégorie (dans l'ordre de première apparition) et les
+    doublons sont éliminés. Les lignes indentées sous une tâche la suivent.
+
+    Returns:
+        La liste de tâches fusionnée au format Markdown
+    """
+    title = None
+    categories: Dict[str, Tuple[str, List[List[str]]]] = {}
+    seen = set()
+    for reponse in reponses:
+        category = categories.setdefault("", ("", []))
+        current = None
+        for line in reponse.splitlines():
+            if not line.strip():
+                continue
+            if line.startswith("# ") and title is None:
+                title = line.strip()
+            elif _CATEGORY.match(line):
+                label = _CATEGORY.match(line).group("title")
+                category = categories.setdefault(normalize_key(label), (label, []))
+                current = None
+            elif _TASK.match(line):
+                digest = _task_hash(_TASK.match(line).group("text"))
+                current = None if digest in seen else [line.rstrip()]
+                if current:
+                    seen.add(digest)
+                    category[1].append(current)
+            elif current and line[:1].isspace():
+                current.append(line.rstrip())
+
+    lines = [title, ""] if title else []
+    for label, tasks in categories.values():
+        if not tasks:
+            continue
+        if label:
+            lines.append(f"## {label}")
+        lines += [line for task in tasks for line in task]
+        lines.append("")
+    return "\n".join(lines).strip()
+
+
 class AgentGenerationTaches:
-    def __init__(self):
-        self.client = OpenAIClient()
-        
+    def __init__(
+        self,
+        client: Optional[OpenAIClient] = None,
+        async_client: Optional[AsyncOpenAIClient] = None,
+        chunk_size: Optional[int] = None,
+        max_workers: Optional[int] = None
+    ):
+        """
+        Args:
+            client: Client OpenAI synchrone
+            async_client: Client OpenAI asynchrone (créé au premier usage si non spécifié)
+            chunk_size: Nombre maximal d'exigences par prompt (LLM_TASKS_CHUNK_SIZE, 20 par défaut)
+            max_workers: Nombre maximal de parties générées simultanément (LLM_TASKS_MAX_WORKERS, 8 par défaut)
+        """
+        self.client = client or get_openai_client()
+        self.async_client = async_client
+        self.chunk_size = chunk_size or int(os.environ.get("LLM_TASKS_CHUNK_SIZE", CHUNK_SIZE))
+        self.max_workers = max_workers or int(os.environ.get("LLM_TASKS_MAX_WORKERS", MAX_WORKERS))
+
     def _valider_specification(self, specification: Dict) -> bool:
         """Valide que la spécification contient les champs requis"""
         required_fields = ['titre', 'description', 'exigences']
@@ -15,23 +113,53 @@ class AgentGenerationTaches:
 
     def _formater_prompt(self, specification: Dict) -> str:
         """Formate le prompt pour la génération des tâches"""
-        return f"""Transforme cette spécification en une liste de tâches Markdown :
-        
-# Titre: {specification['titre']}
-## Description: {specification['description']}
-## Exigences: {', '.join(specification['exigences'])}
+        return TASKS.render(specification=serialize_spec(specification))
+
+    def _parties(self, specification: Dict) -> List[Dict]:
+        """Spécifications partielles : une par partie des exigences"""
+        exigences = specification['exigences'] or []
+        if isinstance(exigences, str):
+            exigences = exigences.splitlines()
+        exigences = [e for e in exigences if str(e).strip()]
+        if len(exigences) <= self.chunk_size:
+            return [specification]
+        return [{**specification, 'exigences': chunk} for chunk in _partition(exigences, self.chunk_size)]
 
-Génère une liste de tâches Markdown avec des cases à cocher, organisée par catégories.
-Chaque tâche doit être spécifique, mesurable et réalisable.
-Utilise ce format :
+    def _fusionner(self, parties: List[Dict], reponses: List[Optional[str]]) -> Optional[str]:
+        """
+        Fusionne les listes de tâches des parties. Les exigences des parties restées
+        en échec sont signalées à la fin de la liste, pour que l'évaluation en tienne compte.
+        """
+        valides = [reponse for reponse in reponses if reponse]
+        if not valides:
+            return None
+        manquantes, debut = [], 1
+        for partie, reponse in zip(parties, reponses):
+            fin = debut + len(partie['exigences']) - 1
+            if not reponse:
+                manquantes.append(f"- Tâches manquantes pour les exigences {debut}–{fin} (génération en échec)")
+            debut = fin + 1
+        taches = fusionner_taches(valides)
+        if manquantes:
+            logger.warning(f"{len(manquantes)} partie(s) sur {len(reponses)} sans tâches")
+            taches += "\n\n## Tâches manquantes\n" + "\n".join(manquantes)
+        return taches
 
-## [Catégorie]
-- [ ] Tâche 1
-- [ ] Tâche 2
-"""
+    def _generer_partie(self, specification: Dict) -> Optional[str]:
+        for tentative in range(1, PART_ATTEMPTS + 1):
+            try:
+                return self.client.generate(self._formater_prompt(specification))
+            except Exception as e:
+                logger.error(f"Erreur lors de la génération d'une partie des tâches "
+                             f"(tentative {tentative}/{PART_ATTEMPTS}) : {str(e)}")
+        return None
 
+    @instrument
     def generer_taches(self, specification: Dict) -> Optional[str]:
-        """Génère une liste de tâches à partir d'une spécification
+        """Génère une liste de tâches à partir d'une spécification.
+
+        Au-delà de chunk_size exigences, les exigences sont réparties en parties
+        générées simultanément, puis les listes sont fusionnées par catégorie.
         
         Args:
             specification: Dictionnaire contenant les informations de spécification
@@ -47,8 +175,13 @@ Utilise ce format :
                 logger.error("Spécification invalide : champs manquants")
                 return None
                 
-            prompt = self._formater_prompt(specification)
-            response = self.client.generate(prompt)
+            parties = self._parties(specification)
+            if len(parties) == 1:
+                response = self.client.generate(self._formater_prompt(specification))
+            else:
+                logger.info(f"Génération des tâches en {len(parties)} parties")
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(parties))) as pool:
+                    response = self._fusionner(parties, list(pool.map(self._generer_partie, parties)))
             
             if not response:
                 logger.error("Erreur lors de la génération des tâches")
@@ -59,3 +192,43 @@ Utilise ce format :
         except Exception as e:
             logger.error(f"Erreur dans generer_taches : {str(e)}")
             return None
+
+    @instrument
+    async def agenerer_taches(self, specification: Dict) -> Optional[str]:
+        """Version asynchrone de generer_taches, basée sur AsyncOpenAIClient.agenerate"""
+        try:
+            if not self._valider_specification(specification):
+                logger.error("Spécification invalide : champs manquants")
+                return None
+
+            if self.async_client is None:
+                self.async_client = get_async_openai_client()
+
+            parties = self._parties(specification)
+            if len(parties) == 1:
+                response = await self.async_client.agenerate(self._formater_prompt(specification))
+            else:
+                logger.info(f"Génération des tâches en {len(parties)} parties")
+                semaphore = asyncio.Semaphore(self.max_workers)
+
+                async def generer_partie(partie: Dict) -> Optional[str]:
+                    async with semaphore:
+                        for tentative in range(1, PART_ATTEMPTS + 1):
+                            try:
+                                return await self.async_client.agenerate(self._formater_prompt(partie))
+                            except Exception as e:
+                                logger.error(f"Erreur lors de la génération d'une partie des tâches "
+                                             f"(tentative {tentative}/{PART_ATTEMPTS}) : {str(e)}")
+                        return None
+
+                response = self._fusionner(parties, await asyncio.gather(*(generer_partie(p) for p in parties)))
+
+            if not response:
+                logger.error("Erreur lors de la génération des tâches")
+                return None
+
+            return response
+
+        except Exception as e:
+            logger.error(f"Erreur dans agenerer_taches : {str(e)}")
+            return None
@@ -2,6 +2,10 @@ from typing import Dict, List
 from dataclasses import dataclass
 import structlog
 from utils.openai_client import OpenAIClient
+from utils.client_registry import get_openai_client
+from utils.metrics import instrument
+from utils.prompts import STRUCTURATION, serialize_spec
+from utils.spec_metrics import analyze, analyze_batch
 
 logger = structlog.get_logger(__name__)
 
@@ -15,34 +19,58 @@ class Specification:
 class StructurationAgent:
     def __init__(self, client: OpenAIClient = None):
         self.logger = logger.bind(agent="structuration")
-        self.client = client or OpenAIClient(model="gpt-4o-mini")
+        self.client = client or get_openai_client("gpt-4o-mini")
         
+    @instrument
     def analyze_specification(self, spec: Specification) -> Dict:
-        """Analyse une spécification technique et retourne un rapport structuré"""
+        """Analyse une spécification technique et retourne un rapport structuré.
+        Les métriques sont calculées localement ; seul le modèle propose les recommandations"""
         self.logger.info("Analyzing specification", title=spec.title)
-        
-        prompt = f"""
-        Analyse cette spécification technique et génère un rapport structuré :
-        Titre : {spec.title}
-        Description : {spec.description}
-        Exigences : {', '.join(spec.requirements)}
-        Contraintes : {', '.join(spec.constraints)}
-        
-        Format de réponse attendu (JSON) :
-        {{
-            "title": "Titre de la spécification",
-            "quality_score": "Score de qualité entre 0 et 1",
-            "requirements_analysis": {{
-                "count": "Nombre d'exigences",
-                "specificity": "Niveau de spécificité (basé sur la présence de chiffres)"
-            }},
-            "constraints_analysis": {{
-                "count": "Nombre de contraintes",
-                "has_legal": "Présence de contraintes légales"
-            }},
-            "recommendations": ["Liste des recommandations d'amélioration"]
-        }}
-        """
-        
+        metrics = analyze(spec.description, spec.requirements, spec.constraints)
+
+        prompt = STRUCTURATION.render(specification=serialize_spec({
+            "title": spec.title,
+            "description": spec.description,
+            "exigences": spec.requirements,
+            "contraintes": spec.constraints
+        }))
         response = self.client.generate(prompt)
-        return response
+        return {"title": spec.title, **metrics, "recommendations": self._parse_recommendations(response)}
+
+    @instrument
+    def analyze_batch(self, specs: List[Specification]) -> List[Dict]:
+        """Calcule les métriques d'un lot de spécifications, sans appel au modèle"""
+        metrics = analyze_batch([(spec.description, spec.requirements, spec.constraints) for spec in specs])
+        return [{"title": spec.title, **spec_metrics} for spec, spec_metrics in zip(specs, metrics)]
+
+    def _calculate_quality_score(self, description: str) -> float:
+        """Score de qualité de la description, entre 0 et 1"""
+        return analyze(description, [], [])["quality_score"]
+
+    def _analyze_requirements(self, requirements: List[str]) -> Dict:
+        """Nombre d'exigences et présence de valeurs chiffrées"""
+        return analyze("", requirements, [])["requirements_analysis"]
+
+    def _analyze_constraints(self, constraints: List[str]) -> Dict:
+        """Nombre de contraintes et présence de contraintes légales"""
+        return analyze("", [], constraints)["constraints_analysis"]
+
+    def _parse_recommendations(self, response: str) -> List[str]:
+        """Extrait les recommandations de la réponse du modèle, une par ligne"""
+        lines = (line.strip().lstrip("-*•").strip() for line in (response or "").splitlines())
+        return [line for line in lines if line]
+
+    @instrument
+    def structurer(self, spec: Dict) -> Dict:
+        """Analyse une spécification issue du formulaire (titre, description, sections)
+        et la renvoie enrichie de son analyse"""
+        sections = {section["title"]: section.get("content") or [] for section in spec.get("sections", [])}
+        analysis = self.analyze_specification(Specification(
+            title=spec.get("title", ""),
+            description=spec.get("description", ""),
+            requirements=sections.get("Exigences", []),
+            constraints=sections.get("Contraintes", [])
+        ))
+        return {**spec, "analysis": analysis}
+
+AgentStructuration = StructurationAgent
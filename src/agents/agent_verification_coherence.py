@@ -1,10 +1,15 @@
 from typing import List, Dict, Optional
-from src.utils.openai_client import OpenAIClient
+from utils.openai_client import OpenAIClient
+from utils.client_registry import get_openai_client
+from utils.coherence_rules import check_specification
+from utils.metrics import instrument
+from utils.prompts import COHERENCE, serialize_spec
 
 class AgentVerificationCoherence:
     def __init__(self, client: Optional[OpenAIClient] = None):
-        self.client = client if client is not None else OpenAIClient()
+        self.client = client if client is not None else get_openai_client()
         
+    @instrument
     def verify_coherence(self, specification: Dict) -> List[str]:
         """Vérifie la cohérence de la spécification complète"""
         if not specification:
@@ -15,10 +20,15 @@ class AgentVerificationCoherence:
         if basic_errors:
             return basic_errors
             
-        # Analyse approfondie avec Claude
-        prompt = self._create_coherence_prompt(specification)
+        # Règles locales : les défauts triviaux sont signalés sans appel au fournisseur
+        report = check_specification(specification)
+        if not report.passed_sections:
+            return report.findings
+
+        # Analyse approfondie des seules sections qui ont passé les règles locales
+        prompt = self._create_coherence_prompt({**specification, "sections": report.passed_sections})
         response = self.client.generate(prompt)
-        return self._parse_coherence_response(response)
+        return report.findings + self._parse_coherence_response(response)
 
     def _check_basic_structure(self, spec: Dict) -> List[str]:
         """Vérifie la structure minimale requise"""
@@ -31,13 +41,7 @@ class AgentVerificationCoherence:
 
     def _create_coherence_prompt(self, spec: Dict) -> str:
         """Crée le prompt pour l'analyse de cohérence"""
-        return f"""Analysez cette spécification et identifiez les incohérences :
-{spec}
-
-Listez les incohérences trouvées avec des suggestions de correction, en suivant ce format :
-- Incohérence : [description]
-  Suggestion : [correction proposée]
-"""
+        return COHERENCE.render(specification=serialize_spec(spec))
 
     def _parse_coherence_response(self, response: str) -> List[str]:
         """Parse la réponse de Claude en liste d'incohérences"""
@@ -0,0 +1,158 @@
+import asyncio
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+@dataclass
+class Stage:
+    """Étape du pipeline : un appel d'agent avec ses entrées et sa sortie nommées"""
+    name: str
+    func: Callable[..., Any]
+    inputs: List[str]
+    output: str
+    async_func: Optional[Callable[..., Awaitable[Any]]] = None
+    optional: bool = False
+
+@dataclass
+class OrchestrationResult:
+    outputs: Dict[str, Any]
+    durations: Dict[str, float] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    reused: List[str] = field(default_factory=list)
+
+class Orchestrator:
+    """
+    Exécute un graphe de dépendances d'agents : chaque étape démarre dès que
+    toutes ses entrées sont disponibles, les étapes indépendantes s'exécutent
+    en parallèle. La latence totale est celle du chemin critique.
+    """
+
+    def __init__(self, stages: List[Stage], max_workers: Optional[int] = None):
+        self.stages = stages
+        self.max_workers = max_workers or len(stages) or 1
+        self.logger = logger.bind(component="orchestrator")
+        self._check_graph()
+
+    def _check_graph(self) -> None:
+        """Vérifie l'unicité des sorties et l'absence de cycle"""
+        producers = {}
+        for stage in self.stages:
+            if stage.output in producers:
+                raise ValueError(f"Sortie '{stage.output}' produite par plusieurs étapes")
+            producers[stage.output] = stage.name
+
+        visiting, visited = set(), set()
+        by_name = {stage.name: stage for stage in self.stages}
+
+        def visit(name: str) -> None:
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Cycle détecté dans le pipeline autour de l'étape '{name}'")
+            visiting.add(name)
+            for key in by_name[name].inputs:
+                if key in producers:
+                    visit(producers[key])
+            visiting.discard(name)
+            visited.add(name)
+
+        for stage in self.stages:
+            visit(stage.name)
+
+    def _start(self, context: Dict[str, Any]) -> Tuple[OrchestrationResult, Dict[str, Stage]]:
+        """Résultat initial et étapes à exécuter : celles dont la sortie est déjà fournie sont sautées"""
+        result = OrchestrationResult(outputs=dict(context))
+        pending = {}
+        for stage in self.stages:
+            if stage.output in context:
+                result.reused.append(stage.name)
+            else:
+                pending[stage.name] = stage
+        return result, pending
+
+    def _ready(self, pending: Dict[str, Stage], available: Dict[str, Any]) -> List[Stage]:
+        return [stage for stage in pending.values() if all(key in available for key in stage.inputs)]
+
+    def _record(self, result: OrchestrationResult, stage: Stage, value: Any, error: Optional[BaseException], started: float) -> None:
+        result.durations[stage.name] = time.perf_counter() - started
+        if error is None:
+            result.outputs[stage.output] = value
+            return
+        if not stage.optional:
+            raise error
+        self.logger.warning("Étape optionnelle en échec", stage=stage.name, error=str(error))
+        result.errors[stage.name] = str(error)
+        result.outputs[stage.output] = None
+
+    def run(self, context: Dict[str, Any]) -> OrchestrationResult:
+        """
+        Exécute le pipeline avec un pool de threads.
+
+        Args:
+            context: Valeurs initiales disponibles pour les étapes (ex. la spécification) ;
+                une étape dont la sortie y figure déjà n'est pas exécutée
+
+        Returns:
+            Les sorties de toutes les étapes, leurs durées et les erreurs des étapes optionnelles
+
+        Raises:
+            ValueError: Si une entrée n'est produite par aucune étape
+            Exception: La première erreur d'une étape non optionnelle
+        """
+        result, pending = self._start(context)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            running = {}
+            while pending or running:
+                for stage in self._ready(pending, result.outputs):
+                    del pending[stage.name]
+                    kwargs = {key: result.outputs[key] for key in stage.inputs}
+                    running[pool.submit(stage.func, **kwargs)] = (stage, time.perf_counter())
+
+                if not running:
+                    raise ValueError(f"Entrées manquantes pour les étapes : {', '.join(pending)}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, started = running.pop(future)
+                    error = future.exception()
+                    self._record(result, stage, None if error else future.result(), error, started)
+
+        return result
+
+    async def arun(self, context: Dict[str, Any]) -> OrchestrationResult:
+        """
+        Version asynchrone de run : les étapes dotées d'une async_func sont
+        attendues directement, les autres sont déléguées à un thread.
+        """
+        result, pending = self._start(context)
+        running = {}
+
+        try:
+            while pending or running:
+                for stage in self._ready(pending, result.outputs):
+                    del pending[stage.name]
+                    kwargs = {key: result.outputs[key] for key in stage.inputs}
+                    if stage.async_func is not None:
+                        coro = stage.async_func(**kwargs)
+                    else:
+                        coro = asyncio.to_thread(stage.func, **kwargs)
+                    running[asyncio.ensure_future(coro)] = (stage, time.perf_counter())
+
+                if not running:
+                    raise ValueError(f"Entrées manquantes pour les étapes : {', '.join(pending)}")
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    stage, started = running.pop(task)
+                    error = task.exception()
+                    self._record(result, stage, None if error else task.result(), error, started)
+        finally:
+            for task in running:
+                task.cancel()
+
+        return result
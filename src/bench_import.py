@@ -0,0 +1,64 @@
+"""
+Mesure du temps d'import à froid des modules de l'application.
+
+Usage :
+    python src/bench_import.py
+    python src/bench_import.py main pipeline --runs 10
+
+Chaque mesure est faite dans un nouvel interpréteur, sans clé d'API, comme au
+démarrage d'un réplica. Le rapport donne le temps médian d'import et les
+dépendances lourdes (SDK, gradio) chargées par l'import.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+HEAVY_MODULES = ("gradio", "openai", "anthropic", "httpx")
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def measure(module: str, runs: int = 5) -> Dict:
+    """
+    Importe `module` dans `runs` interpréteurs neufs.
+
+    Returns:
+        Le temps médian (median), le minimum (min) et les dépendances lourdes chargées (loaded)
+    """
+    env = {key: value for key, value in os.environ.items() if not key.endswith("_API_KEY")}
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [SRC_DIR, env.get("PYTHONPATH")]))
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True, text=True, env=env, check=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    durations = [result["seconds"] for result in results]
+    return {"median": statistics.median(durations), "min": min(durations), "loaded": results[-1]["loaded"]}
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Temps d'import à froid des modules")
+    parser.add_argument("modules", nargs="*", default=["main", "pipeline", "cli"], help="Modules à importer")
+    parser.add_argument("--runs", type=int, default=5, help="Nombre d'interpréteurs par module")
+    args = parser.parse_args(argv)
+
+    for module in args.modules:
+        result = measure(module, max(1, args.runs))
+        loaded = ", ".join(result["loaded"]) or "aucune"
+        print(f"{module:<12} médiane {result['median'] * 1000:7.1f} ms   min {result['min'] * 1000:7.1f} ms   "
+              f"dépendances lourdes : {loaded}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""
+Évaluation en masse de spécifications, sans interface Gradio.
+
+Usage :
+    python src/cli.py specs.jsonl resultats.jsonl --concurrency 8
+    python src/cli.py archives/ resultats.jsonl --resume
+
+Chaque spécification (ligne JSONL ou fichier .json) contient les champs
+title, description, requirements, constraints et optionnellement id et
+model_choice. Les résultats sont ajoutés au fichier de sortie au fil de
+l'eau, ce qui permet de reprendre un traitement interrompu avec --resume :
+les spécifications réussies sont ignorées, celles en échec sont réévaluées
+(le dernier résultat d'un identifiant fait foi).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterator, Set, Tuple, Union
+
+import structlog
+from dotenv import load_dotenv
+
+from pipeline import SpecificationProcessor
+from utils.client_registry import get_registry
+from utils.logging_config import configure_logging
+
+logger = structlog.get_logger(__name__)
+
+@dataclass
+class BulkSummary:
+    processed: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+    def format(self) -> str:
+        return (
+            f"{self.processed} spécification(s) traitée(s) en {self.elapsed:.1f} s "
+            f"({self.throughput:.2f}/s) : {self.succeeded} succès, {self.failed} échec(s), "
+            f"{self.skipped} déjà traitée(s)"
+        )
+
+@dataclass
+class UnreadableSpecification:
+    """Entrée illisible de la source (JSON invalide, fichier inaccessible) : consignée en erreur sans évaluation"""
+    error: str
+
+def _parse_spec(text: str) -> Union[Dict, UnreadableSpecification]:
+    try:
+        spec = json.loads(text)
+    except ValueError as e:
+        return UnreadableSpecification(f"JSON invalide : {e}")
+    if not isinstance(spec, dict):
+        return UnreadableSpecification("La spécification n'est pas un objet JSON")
+    return spec
+
+def _iter_jsonl(path: str) -> Iterator[Tuple[str, Union[Dict, UnreadableSpecification]]]:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            spec = _parse_spec(line)
+            default_id = f"{os.path.basename(path)}:{line_number}"
+            if isinstance(spec, UnreadableSpecification):
+                yield default_id, spec
+            else:
+                yield str(spec.get("id") or default_id), spec
+
+def iter_specifications(source: str) -> Iterator[Tuple[str, Union[Dict, UnreadableSpecification]]]:
+    """
+    Parcourt paresseusement les spécifications d'un fichier JSONL ou d'un répertoire
+    (fichiers .json et .jsonl, par ordre alphabétique).
+
+    Yields:
+        (identifiant, spécification), ou UnreadableSpecification à la place d'une
+        ligne ou d'un fichier illisible : une entrée corrompue n'interrompt pas le lot
+    """
+    if not os.path.isdir(source):
+        yield from _iter_jsonl(source)
+        return
+
+    for name in sorted(os.listdir(source)):
+        path = os.path.join(source, name)
+        if name.endswith(".jsonl"):
+            yield from _iter_jsonl(path)
+        elif name.endswith(".json"):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    spec = _parse_spec(f.read())
+            except (OSError, UnicodeDecodeError) as e:
+                spec = UnreadableSpecification(f"Fichier illisible : {e}")
+            if isinstance(spec, UnreadableSpecification):
+                yield name, spec
+            else:
+                yield str(spec.get("id") or name), spec
+
+def load_done_ids(output: str) -> Set[str]:
+    """
+    Renvoie les identifiants déjà évalués avec succès dans le fichier de résultats
+    (lignes tronquées et résultats en échec ignorés : ces derniers sont réévalués)
+    """
+    done = set()
+    if not os.path.exists(output):
+        return done
+    with open(output, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and record.get("status") == "ok" and "id" in record:
+                done.add(record["id"])
+    return done
+
+def truncate_partial_line(output: str) -> None:
+    """Retire la dernière ligne du fichier si elle est incomplète (arrêt brutal pendant l'écriture)"""
+    if not os.path.exists(output):
+        return
+    with open(output, "r+b") as f:
+        size = f.seek(0, os.SEEK_END)
+        position = size
+        while position > 0:
+            step = min(4096, position)
+            f.seek(position - step)
+            block = f.read(step)
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                position = position - step + newline + 1
+                break
+            position -= step
+        if position < size:
+            logger.warning("Ligne incomplète retirée du fichier de résultats", output=output, bytes=size - position)
+            f.truncate(position)
+
+async def _evaluate_one(processor: SpecificationProcessor, spec_id: str, spec: Dict) -> Dict:
+    started = time.perf_counter()
+    try:
+        result = await processor.arun(
+            spec.get("title"),
+            spec.get("description"),
+            spec.get("requirements"),
+            spec.get("constraints"),
+            spec.get("model_choice", "anthropic")
+        )
+        record = {"id": spec_id, "status": "ok", "result": result}
+    except Exception as e:
+        logger.error("Échec de l'évaluation", spec_id=spec_id, error=str(e))
+        record = {"id": spec_id, "status": "error", "error": str(e)}
+    record["duration"] = round(time.perf_counter() - started, 3)
+    return record
+
+async def run_bulk(
+    processor: SpecificationProcessor,
+    specs: Iterator[Tuple[str, Union[Dict, UnreadableSpecification]]],
+    output: str,
+    concurrency: int = 4,
+    resume: bool = False
+) -> BulkSummary:
+    """
+    Évalue les spécifications avec au plus `concurrency` évaluations en cours.
+    Les spécifications sont lues au fur et à mesure et chaque résultat est
+    écrit (et vidé sur disque) dès qu'il est disponible.
+    """
+    summary = BulkSummary()
+    done_ids = set()
+    if resume:
+        # Sans cela, le premier résultat ajouté serait collé à la ligne tronquée
+        truncate_partial_line(output)
+        done_ids = load_done_ids(output)
+    started = time.perf_counter()
+    in_flight = set()
+
+    with open(output, "a" if resume else "w", encoding="utf-8") as out:
+        def write_record(record: Dict) -> None:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            summary.processed += 1
+            if record["status"] == "ok":
+                summary.succeeded += 1
+            else:
+                summary.failed += 1
+
+        def write(tasks) -> None:
+            for task in tasks:
+                write_record(task.result())
+            out.flush()
+
+        for spec_id, spec in specs:
+            if spec_id in done_ids:
+                summary.skipped += 1
+                continue
+            if isinstance(spec, UnreadableSpecification):
+                logger.error("Spécification illisible", spec_id=spec_id, error=spec.error)
+                write_record({"id": spec_id, "status": "error", "error": spec.error})
+                out.flush()
+                continue
+            if len(in_flight) >= concurrency:
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                write(done)
+            in_flight.add(asyncio.ensure_future(_evaluate_one(processor, spec_id, spec)))
+
+        if in_flight:
+            done, _ = await asyncio.wait(in_flight)
+            write(done)
+
+    summary.elapsed = time.perf_counter() - started
+    return summary
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Évaluation en masse de spécifications")
+    parser.add_argument("source", help="Fichier JSONL ou répertoire de spécifications")
+    parser.add_argument("output", help="Fichier JSONL de résultats")
+    parser.add_argument("--concurrency", type=int, default=4, help="Nombre d'évaluations simultanées")
+    parser.add_argument("--resume", action="store_true",
+                        help="Reprendre en ignorant les spécifications déjà évaluées avec succès")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    configure_logging()
+
+    registry = get_registry()
+    processor = SpecificationProcessor(
+        anthropic_client=registry.anthropic(),
+        openai_client=registry.openai(),
+        async_anthropic_client=registry.async_anthropic(),
+        async_openai_client=registry.async_openai()
+    )
+
+    summary = asyncio.run(run_bulk(
+        processor,
+        iter_specifications(args.source),
+        args.output,
+        concurrency=max(1, args.concurrency),
+        resume=args.resume
+    ))
+    print(summary.format())
+    return 1 if summary.failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
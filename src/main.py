@@ -1,200 +1,302 @@
-import gradio as gr
-import logging
-from utils.anthropic_client import AnthropicClient
-from utils.openai_client import OpenAIClient
-from agents.agent_generation_taches import AgentGenerationTaches
+"""
+Interface Gradio de l'évaluateur de spécifications.
+
+L'import du module est léger : gradio n'est importé qu'à la construction de
+l'interface (build_interface, ou l'attribut `demo`), et les clients des
+fournisseurs ne sont créés qu'au premier traitement (get_processor). Une clé
+d'API manquante n'empêche donc pas l'import, seulement le premier appel.
+"""
+import asyncio
+import math
+import threading
+from typing import AsyncIterator, Iterator, Optional, Tuple
+from utils.admission import AdmissionRejected, get_admission_controller
+from utils.cache import get_default_cache
+from utils.client_registry import get_registry
+from utils.jobs import DONE, FAILED, JobNotFound, get_job_queue
+from utils.validator import SpecificationValidator
+from utils.logging_config import configure_logging
+from utils.metrics import format_gauges, get_metrics, start_metrics_server
+from pipeline import FASTEST, SessionMemo, SpecificationProcessor, _format_validation_errors
 import structlog
 from dotenv import load_dotenv
 import os
 
-# Charger les variables d'environnement
-load_dotenv()
-
-# Configuration du logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
-structlog.configure(
-    processors=[
-        structlog.stdlib.filter_by_level,
-        structlog.stdlib.add_logger_name,
-        structlog.stdlib.add_log_level,
-        structlog.stdlib.PositionalArgumentsFormatter(),
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.StackInfoRenderer(),
-        structlog.processors.format_exc_info,
-        structlog.processors.JSONRenderer()
-    ],
-    context_class=dict,
-    logger_factory=structlog.stdlib.LoggerFactory(),
-    wrapper_class=structlog.stdlib.BoundLogger,
-    cache_logger_on_first_use=True,
-)
-
 logger = structlog.get_logger()
 
-# Initialisation des clients
-try:
-    anthropic_client = AnthropicClient()
-    openai_client = OpenAIClient()
-    logger.info("Clients initialisés avec succès")
-except Exception as e:
-    logger.error("Erreur lors de l'initialisation des clients", error=str(e))
-    raise
+_processor: Optional[SpecificationProcessor] = None
+_processor_lock = threading.Lock()
+_demo = None
+
+def get_processor() -> SpecificationProcessor:
+    """Renvoie le processeur partagé, créé au premier appel avec les clients du registre."""
+    global _processor
+    with _processor_lock:
+        if _processor is None:
+            # Charger les variables d'environnement
+            load_dotenv()
+            # Initialisation des clients partagés (un pool de connexions par fournisseur)
+            try:
+                registry = get_registry()
+                _processor = SpecificationProcessor(
+                    anthropic_client=registry.anthropic(),
+                    openai_client=registry.openai(),
+                    async_anthropic_client=registry.async_anthropic(),
+                    async_openai_client=registry.async_openai()
+                )
+                logger.info("Clients initialisés avec succès")
+            except Exception as e:
+                logger.error("Erreur lors de l'initialisation des clients", error=str(e))
+                raise
+        return _processor
+
+def _session_id(session: Optional[SessionMemo]) -> Optional[str]:
+    return session.id if session is not None else None
+
+def _format_rejection(e: AdmissionRejected) -> str:
+    """Message de refus affiché à la place du rapport."""
+    return (
+        f"### {e.reason}\n\n"
+        f"Votre évaluation n'a pas été mise en file. Réessayez dans environ {math.ceil(e.estimated_wait)} s."
+    )
 
 def process_specification(
     title: str,
     description: str,
     requirements: str,
     constraints: str,
-    model_choice: str = "anthropic"
+    model_choice: str = "anthropic",
+    session: Optional[SessionMemo] = None
 ) -> str:
     """Traite une spécification avec le modèle choisi."""
-    logger.info("Début du traitement de spécification", 
-               title=title,
-               description_length=len(description),
-               requirements_count=len(requirements.split('\n')),
-               constraints_count=len(constraints.split('\n')))
+    return get_processor().process(title, description, requirements, constraints, model_choice, session)
 
+async def aprocess_specification(
+    title: str,
+    description: str,
+    requirements: str,
+    constraints: str,
+    model_choice: str = "anthropic",
+    session: Optional[SessionMemo] = None
+) -> str:
+    """Version asynchrone de process_specification, exécutée directement sur la boucle d'événements de Gradio.
+    L'évaluation attend une place auprès du contrôle d'admission."""
     try:
-        # Initialisation des agents
-        task_generator = AgentGenerationTaches()
-        
-        # Génération des tâches
-        specification = {
-            'titre': title,
-            'description': description,
-            'exigences': requirements.split('\n')
-        }
-        
-        tasks = task_generator.generer_taches(specification)
-        
-        if not tasks:
-            raise ValueError("Erreur lors de la génération des tâches")
-            
-        logger.info("Tâches générées avec succès", tasks_length=len(tasks))
-
-        # Création du prompt enrichi
-        prompt = f"""
-        Vous êtes un expert en rédaction de spécifications techniques.
-        Voici une spécification à évaluer et optimiser :
-
-        Titre : {title}
-        Description : {description}
-        Exigences : {requirements}
-        Contraintes : {constraints}
-
-        Tâches générées :
-        {tasks}
-
-        1. Évaluez cette spécification sur 10 points
-        2. Identifiez 3 points forts
-        3. Identifiez 3 points à améliorer
-        4. Proposez une version améliorée
-        """
-
-        logger.debug("Prompt généré", prompt_length=len(prompt))
-
-        # Appel à l'API choisie
-        if model_choice == "anthropic":
-            response = anthropic_client.generate(
-                prompt=prompt,
-                system_prompt="Vous êtes un expert en spécifications techniques. Fournissez des réponses structurées en Markdown.",
-                model="claude-3-5-sonnet-20241022"
-            )
-        else:
-            response = openai_client.generate(
-                prompt=prompt,
-                system_prompt="Vous êtes un expert en spécifications techniques. Fournissez des réponses structurées en Markdown."
-            )
+        async with get_admission_controller().admit(_session_id(session)):
+            return await get_processor().aprocess(title, description, requirements, constraints, model_choice, session)
+    except AdmissionRejected as e:
+        return _format_rejection(e)
+
+def process_specification_stream(
+    title: str,
+    description: str,
+    requirements: str,
+    constraints: str,
+    model_choice: str = "anthropic",
+    session: Optional[SessionMemo] = None
+) -> Iterator[str]:
+    """Traite une spécification en renvoyant le Markdown partiel au fil des tokens reçus."""
+    yield from get_processor().process_stream(title, description, requirements, constraints, model_choice, session)
+
+async def aprocess_specification_stream(
+    title: str,
+    description: str,
+    requirements: str,
+    constraints: str,
+    model_choice: str = "anthropic",
+    session: Optional[SessionMemo] = None
+) -> AsyncIterator[str]:
+    """Version asynchrone de process_specification_stream, utilisée par l'interface Gradio.
+    Une demande refusée par le contrôle d'admission reçoit aussitôt un message avec l'attente
+    estimée ; une demande mise en file affiche son attente estimée jusqu'à son exécution."""
+    try:
+        ticket = get_admission_controller().enqueue(_session_id(session))
+    except AdmissionRejected as e:
+        yield _format_rejection(e)
+        return
+    try:
+        if ticket.queued:
+            yield f"_Évaluation en file d'attente : début estimé dans environ {math.ceil(ticket.estimated_wait)} s._"
+            await ticket.wait()
+        async for partial in get_processor().aprocess_stream(title, description, requirements, constraints, model_choice, session):
+            yield partial
+    finally:
+        ticket.release()
 
-        logger.info("Réponse reçue de l'API Anthropic",
-                  response_length=len(response))
+def metrics_exposition() -> str:
+    """Métriques du processus de l'interface : appels, agents, contrôle d'admission et cache."""
+    exposition = get_metrics().render()
+    exposition += format_gauges("llm_admission", get_admission_controller().stats(), "Contrôle d'admission")
+    cache = get_default_cache()
+    if cache is not None:
+        exposition += format_gauges("llm_cache", cache.stats(), "Cache de réponses")
+    return exposition
 
-        # Formatage des résultats
-        evaluation_text = f"""
-        ### Résultat de l'évaluation
+def submit_job(
+    title: str,
+    description: str,
+    requirements: str,
+    constraints: str,
+    model_choice: str = "anthropic"
+) -> Tuple[str, str]:
+    """
+    Soumet l'évaluation à la file de travaux persistante (exécutée par worker.py).
 
-        {response}
-        """
+    Returns:
+        L'identifiant du travail (vide si la spécification est invalide) et le message à afficher
+    """
+    is_valid, errors = SpecificationValidator.validate_specification(title, description, requirements, constraints)
+    if not is_valid:
+        return "", _format_validation_errors(errors)
+    job_id = get_job_queue().submit({
+        "title": title,
+        "description": description,
+        "requirements": requirements,
+        "constraints": constraints,
+        "model_choice": model_choice
+    })
+    return job_id, f"### Évaluation en file\n\nTravail `{job_id}` : conservez cet identifiant pour consulter le résultat."
 
-        logger.info("Traitement terminé avec succès")
-        return evaluation_text
+async def await_job(job_id: str, poll_interval: float = 1.0) -> AsyncIterator[str]:
+    """Affiche l'état d'un travail jusqu'à sa fin, puis son rapport ou son erreur."""
+    job_id = (job_id or "").strip()
+    if not job_id:
+        # Soumission refusée : le message de validation reste affiché
+        return
+    queue = get_job_queue()
+    while True:
+        try:
+            job = await asyncio.to_thread(queue.get, job_id)
+        except JobNotFound:
+            yield f"### Travail inconnu\n\nAucun travail ne porte l'identifiant `{job_id}`."
+            return
+        if job.status == DONE:
+            yield job.result
+            return
+        if job.status == FAILED:
+            yield f"### Erreur\n\nL'évaluation a échoué après {job.attempts} tentative(s) : {job.error}"
+            return
+        state = "en cours d'exécution" if job.attempts else "en attente d'un worker"
+        yield f"### Évaluation {state}\n\nTravail `{job_id}`, tentative {max(job.attempts, 1)}."
+        await asyncio.sleep(poll_interval)
 
-    except Exception as e:
-        logger.error("Erreur lors du traitement de la spécification",
-                   error=str(e),
-                   stack_trace=e.__traceback__)
-        
-        error_text = f"""
-        ### Erreur lors du traitement
+def build_interface():
+    """Construit l'interface Gradio (import de gradio compris)."""
+    import gradio as gr
 
-        Une erreur s'est produite lors de l'analyse de votre spécification :
-        - {str(e)}
+    with gr.Blocks(title="Évaluateur de Spécifications", theme=gr.themes.Soft()) as demo:
+        gr.Markdown("""
+        # Évaluateur de Spécifications
 
-        Veuillez vérifier vos entrées et réessayer.
-        """
-        return error_text
+        Cet outil vous aide à évaluer vos spécifications techniques.
+        Remplissez le formulaire ci-dessous pour commencer.
+        """)
 
-# Création de l'interface Gradio
-with gr.Blocks(title="Évaluateur de Spécifications", theme=gr.themes.Soft()) as demo:
-    gr.Markdown("""
-    # Évaluateur de Spécifications
+        with gr.Row():
+            with gr.Column():
+                title_input = gr.Textbox(
+                    label="Titre",
+                    placeholder="Entrez le titre de votre spécification"
+                )
+                description_input = gr.Textbox(
+                    label="Description",
+                    placeholder="Décrivez votre projet en détail",
+                    lines=5
+                )
+                requirements_input = gr.Textbox(
+                    label="Exigences",
+                    placeholder="Entrez une exigence par ligne",
+                    lines=5
+                )
+                constraints_input = gr.Textbox(
+                    label="Contraintes",
+                    placeholder="Entrez une contrainte par ligne",
+                    lines=5
+                )
+                model_choice = gr.Radio(
+                    choices=["anthropic", "openai", FASTEST],
+                    value="anthropic",
+                    label="Modèle à utiliser",
+                    info="fastest : le premier fournisseur à répondre, avec bascule automatique en cas d'échec"
+                )
+                submit_btn = gr.Button("Évaluer", variant="primary")
+                # Évaluation confiée aux workers : elle survit à la fermeture de l'onglet
+                with gr.Row():
+                    background_btn = gr.Button("Évaluer en arrière-plan", variant="secondary")
+                    job_id_input = gr.Textbox(label="Identifiant du travail", scale=2)
+                    poll_btn = gr.Button("Consulter", variant="secondary")
+                # Résultats des agents propres à chaque session : après la modification d'un
+                # champ, seules les étapes qui en dépendent sont réexécutées
+                session_memo = gr.State(SessionMemo)
 
-    Cet outil vous aide à évaluer vos spécifications techniques.
-    Remplissez le formulaire ci-dessous pour commencer.
-    """)
+            with gr.Column():
+                evaluation_output = gr.Markdown(label="Résultats de l'Évaluation")
+                with gr.Accordion("Options", open=False):
+                    copy_btn = gr.Button("📋 Copier les résultats", variant="secondary")
+                    copy_btn.click(
+                        None,
+                        inputs=evaluation_output,
+                        js="(text) => navigator.clipboard.writeText(text)"
+                    )
 
-    with gr.Row():
-        with gr.Column():
-            title_input = gr.Textbox(
-                label="Titre",
-                placeholder="Entrez le titre de votre spécification"
-            )
-            description_input = gr.Textbox(
-                label="Description",
-                placeholder="Décrivez votre projet en détail",
-                lines=5
+            # Les évaluations sont asynchrones et diffusées au fil des tokens : pas de limite
+            # de concurrence par thread, la charge est bornée par le contrôle d'admission
+            submit_btn.click(
+                fn=aprocess_specification_stream,
+                inputs=[
+                    title_input,
+                    description_input,
+                    requirements_input,
+                    constraints_input,
+                    model_choice,
+                    session_memo
+                ],
+                outputs=evaluation_output,
+                concurrency_limit=None
             )
-            requirements_input = gr.Textbox(
-                label="Exigences",
-                placeholder="Entrez une exigence par ligne",
-                lines=5
+            background_btn.click(
+                fn=submit_job,
+                inputs=[
+                    title_input,
+                    description_input,
+                    requirements_input,
+                    constraints_input,
+                    model_choice
+                ],
+                outputs=[job_id_input, evaluation_output]
+            ).success(
+                fn=await_job,
+                inputs=job_id_input,
+                outputs=evaluation_output,
+                concurrency_limit=None
             )
-            constraints_input = gr.Textbox(
-                label="Contraintes",
-                placeholder="Entrez une contrainte par ligne",
-                lines=5
+            poll_btn.click(
+                fn=await_job,
+                inputs=job_id_input,
+                outputs=evaluation_output,
+                concurrency_limit=None
             )
-            model_choice = gr.Radio(
-                choices=["anthropic", "openai"],
-                value="anthropic",
-                label="Modèle à utiliser"
-            )
-            submit_btn = gr.Button("Évaluer", variant="primary")
-
-        with gr.Column():
-            evaluation_output = gr.Markdown(label="Résultats de l'Évaluation")
-            with gr.Accordion("Options", open=False):
-                copy_btn = gr.Button("📋 Copier les résultats", variant="secondary")
-                copy_btn.click(
-                    None,
-                    inputs=evaluation_output,
-                    js="(text) => navigator.clipboard.writeText(text)"
-                )
 
-        submit_btn.click(
-            fn=process_specification,
-            inputs=[
-                title_input,
-                description_input,
-                requirements_input,
-                constraints_input,
-                model_choice
-            ],
-            outputs=evaluation_output
-        )
+    return demo
+
+def __getattr__(name: str):
+    """`demo` est construit au premier accès (ex. rechargement à chaud par la commande gradio)."""
+    global _demo
+    if name == "demo":
+        if _demo is None:
+            _demo = build_interface()
+        return _demo
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
-    demo.launch(show_api=False)
+    load_dotenv()
+    # Configuration du logging
+    configure_logging()
+    get_processor()
+    if os.environ.get("METRICS_PORT"):
+        start_metrics_server(
+            int(os.environ["METRICS_PORT"]), host=os.environ.get("METRICS_HOST", "127.0.0.1"), collect=metrics_exposition
+        )
+    if os.environ.get("LLM_PREWARM", "1") != "0":
+        get_registry().warm_up()
+    build_interface().launch(show_api=False)
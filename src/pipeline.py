@@ -0,0 +1,654 @@
+import asyncio
+import hashlib
+import inspect
+import uuid
+from typing import Any, AsyncIterator, Dict, FrozenSet, Iterator, List, Optional, Tuple, Union
+import structlog
+from utils.anthropic_client import AnthropicClient, AsyncAnthropicClient
+from utils.openai_client import OpenAIClient, AsyncOpenAIClient
+from utils.validator import SpecificationValidator
+from utils.prompts import EVALUATION, serialize_spec
+from utils.hedging import Hedger, get_hedger
+from utils.single_flight import AsyncSingleFlight, SingleFlight, make_flight_key
+from utils.similarity import SimilarMatch, SimilarityIndex, get_similarity_index, normalize_text
+from agents.agent_generation_taches import AgentGenerationTaches
+from agents.agent_verification_coherence import AgentVerificationCoherence
+from agents.agent_structuration import StructurationAgent
+from agents.agent_bonnes_pratiques import BonnesPratiquesAgent
+from agents.orchestrator import Orchestrator, OrchestrationResult, Stage
+
+logger = structlog.get_logger(__name__)
+
+SYSTEM_PROMPT = "Vous êtes un expert en spécifications techniques. Fournissez des réponses structurées en Markdown."
+
+ANTHROPIC_MODEL = "claude-3-5-sonnet-20241022"
+
+# Mode « le plus rapide disponible » : requête de couverture et bascule entre fournisseurs
+FASTEST = "fastest"
+
+AGENT_LABELS = {
+    "coherence": "Vérification de cohérence",
+    "structuration": "Structuration",
+    "tasks": "Génération des tâches",
+    "best_practices": "Bonnes pratiques",
+}
+
+# Étapes d'agents invalidées par la modification de chaque champ du formulaire
+# (title_input, description_input, requirements_input, constraints_input) : les
+# tâches ne dépendent que du titre, de la description et des exigences
+FIELD_STAGES: Dict[str, FrozenSet[str]] = {
+    "title": frozenset({"coherence", "structuration", "tasks", "best_practices"}),
+    "description": frozenset({"coherence", "structuration", "tasks", "best_practices"}),
+    "requirements": frozenset({"coherence", "structuration", "tasks", "best_practices"}),
+    "constraints": frozenset({"coherence", "structuration", "best_practices"}),
+}
+
+def _split_lines(value: Union[str, List[str]]) -> List[str]:
+    """Découpe un champ multi-lignes (ou une liste) en lignes non vides."""
+    lines = value if isinstance(value, list) else str(value).split('\n')
+    return [str(line).strip() for line in lines if str(line).strip()]
+
+def _as_text(value: Union[str, List[str]]) -> str:
+    return '\n'.join(str(line) for line in value) if isinstance(value, list) else value
+
+def _similarity_key(title, description, requirements, constraints, model_choice: str) -> Tuple[str, str]:
+    """
+    Texte indexé et espace de noms d'une spécification dans l'index de similarité.
+    Les contraintes font partie du texte et de l'espace de noms : une évaluation n'est
+    réutilisée que pour des contraintes identiques (après normalisation).
+    """
+    text = f"{title}\n{description}\n{_as_text(requirements)}\n{_as_text(constraints)}"
+    digest = hashlib.sha256(normalize_text(_as_text(constraints)).encode("utf-8")).hexdigest()[:16]
+    return text, f"{model_choice}:{digest}"
+
+def _build_prompt(title: str, description: str, requirements: str, constraints: str, tasks: str) -> str:
+    """Crée le prompt d'évaluation enrichi des tâches générées."""
+    specification = serialize_spec({
+        "title": title,
+        "description": description,
+        "exigences": requirements,
+        "contraintes": constraints
+    })
+    return EVALUATION.render(specification=specification, tasks=tasks)
+
+def _format_evaluation(response: str) -> str:
+    """Formate la réponse du modèle pour le panneau de résultats."""
+    return f"""
+        ### Résultat de l'évaluation
+
+        {response}
+        """
+
+def _format_error(e: Exception) -> str:
+    """Formate une erreur de traitement pour le panneau de résultats."""
+    return f"""
+        ### Erreur lors de l'analyse
+
+        Une erreur s'est produite lors de l'analyse de votre spécification :
+        - {str(e)}
+
+        Veuillez vérifier vos entrées et réessayer.
+        """
+
+def _format_progress(message: str) -> str:
+    """Message affiché en attendant les premiers tokens de l'évaluation."""
+    return f"### Évaluation en cours\n\n_{message}_"
+
+def _format_validation_errors(errors: List[str]) -> str:
+    """Formate les erreurs de validation des champs du formulaire."""
+    return "### Erreurs de validation\n\n" + "\n".join(f"- {error}" for error in errors)
+
+def _format_reused(match: SimilarMatch) -> str:
+    """Présente une évaluation antérieure réutilisée pour une spécification quasi identique."""
+    return (
+        "### Évaluation similaire réutilisée\n\n"
+        f"_Une spécification similaire à {match.similarity:.0%} a déjà été évaluée : "
+        "son résultat est affiché sans nouvel appel aux modèles._\n"
+        + match.payload
+    )
+
+def _format_structuration(analysis: Dict[str, Any]) -> List[str]:
+    """Métriques et recommandations de l'agent de structuration."""
+    requirements = analysis.get("requirements_analysis") or {}
+    constraints = analysis.get("constraints_analysis") or {}
+    lines = ["", "#### Structuration", ""]
+    if "quality_score" in analysis:
+        lines.append(f"- Qualité de la description : {analysis['quality_score']:.0%}")
+    if requirements:
+        lines.append(f"- Exigences : {requirements.get('count', 0)}"
+                     + (" (valeurs chiffrées)" if requirements.get("specificity") else " (aucune valeur chiffrée)"))
+    if constraints:
+        lines.append(f"- Contraintes : {constraints.get('count', 0)}"
+                     + (" (dont contraintes légales)" if constraints.get("has_legal") else ""))
+    recommendations = analysis.get("recommendations") or []
+    if recommendations:
+        lines += ["", "Recommandations :", ""]
+        lines += [f"- {recommendation}" for recommendation in recommendations]
+    return lines
+
+def _format_agents_report(result: OrchestrationResult) -> str:
+    """Fusionne les résultats des agents en une section Markdown."""
+    lines = ["", "### Agents impliqués", ""]
+    for stage, label in AGENT_LABELS.items():
+        if stage in result.reused:
+            lines.append(f"- {label} (résultat réutilisé)")
+            continue
+        if stage not in result.durations:
+            continue
+        line = f"- {label} ({result.durations[stage]:.1f} s)"
+        if stage in result.errors:
+            line += f" : échec ({result.errors[stage]})"
+        lines.append(line)
+
+    coherence_errors = result.outputs.get("coherence_errors") or []
+    if coherence_errors:
+        lines += ["", "#### Cohérence", ""]
+        lines += [error if error.startswith("-") else f"- {error}" for error in coherence_errors]
+
+    structured_spec = result.outputs.get("structured_spec")
+    analysis = structured_spec.get("analysis") if isinstance(structured_spec, dict) else None
+    if isinstance(analysis, dict):
+        lines += _format_structuration(analysis)
+
+    optimized_spec = result.outputs.get("optimized_spec")
+    pratiques = optimized_spec.get("bonnes_pratiques") if isinstance(optimized_spec, dict) else None
+    if pratiques:
+        lines += ["", "#### Bonnes pratiques", ""]
+        lines += [f"- **{pratique.get('titre', '')}** : {pratique.get('description', '')}" for pratique in pratiques]
+
+    return "\n".join(lines)
+
+def _spec_fields(spec: Dict) -> Dict[str, Any]:
+    """Valeurs des champs du formulaire telles que vues par les agents."""
+    sections = {section["title"]: section["content"] for section in spec["sections"]}
+    return {
+        "title": spec["title"],
+        "description": spec["description"],
+        "requirements": sections.get("Exigences", []),
+        "constraints": sections.get("Contraintes", [])
+    }
+
+class SessionMemo:
+    """
+    Résultats des étapes d'agents de la dernière évaluation d'une session de
+    l'interface. À l'évaluation suivante, seules les étapes invalidées par les
+    champs modifiés (FIELD_STAGES) sont réexécutées.
+
+    Les champs et les sorties sont remplacés ensemble par une seule affectation :
+    pas de verrou, l'objet reste copiable par gr.State.
+    """
+
+    def __init__(self):
+        # Identifiant de la session, utilisé par le contrôle d'admission
+        self.id = uuid.uuid4().hex
+        self._state: Tuple[Optional[Dict[str, Any]], Dict[str, Tuple[str, Any]]] = (None, {})
+
+    def reusable(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Sorties des étapes mémorisées que les champs modifiés n'invalident pas"""
+        previous, outputs = self._state
+        if previous is None:
+            return {}
+        invalidated = set()
+        for name, value in fields.items():
+            if previous.get(name) != value:
+                invalidated |= FIELD_STAGES[name]
+        return {output: value for stage, (output, value) in outputs.items() if stage not in invalidated}
+
+    def update(self, fields: Dict[str, Any], stages: List[Stage], result: OrchestrationResult) -> None:
+        """Mémorise les sorties des étapes réussies (exécutées ou réutilisées) pour ces champs"""
+        self._state = (dict(fields), {
+            stage.name: (stage.output, result.outputs[stage.output])
+            for stage in stages
+            if stage.name not in result.errors and stage.output in result.outputs
+        })
+
+    def adopt(self, other: "SessionMemo", fields: Dict[str, Any]) -> None:
+        """Reprend les sorties mémorisées par une autre session, si elles portent sur ces champs"""
+        if other is not self and other._state[0] == fields:
+            self._state = other._state
+
+def _with_memo(stream: Iterator[str], memo: SessionMemo) -> Iterator[Union[str, SessionMemo]]:
+    """Flux partagé suivi de la session du calcul, que chaque lecteur reprend dans la sienne"""
+    yield from stream
+    yield memo
+
+async def _awith_memo(stream: AsyncIterator[str], memo: SessionMemo) -> AsyncIterator[Union[str, SessionMemo]]:
+    async for partial in stream:
+        yield partial
+    yield memo
+
+class SpecificationValidationError(ValueError):
+    """Champs de spécification invalides"""
+
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+class SpecificationProcessor:
+    """
+    Chaîne les agents à travers un graphe de dépendances, puis évalue la
+    spécification enrichie avec le modèle choisi.
+
+    Graphe : les quatre agents (cohérence, structuration, tâches, bonnes
+    pratiques) ne dépendent que de la spécification et s'exécutent en parallèle.
+    Les métriques et recommandations de la structuration figurent dans le rapport.
+    """
+
+    def __init__(
+        self,
+        anthropic_client: AnthropicClient,
+        openai_client: OpenAIClient,
+        async_anthropic_client: Optional[AsyncAnthropicClient] = None,
+        async_openai_client: Optional[AsyncOpenAIClient] = None,
+        hedger: Optional[Hedger] = None,
+        similarity_index: Optional[SimilarityIndex] = None
+    ):
+        self.anthropic_client = anthropic_client
+        self.openai_client = openai_client
+        self.async_anthropic_client = async_anthropic_client
+        self.async_openai_client = async_openai_client
+        self.hedger = hedger or get_hedger()
+        self.similarity_index = similarity_index if similarity_index is not None else get_similarity_index()
+        # Les évaluations identiques lancées simultanément (même contenu normalisé) sont regroupées
+        self.single_flight = SingleFlight()
+        self.async_single_flight = AsyncSingleFlight()
+
+    def _create_specification(self, title: str, description: str, requirements, constraints) -> Dict:
+        """Construit la spécification structurée partagée par les agents."""
+        return {
+            "title": title,
+            "description": description,
+            "sections": [
+                {"title": "Exigences", "content": _split_lines(requirements)},
+                {"title": "Contraintes", "content": _split_lines(constraints)}
+            ]
+        }
+
+    def _initialize_agents(self) -> Dict[str, Any]:
+        return {
+            'coherence_verifier': AgentVerificationCoherence(client=self.openai_client),
+            'structuration_agent': StructurationAgent(client=self.openai_client),
+            'task_generator': AgentGenerationTaches(client=self.openai_client, async_client=self.async_openai_client),
+            'best_practices_agent': BonnesPratiquesAgent(client=self.openai_client)
+        }
+
+    def _build_orchestrator(self, agents: Dict[str, Any]) -> Orchestrator:
+        """Déclare les entrées et sorties de chaque agent."""
+        task_generator = agents['task_generator']
+
+        def task_spec(specification: Dict) -> Dict:
+            sections = {section["title"]: section["content"] for section in specification["sections"]}
+            return {
+                'titre': specification["title"],
+                'description': specification["description"],
+                'exigences': sections.get("Exigences", [])
+            }
+
+        def verify_coherence(specification):
+            return agents['coherence_verifier'].verify_coherence(specification)
+
+        def structurer(specification):
+            return agents['structuration_agent'].structurer(specification)
+
+        def generer_taches(specification):
+            return task_generator.generer_taches(task_spec(specification))
+
+        async def agenerer_taches(specification):
+            return await task_generator.agenerer_taches(task_spec(specification))
+
+        def appliquer_bonnes_pratiques(specification):
+            return agents['best_practices_agent'].appliquer_bonnes_pratiques(specification)
+
+        has_async_tasks = inspect.iscoroutinefunction(getattr(task_generator, "agenerer_taches", None))
+        return Orchestrator([
+            Stage("coherence", verify_coherence, ["specification"], "coherence_errors", optional=True),
+            Stage("structuration", structurer, ["specification"], "structured_spec", optional=True),
+            Stage("tasks", generer_taches, ["specification"], "tasks",
+                  async_func=agenerer_taches if has_async_tasks else None),
+            Stage("best_practices", appliquer_bonnes_pratiques, ["specification"], "optimized_spec", optional=True)
+        ])
+
+    def _agents_context(self, spec: Dict, session: Optional[SessionMemo]) -> Dict[str, Any]:
+        context = {"specification": spec}
+        if session is not None:
+            context.update(session.reusable(_spec_fields(spec)))
+        return context
+
+    def _memorize(self, spec: Dict, session: Optional[SessionMemo], orchestrator: Orchestrator, result: OrchestrationResult) -> None:
+        if result.reused:
+            logger.info("Résultats d'agents réutilisés", stages=result.reused)
+        if session is not None:
+            session.update(_spec_fields(spec), orchestrator.stages, result)
+
+    def _adopt(self, session: Optional[SessionMemo], leader: SessionMemo, title, description, requirements, constraints) -> None:
+        """Copie dans la session d'un appel regroupé les résultats d'agents mémorisés par le calcul partagé."""
+        if session is not None:
+            session.adopt(leader, _spec_fields(self._create_specification(title, description, requirements, constraints)))
+
+    def _run_agents(self, spec: Dict, session: Optional[SessionMemo] = None) -> OrchestrationResult:
+        """Exécute les agents, hors étapes dont la session a déjà le résultat pour ces champs."""
+        orchestrator = self._build_orchestrator(self._initialize_agents())
+        result = orchestrator.run(self._agents_context(spec, session))
+        self._memorize(spec, session, orchestrator, result)
+        return result
+
+    async def _arun_agents(self, spec: Dict, session: Optional[SessionMemo] = None) -> OrchestrationResult:
+        """Version asynchrone de _run_agents."""
+        orchestrator = self._build_orchestrator(self._initialize_agents())
+        result = await orchestrator.arun(self._agents_context(spec, session))
+        self._memorize(spec, session, orchestrator, result)
+        return result
+
+    def _process_with_agents(self, spec: Dict, agents: Dict[str, Any]) -> Tuple[Optional[str], Optional[List[str]]]:
+        """Exécute les agents et renvoie (tâches, incohérences)."""
+        result = self._build_orchestrator(agents).run({"specification": spec})
+        return result.outputs.get("tasks"), result.outputs.get("coherence_errors") or None
+
+    def _generate_prompt(self, title: str, description: str, requirements, constraints, tasks: str) -> str:
+        return _build_prompt(title, description, _as_text(requirements), _as_text(constraints), tasks)
+
+    def _stream_factories(self, prompt: str) -> Dict[str, Any]:
+        """Fabriques des flux synchrones de chaque fournisseur, pour le mode FASTEST"""
+        return {
+            "anthropic": lambda: self.anthropic_client.generate_stream(
+                prompt=EVALUATION.blocks(prompt), system_prompt=SYSTEM_PROMPT, model=ANTHROPIC_MODEL
+            ),
+            "openai": lambda: self.openai_client.generate_stream(prompt=prompt, system_prompt=SYSTEM_PROMPT)
+        }
+
+    def _astream_factories(self, prompt: str) -> Dict[str, Any]:
+        """Fabriques des flux asynchrones de chaque fournisseur, pour le mode FASTEST"""
+        return {
+            "anthropic": lambda: self.async_anthropic_client.agenerate_stream(
+                prompt=EVALUATION.blocks(prompt), system_prompt=SYSTEM_PROMPT, model=ANTHROPIC_MODEL
+            ),
+            "openai": lambda: self.async_openai_client.agenerate_stream(prompt=prompt, system_prompt=SYSTEM_PROMPT)
+        }
+
+    def _evaluate(self, prompt: str, model_choice: str) -> str:
+        if model_choice == FASTEST:
+            return "".join(self._evaluate_stream(prompt, model_choice))
+        if model_choice == "anthropic":
+            return self.anthropic_client.generate(
+                prompt=EVALUATION.blocks(prompt),
+                system_prompt=SYSTEM_PROMPT,
+                model=ANTHROPIC_MODEL
+            )
+        return self.openai_client.generate(prompt=prompt, system_prompt=SYSTEM_PROMPT)
+
+    async def _aevaluate(self, prompt: str, model_choice: str) -> str:
+        if model_choice == FASTEST:
+            return "".join([chunk async for chunk in self._aevaluate_stream(prompt, model_choice)])
+        if model_choice == "anthropic" and self.async_anthropic_client is not None:
+            return await self.async_anthropic_client.agenerate(
+                prompt=EVALUATION.blocks(prompt),
+                system_prompt=SYSTEM_PROMPT,
+                model=ANTHROPIC_MODEL
+            )
+        if model_choice != "anthropic" and self.async_openai_client is not None:
+            return await self.async_openai_client.agenerate(prompt=prompt, system_prompt=SYSTEM_PROMPT)
+        return await asyncio.to_thread(self._evaluate, prompt, model_choice)
+
+    def _evaluate_stream(self, prompt: str, model_choice: str) -> Iterator[str]:
+        if model_choice == FASTEST:
+            # Sans boucle d'événements, pas de requête de couverture : bascule sur échec uniquement
+            factories = self._stream_factories(prompt)
+            primary, secondary = self.hedger.order(list(factories))
+            return self.hedger.failover_stream(
+                (primary, factories[primary]), (secondary, factories[secondary])
+            )
+        if model_choice == "anthropic":
+            return self.anthropic_client.generate_stream(
+                prompt=EVALUATION.blocks(prompt),
+                system_prompt=SYSTEM_PROMPT,
+                model=ANTHROPIC_MODEL
+            )
+        return self.openai_client.generate_stream(prompt=prompt, system_prompt=SYSTEM_PROMPT)
+
+    async def _aevaluate_stream(self, prompt: str, model_choice: str) -> AsyncIterator[str]:
+        has_async_clients = self.async_anthropic_client is not None and self.async_openai_client is not None
+        if model_choice == FASTEST and has_async_clients:
+            factories = self._astream_factories(prompt)
+            primary, secondary = self.hedger.order(list(factories))
+            stream = self.hedger.stream((primary, factories[primary]), (secondary, factories[secondary]))
+        elif model_choice == "anthropic" and self.async_anthropic_client is not None:
+            stream = self.async_anthropic_client.agenerate_stream(
+                prompt=EVALUATION.blocks(prompt),
+                system_prompt=SYSTEM_PROMPT,
+                model=ANTHROPIC_MODEL
+            )
+        elif model_choice != "anthropic" and self.async_openai_client is not None:
+            stream = self.async_openai_client.agenerate_stream(prompt=prompt, system_prompt=SYSTEM_PROMPT)
+        else:
+            yield await asyncio.to_thread(self._evaluate, prompt, model_choice)
+            return
+        async for chunk in stream:
+            yield chunk
+
+    def _find_similar(self, title, description, requirements, constraints, model_choice: str) -> Optional[str]:
+        """Renvoie le rapport d'une spécification quasi identique déjà évaluée, s'il en existe une."""
+        if self.similarity_index is None:
+            return None
+        match = self.similarity_index.query(*_similarity_key(title, description, requirements, constraints, model_choice))
+        if match is None:
+            return None
+        logger.info("Évaluation similaire réutilisée", similarity=round(match.similarity, 3))
+        return _format_reused(match)
+
+    def _remember(self, title, description, requirements, constraints, model_choice: str, report: str) -> None:
+        if self.similarity_index is not None:
+            text, namespace = _similarity_key(title, description, requirements, constraints, model_choice)
+            self.similarity_index.add(text, report, namespace)
+
+    def _log_start(self, title: str, description: str, requirements, constraints) -> None:
+        logger.info("Début du traitement de spécification",
+                   title=title,
+                   description_length=len(description),
+                   requirements_count=len(_split_lines(requirements)),
+                   constraints_count=len(_split_lines(constraints)))
+
+    def _prepare_evaluation_prompt(self, title: str, description: str, requirements, constraints, result: OrchestrationResult) -> str:
+        tasks = result.outputs.get("tasks")
+        if not tasks:
+            raise ValueError("Erreur lors de la génération des tâches")
+        logger.info("Tâches générées avec succès", tasks_length=len(tasks),
+                   durations=result.durations)
+
+        prompt = self._generate_prompt(title, description, requirements, constraints, tasks)
+        logger.debug("Prompt généré", prompt_length=len(prompt))
+        return prompt
+
+    def run(self, title, description, requirements, constraints, model_choice: str = "anthropic", session: Optional[SessionMemo] = None) -> str:
+        """
+        Valide, traite et évalue une spécification.
+
+        Args:
+            session: Résultats d'agents de l'évaluation précédente de la session : seules
+                les étapes invalidées par les champs modifiés sont réexécutées
+
+        Returns:
+            Le rapport Markdown
+
+        Raises:
+            SpecificationValidationError: Si les champs sont invalides
+            Exception: En cas d'échec de la génération des tâches ou de l'évaluation
+        """
+        is_valid, errors = SpecificationValidator.validate_specification(title, description, requirements, constraints)
+        if not is_valid:
+            raise SpecificationValidationError(errors)
+        self._log_start(title, description, requirements, constraints)
+        reused = self._find_similar(title, description, requirements, constraints, model_choice)
+        if reused is not None:
+            return reused
+
+        spec = self._create_specification(title, description, requirements, constraints)
+        result = self._run_agents(spec, session)
+        prompt = self._prepare_evaluation_prompt(title, description, requirements, constraints, result)
+
+        response = self._evaluate(prompt, model_choice)
+        logger.info("Réponse reçue de l'API", provider=model_choice, response_length=len(response))
+
+        logger.info("Traitement terminé avec succès")
+        report = _format_evaluation(response) + _format_agents_report(result)
+        self._remember(title, description, requirements, constraints, model_choice, report)
+        return report
+
+    async def arun(self, title, description, requirements, constraints, model_choice: str = "anthropic", session: Optional[SessionMemo] = None) -> str:
+        """Version asynchrone de run."""
+        is_valid, errors = SpecificationValidator.validate_specification(title, description, requirements, constraints)
+        if not is_valid:
+            raise SpecificationValidationError(errors)
+        self._log_start(title, description, requirements, constraints)
+        reused = self._find_similar(title, description, requirements, constraints, model_choice)
+        if reused is not None:
+            return reused
+
+        spec = self._create_specification(title, description, requirements, constraints)
+        result = await self._arun_agents(spec, session)
+        prompt = self._prepare_evaluation_prompt(title, description, requirements, constraints, result)
+
+        response = await self._aevaluate(prompt, model_choice)
+        logger.info("Réponse reçue de l'API", provider=model_choice, response_length=len(response))
+
+        logger.info("Traitement terminé avec succès")
+        report = _format_evaluation(response) + _format_agents_report(result)
+        self._remember(title, description, requirements, constraints, model_choice, report)
+        return report
+
+    def process(self, title, description, requirements, constraints, model_choice: str = "anthropic", session: Optional[SessionMemo] = None) -> str:
+        """Valide, traite et évalue une spécification ; renvoie le rapport Markdown ou le message d'erreur."""
+        key = make_flight_key(title, description, requirements, constraints, model_choice)
+        memo = session or SessionMemo()
+        report, leader = self.single_flight.do(
+            key, lambda: (self._process(title, description, requirements, constraints, model_choice, memo), memo)
+        )
+        self._adopt(session, leader, title, description, requirements, constraints)
+        return report
+
+    def _process(self, title, description, requirements, constraints, model_choice: str, session: Optional[SessionMemo]) -> str:
+        try:
+            return self.run(title, description, requirements, constraints, model_choice, session)
+        except SpecificationValidationError as e:
+            return _format_validation_errors(e.errors)
+        except Exception as e:
+            logger.error("Erreur lors du traitement de la spécification",
+                       error=str(e),
+                       stack_trace=e.__traceback__)
+            return _format_error(e)
+
+    async def aprocess(self, title, description, requirements, constraints, model_choice: str = "anthropic", session: Optional[SessionMemo] = None) -> str:
+        """Version asynchrone de process."""
+        key = make_flight_key(title, description, requirements, constraints, model_choice)
+        memo = session or SessionMemo()
+
+        async def lead() -> Tuple[str, SessionMemo]:
+            return await self._aprocess(title, description, requirements, constraints, model_choice, memo), memo
+
+        report, leader = await self.async_single_flight.do(key, lead)
+        self._adopt(session, leader, title, description, requirements, constraints)
+        return report
+
+    async def _aprocess(self, title, description, requirements, constraints, model_choice: str, session: Optional[SessionMemo]) -> str:
+        try:
+            return await self.arun(title, description, requirements, constraints, model_choice, session)
+        except SpecificationValidationError as e:
+            return _format_validation_errors(e.errors)
+        except Exception as e:
+            logger.error("Erreur lors du traitement de la spécification",
+                       error=str(e),
+                       stack_trace=e.__traceback__)
+            return _format_error(e)
+
+    def process_stream(self, title, description, requirements, constraints, model_choice: str = "anthropic", session: Optional[SessionMemo] = None) -> Iterator[str]:
+        """Version en flux de process : renvoie le rapport Markdown partiel au fil des tokens reçus."""
+        key = make_flight_key(title, description, requirements, constraints, model_choice)
+        memo = session or SessionMemo()
+        stream = self.single_flight.stream(
+            key, lambda: _with_memo(self._process_stream(title, description, requirements, constraints, model_choice, memo), memo)
+        )
+        for partial in stream:
+            if isinstance(partial, SessionMemo):
+                self._adopt(session, partial, title, description, requirements, constraints)
+            else:
+                yield partial
+
+    def _process_stream(self, title, description, requirements, constraints, model_choice: str, session: Optional[SessionMemo]) -> Iterator[str]:
+        is_valid, errors = SpecificationValidator.validate_specification(title, description, requirements, constraints)
+        if not is_valid:
+            yield _format_validation_errors(errors)
+            return
+        self._log_start(title, description, requirements, constraints)
+        reused = self._find_similar(title, description, requirements, constraints, model_choice)
+        if reused is not None:
+            yield reused
+            return
+
+        try:
+            yield _format_progress("Analyse de la spécification par les agents…")
+            spec = self._create_specification(title, description, requirements, constraints)
+            result = self._run_agents(spec, session)
+            prompt = self._prepare_evaluation_prompt(title, description, requirements, constraints, result)
+
+            report = _format_agents_report(result)
+            yield _format_progress("Évaluation par le modèle…") + "\n" + report
+            response = ""
+            for chunk in self._evaluate_stream(prompt, model_choice):
+                response += chunk
+                yield _format_evaluation(response) + report
+
+            logger.info("Réponse reçue de l'API", provider=model_choice, response_length=len(response))
+            logger.info("Traitement terminé avec succès")
+            self._remember(title, description, requirements, constraints, model_choice, _format_evaluation(response) + report)
+
+        except Exception as e:
+            logger.error("Erreur lors du traitement de la spécification",
+                       error=str(e),
+                       stack_trace=e.__traceback__)
+            yield _format_error(e)
+
+    async def aprocess_stream(self, title, description, requirements, constraints, model_choice: str = "anthropic", session: Optional[SessionMemo] = None) -> AsyncIterator[str]:
+        """Version asynchrone de process_stream."""
+        key = make_flight_key(title, description, requirements, constraints, model_choice)
+        memo = session or SessionMemo()
+        stream = self.async_single_flight.stream(
+            key, lambda: _awith_memo(self._aprocess_stream(title, description, requirements, constraints, model_choice, memo), memo)
+        )
+        async for partial in stream:
+            if isinstance(partial, SessionMemo):
+                self._adopt(session, partial, title, description, requirements, constraints)
+            else:
+                yield partial
+
+    async def _aprocess_stream(self, title, description, requirements, constraints, model_choice: str, session: Optional[SessionMemo]) -> AsyncIterator[str]:
+        is_valid, errors = SpecificationValidator.validate_specification(title, description, requirements, constraints)
+        if not is_valid:
+            yield _format_validation_errors(errors)
+            return
+        self._log_start(title, description, requirements, constraints)
+        reused = self._find_similar(title, description, requirements, constraints, model_choice)
+        if reused is not None:
+            yield reused
+            return
+
+        try:
+            yield _format_progress("Analyse de la spécification par les agents…")
+            spec = self._create_specification(title, description, requirements, constraints)
+            result = await self._arun_agents(spec, session)
+            prompt = self._prepare_evaluation_prompt(title, description, requirements, constraints, result)
+
+            report = _format_agents_report(result)
+            yield _format_progress("Évaluation par le modèle…") + "\n" + report
+            response = ""
+            async for chunk in self._aevaluate_stream(prompt, model_choice):
+                response += chunk
+                yield _format_evaluation(response) + report
+
+            logger.info("Réponse reçue de l'API", provider=model_choice, response_length=len(response))
+            logger.info("Traitement terminé avec succès")
+            self._remember(title, description, requirements, constraints, model_choice, _format_evaluation(response) + report)
+
+        except Exception as e:
+            logger.error("Erreur lors du traitement de la spécification",
+                       error=str(e),
+                       stack_trace=e.__traceback__)
+            yield _format_error(e)
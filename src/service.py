@@ -0,0 +1,293 @@
+"""
+Service HTTP JSON d'évaluation, à côté de l'interface Gradio.
+
+Usage :
+    python src/service.py --port 8000 --workers 4
+
+Routes :
+    GET  /health    le processus répond
+    GET  /ready     les clients des fournisseurs sont initialisés (503 sinon)
+    POST /evaluate  {"title", "description", "requirements", "constraints", "model_choice"?}
+                    → {"evaluation": "<rapport Markdown>"}
+    GET  /metrics   métriques du processus au format d'exposition Prometheus (texte)
+    POST /jobs      même corps → 202 {"id"} : l'évaluation est confiée aux workers (worker.py)
+    GET  /jobs/<id> → {"id", "status", "result", "error", "attempts", ...} (404 si inconnu)
+
+L'application est un ASGI minimal, sans websocket : /evaluate appelle
+directement le pipeline de process_specification, /jobs passe par la file de
+travaux persistante pour les évaluations longues. Le corps des
+requêtes est limité (SERVICE_MAX_BODY_BYTES, 1 Mio par défaut) et les réponses
+sont compressées en gzip si le client l'accepte.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import sys
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+import structlog
+
+from pipeline import FASTEST, SpecificationProcessor, SpecificationValidationError
+from utils.cache import get_default_cache
+from utils.jobs import JobNotFound, JobQueue
+from utils.metrics import CONTENT_TYPE, format_gauges, get_metrics
+from utils.validator import SpecificationValidator
+
+logger = structlog.get_logger(__name__)
+
+MAX_BODY_BYTES = 1024 * 1024
+# En dessous de cette taille, la compression coûte plus qu'elle ne rapporte
+GZIP_MIN_BYTES = 1024
+MODEL_CHOICES = ("anthropic", "openai", FASTEST)
+FIELDS = ("title", "description", "requirements", "constraints")
+JOBS_PREFIX = "/jobs/"
+
+Headers = List[Tuple[bytes, bytes]]
+
+
+class HttpError(Exception):
+    """Erreur renvoyée au client avec son statut HTTP"""
+
+    def __init__(self, status: int, payload: Dict[str, Any]):
+        super().__init__(payload)
+        self.status = status
+        self.payload = payload
+
+
+def _header(scope: Dict, name: bytes) -> Optional[bytes]:
+    for key, value in scope.get("headers", []):
+        if key.lower() == name:
+            return value
+    return None
+
+
+def parse_evaluation_request(body: bytes) -> Dict[str, Any]:
+    """
+    Décode et vérifie le corps d'une requête d'évaluation.
+
+    Raises:
+        HttpError: 400 si le corps n'est pas un objet JSON aux champs attendus
+    """
+    try:
+        payload = json.loads(body)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise HttpError(400, {"error": f"Corps JSON invalide : {e}"})
+    if not isinstance(payload, dict):
+        raise HttpError(400, {"error": "Le corps doit être un objet JSON"})
+
+    missing = [field for field in FIELDS if field not in payload]
+    if missing:
+        raise HttpError(400, {"error": f"Champs manquants : {', '.join(missing)}"})
+    model_choice = payload.get("model_choice", "anthropic")
+    if model_choice not in MODEL_CHOICES:
+        raise HttpError(400, {"error": f"model_choice doit valoir {', '.join(MODEL_CHOICES)}"})
+    return {**{field: payload[field] for field in FIELDS}, "model_choice": model_choice}
+
+
+class EvaluationService:
+    """
+    Application ASGI du service d'évaluation.
+
+    Le processeur est obtenu par `processor_factory` au premier besoin, comme
+    dans l'interface : l'import et le démarrage du service restent légers.
+    """
+
+    def __init__(
+        self,
+        processor_factory: Callable[[], SpecificationProcessor],
+        max_body_bytes: int = MAX_BODY_BYTES,
+        gzip_min_bytes: int = GZIP_MIN_BYTES,
+        job_queue_factory: Optional[Callable[[], JobQueue]] = None
+    ):
+        """
+        Args:
+            processor_factory: Fonction renvoyant le processeur partagé (ex. main.get_processor)
+            max_body_bytes: Taille maximale du corps d'une requête (413 au-delà)
+            gzip_min_bytes: Taille minimale d'une réponse compressée
+            job_queue_factory: Fonction renvoyant la file de travaux (ex. utils.jobs.get_job_queue) ;
+                sans elle, les routes /jobs ne sont pas exposées
+        """
+        self.processor_factory = processor_factory
+        self.max_body_bytes = max_body_bytes
+        self.gzip_min_bytes = gzip_min_bytes
+        self.job_queue_factory = job_queue_factory
+        self._routes: Dict[Tuple[str, str], Callable[[Dict, Callable], Awaitable[Tuple[int, Union[Dict, str]]]]] = {
+            ("GET", "/health"): self._health,
+            ("GET", "/ready"): self._ready,
+            ("GET", "/metrics"): self._metrics,
+            ("POST", "/evaluate"): self._evaluate
+        }
+        if job_queue_factory is not None:
+            self._routes[("POST", "/jobs")] = self._submit_job
+            self._routes[("GET", JOBS_PREFIX)] = self._job_status
+
+    @staticmethod
+    def _route_path(path: str) -> str:
+        """Chemin de la route : /jobs/<id> est servi par la route /jobs/"""
+        if path.startswith(JOBS_PREFIX) and len(path) > len(JOBS_PREFIX):
+            return JOBS_PREFIX
+        return path
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        route_path = self._route_path(scope["path"])
+        route = self._routes.get((scope["method"], route_path))
+        try:
+            if route is None:
+                allowed = [method for method, path in self._routes if path == route_path]
+                raise HttpError(405 if allowed else 404, {"error": "Méthode non autorisée" if allowed else "Route inconnue"})
+            status, payload = await route(scope, receive)
+        except HttpError as e:
+            status, payload = e.status, e.payload
+        await self._respond(scope, send, status, payload)
+
+    async def _lifespan(self, receive: Callable, send: Callable) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _read_body(self, scope: Dict, receive: Callable) -> bytes:
+        """Lit le corps de la requête, en refusant dès que la limite est dépassée"""
+        declared = _header(scope, b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > self.max_body_bytes:
+            raise HttpError(413, {"error": f"Corps de requête limité à {self.max_body_bytes} octets"})
+
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise HttpError(400, {"error": "Requête interrompue"})
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.max_body_bytes:
+                raise HttpError(413, {"error": f"Corps de requête limité à {self.max_body_bytes} octets"})
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                return b"".join(chunks)
+
+    async def _health(self, scope: Dict, receive: Callable) -> Tuple[int, Dict]:
+        return 200, {"status": "ok"}
+
+    async def _ready(self, scope: Dict, receive: Callable) -> Tuple[int, Dict]:
+        try:
+            self.processor_factory()
+        except Exception as e:
+            return 503, {"status": "indisponible", "error": str(e)}
+        return 200, {"status": "prêt"}
+
+    async def _metrics(self, scope: Dict, receive: Callable) -> Tuple[int, str]:
+        exposition = get_metrics().render()
+        cache = get_default_cache()
+        if cache is not None:
+            exposition += format_gauges("llm_cache", cache.stats(), "Cache de réponses")
+        if self.job_queue_factory is not None:
+            stats = await asyncio.to_thread(self.job_queue_factory().stats)
+            exposition += format_gauges("llm_jobs", stats, "Travaux par statut")
+        return 200, exposition
+
+    async def _evaluate(self, scope: Dict, receive: Callable) -> Tuple[int, Dict]:
+        request = parse_evaluation_request(await self._read_body(scope, receive))
+        try:
+            processor = self.processor_factory()
+        except Exception as e:
+            raise HttpError(503, {"error": str(e)})
+
+        try:
+            evaluation = await processor.arun(**request)
+        except SpecificationValidationError as e:
+            return 422, {"errors": e.errors}
+        except Exception as e:
+            logger.error("Erreur lors de l'évaluation", error=str(e))
+            return 502, {"error": str(e)}
+        return 200, {"evaluation": evaluation}
+
+    async def _submit_job(self, scope: Dict, receive: Callable) -> Tuple[int, Dict]:
+        request = parse_evaluation_request(await self._read_body(scope, receive))
+        # Une spécification invalide est refusée tout de suite plutôt qu'en échec dans la file
+        is_valid, errors = SpecificationValidator.validate_specification(
+            request["title"], request["description"], request["requirements"], request["constraints"]
+        )
+        if not is_valid:
+            return 422, {"errors": errors}
+        job_id = await asyncio.to_thread(self.job_queue_factory().submit, request)
+        return 202, {"id": job_id}
+
+    async def _job_status(self, scope: Dict, receive: Callable) -> Tuple[int, Dict]:
+        job_id = scope["path"][len(JOBS_PREFIX):]
+        try:
+            job = await asyncio.to_thread(self.job_queue_factory().get, job_id)
+        except JobNotFound:
+            raise HttpError(404, {"error": f"Travail inconnu : {job_id}"})
+        return 200, job.to_dict()
+
+    async def _respond(self, scope: Dict, send: Callable, status: int, payload: Union[Dict, str]) -> None:
+        if isinstance(payload, str):
+            # Exposition des métriques : texte brut
+            body, content_type = payload.encode("utf-8"), CONTENT_TYPE.encode()
+        else:
+            body, content_type = json.dumps(payload, ensure_ascii=False).encode("utf-8"), b"application/json; charset=utf-8"
+        headers: Headers = [(b"content-type", content_type), (b"vary", b"accept-encoding")]
+        accept_encoding = (_header(scope, b"accept-encoding") or b"").lower()
+        if len(body) >= self.gzip_min_bytes and b"gzip" in accept_encoding:
+            body = gzip.compress(body, compresslevel=5)
+            headers.append((b"content-encoding", b"gzip"))
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+def create_app() -> EvaluationService:
+    """Application du service, branchée sur le processeur partagé de l'interface"""
+    from main import get_processor
+    from utils.jobs import get_job_queue
+
+    return EvaluationService(
+        get_processor,
+        max_body_bytes=int(os.environ.get("SERVICE_MAX_BODY_BYTES", MAX_BODY_BYTES)),
+        job_queue_factory=get_job_queue
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Service HTTP JSON d'évaluation de spécifications")
+    parser.add_argument("--host", default=os.environ.get("SERVICE_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("SERVICE_PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("SERVICE_WORKERS", 1)),
+                        help="Nombre de processus (SERVICE_WORKERS)")
+    parser.add_argument("--keep-alive", type=float, default=float(os.environ.get("SERVICE_KEEP_ALIVE", 30)),
+                        help="Durée de maintien des connexions inactives, en secondes (SERVICE_KEEP_ALIVE)")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+    from dotenv import load_dotenv
+    from utils.logging_config import configure_logging
+
+    load_dotenv()
+    configure_logging()
+    # Chaque processus importe l'application par son chemin : les clients sont propres au processus
+    uvicorn.run(
+        "service:create_app",
+        factory=True,
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+        host=args.host,
+        port=args.port,
+        workers=max(1, args.workers),
+        timeout_keep_alive=int(args.keep_alive),
+        access_log=False
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
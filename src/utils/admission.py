@@ -0,0 +1,257 @@
+"""
+Contrôle d'admission des évaluations de l'interface.
+
+Trois limites, bornées par défaut (DEFAULT_LIMITS) et désactivées lorsqu'elles valent 0 :
+
+- `max_concurrent` : évaluations exécutées simultanément, tous utilisateurs confondus ;
+- `max_per_session` : évaluations exécutées simultanément par une même session, et
+  autant au plus en attente ;
+- `max_queue` : évaluations en attente. Au-delà, la demande est refusée
+  immédiatement avec une estimation de l'attente, plutôt que de laisser la file
+  croître sans limite.
+
+Les places libérées vont d'abord aux sessions qui ont le moins d'évaluations en
+cours, puis à celle servie le moins récemment (et non dans l'ordre d'arrivée) : quelques sessions
+très actives ne peuvent pas affamer les autres. Le contrôleur est conçu pour une seule boucle d'événements.
+"""
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Durée d'une évaluation supposée tant qu'aucune n'a été mesurée, en secondes
+DEFAULT_SERVICE_TIME = 30.0
+
+# Limites appliquées faute de configuration : évaluations simultanées, par session, en attente
+DEFAULT_LIMITS = {
+    "LLM_ADMISSION_MAX_CONCURRENT": 8,
+    "LLM_ADMISSION_MAX_PER_SESSION": 1,
+    "LLM_ADMISSION_MAX_QUEUE": 32,
+}
+
+
+class AdmissionRejected(Exception):
+    """Demande refusée sans être mise en file : la capacité est atteinte"""
+
+    def __init__(self, reason: str, estimated_wait: float):
+        super().__init__(f"{reason} : réessayez dans environ {math.ceil(estimated_wait)} s")
+        self.reason = reason
+        self.estimated_wait = estimated_wait
+
+
+class Ticket:
+    """Place d'une demande admise : en attente, puis en cours d'exécution jusqu'à release()"""
+
+    def __init__(self, controller: "AdmissionController", session_id: str, estimated_wait: float):
+        self.controller = controller
+        self.session_id = session_id
+        self.estimated_wait = estimated_wait
+        self.enqueued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self._granted: Optional[asyncio.Future] = None
+        self._released = False
+
+    @property
+    def queued(self) -> bool:
+        """La demande attend une place"""
+        return self.started_at is None
+
+    async def wait(self) -> None:
+        """Attend qu'une place soit attribuée à la demande"""
+        if self._granted is not None:
+            try:
+                await asyncio.shield(self._granted)
+            except asyncio.CancelledError:
+                self.release()
+                raise
+
+    def release(self) -> None:
+        """Libère la place (ou retire la demande de la file), une seule fois"""
+        if not self._released:
+            self._released = True
+            self.controller._release(self)
+
+
+class AdmissionController:
+    """File d'attente bornée et équitable entre sessions, avec ses métriques"""
+
+    def __init__(self, max_concurrent: int = 0, max_per_session: int = 0, max_queue: int = 0, window: int = 200):
+        """
+        Args:
+            max_concurrent: Évaluations simultanées au plus (0 : pas de limite)
+            max_per_session: Évaluations simultanées par session au plus, et autant en attente (0 : pas de limite)
+            max_queue: Évaluations en attente au plus (0 : pas de limite)
+            window: Nombre de mesures récentes conservées pour les temps d'attente et d'exécution
+        """
+        self.max_concurrent = max_concurrent
+        self.max_per_session = max_per_session
+        self.max_queue = max_queue
+        self._waiting: "OrderedDict[str, Deque[Ticket]]" = OrderedDict()
+        self._running: Dict[str, int] = {}
+        self._running_total = 0
+        # Numéro de la dernière place attribuée à chaque session active (tour de rôle)
+        self._last_served: Dict[str, int] = {}
+        self._waiting_total = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._wait_times: Deque[float] = deque(maxlen=window)
+        self._service_times: Deque[float] = deque(maxlen=window)
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        """
+        Lit les limites depuis LLM_ADMISSION_MAX_CONCURRENT, LLM_ADMISSION_MAX_PER_SESSION
+        et LLM_ADMISSION_MAX_QUEUE, bornées par DEFAULT_LIMITS si elles ne sont pas définies.
+        """
+        limits = {name: int(os.environ.get(name, default)) for name, default in DEFAULT_LIMITS.items()}
+        return cls(
+            max_concurrent=limits["LLM_ADMISSION_MAX_CONCURRENT"],
+            max_per_session=limits["LLM_ADMISSION_MAX_PER_SESSION"],
+            max_queue=limits["LLM_ADMISSION_MAX_QUEUE"]
+        )
+
+    def _service_time(self) -> float:
+        if not self._service_times:
+            return DEFAULT_SERVICE_TIME
+        return sum(self._service_times) / len(self._service_times)
+
+    def estimated_wait(self, position: Optional[int] = None) -> float:
+        """
+        Attente estimée d'une demande à la position donnée de la file (en fin de
+        file par défaut) : nombre de vagues d'exécution à attendre × durée moyenne.
+        """
+        if not self.max_concurrent:
+            return 0.0
+        position = self._waiting_total if position is None else position
+        if self._running_total + position < self.max_concurrent:
+            return 0.0
+        return (position // self.max_concurrent + 1) * self._service_time()
+
+    def enqueue(self, session_id: Optional[str] = None) -> Ticket:
+        """
+        Place une demande en file (ou l'exécute directement si une place est libre).
+
+        Raises:
+            AdmissionRejected: Si la file, ou la part de la session dans la file, est pleine
+        """
+        session_id = session_id or "anonyme"
+        waiting = self._waiting.get(session_id, ())
+        estimated_wait = self.estimated_wait()
+        reason = None
+        if self.max_queue and self._waiting_total >= self.max_queue:
+            reason = "Service saturé"
+        elif self.max_per_session and len(waiting) >= self.max_per_session:
+            reason = "Trop d'évaluations en cours pour cette session"
+        if reason:
+            self._rejected += 1
+            logger.warning(f"Demande refusée ({reason}), attente estimée {estimated_wait:.0f} s")
+            raise AdmissionRejected(reason, estimated_wait)
+
+        ticket = Ticket(self, session_id, estimated_wait)
+        ticket._granted = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(session_id, deque()).append(ticket)
+        self._waiting_total += 1
+        self._dispatch()
+        return ticket
+
+    def _can_start(self, session_id: str) -> bool:
+        return not self.max_per_session or self._running.get(session_id, 0) < self.max_per_session
+
+    def _dispatch(self) -> None:
+        """
+        Attribue les places libres aux sessions en attente : d'abord celles qui ont
+        le moins d'évaluations en cours, puis celle servie le moins récemment
+        """
+        while not self.max_concurrent or self._running_total < self.max_concurrent:
+            eligible = [s for s in self._waiting if self._can_start(s)]
+            if not eligible:
+                return
+            session_id = min(eligible, key=lambda s: (self._running.get(s, 0), self._last_served.get(s, -1)))
+            queue = self._waiting[session_id]
+            ticket = queue.popleft()
+            if not queue:
+                del self._waiting[session_id]
+            self._waiting_total -= 1
+            self._start(ticket)
+
+    def _start(self, ticket: Ticket) -> None:
+        ticket.started_at = time.monotonic()
+        self._running[ticket.session_id] = self._running.get(ticket.session_id, 0) + 1
+        self._running_total += 1
+        self._last_served[ticket.session_id] = self._admitted
+        self._admitted += 1
+        self._wait_times.append(ticket.started_at - ticket.enqueued_at)
+        if not ticket._granted.done():
+            ticket._granted.set_result(None)
+
+    def _release(self, ticket: Ticket) -> None:
+        if ticket.queued:
+            queue = self._waiting.get(ticket.session_id)
+            if queue is not None and ticket in queue:
+                queue.remove(ticket)
+                self._waiting_total -= 1
+                if not queue:
+                    del self._waiting[ticket.session_id]
+                    if ticket.session_id not in self._running:
+                        self._last_served.pop(ticket.session_id, None)
+            return
+
+        self._service_times.append(time.monotonic() - ticket.started_at)
+        self._running_total -= 1
+        self._running[ticket.session_id] -= 1
+        if not self._running[ticket.session_id]:
+            del self._running[ticket.session_id]
+            if ticket.session_id not in self._waiting:
+                self._last_served.pop(ticket.session_id, None)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def admit(self, session_id: Optional[str] = None) -> AsyncIterator[Ticket]:
+        """
+        Attend une place puis la libère à la sortie du bloc.
+
+        Raises:
+            AdmissionRejected: Si la demande est refusée
+        """
+        ticket = self.enqueue(session_id)
+        try:
+            await ticket.wait()
+            yield ticket
+        finally:
+            ticket.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Profondeur de la file, exécutions en cours, compteurs et temps d'attente récents"""
+        waits = sorted(self._wait_times)
+        return {
+            "queue_depth": self._waiting_total,
+            "running": self._running_total,
+            "sessions_waiting": len(self._waiting),
+            "admitted": self._admitted,
+            "rejected": self._rejected,
+            "wait_time_avg": sum(waits) / len(waits) if waits else 0.0,
+            "wait_time_p95": waits[min(len(waits) - 1, int(0.95 * len(waits)))] if waits else 0.0,
+            "wait_time_max": waits[-1] if waits else 0.0,
+            "service_time_avg": self._service_time() if self._service_times else 0.0,
+            "estimated_wait": self.estimated_wait()
+        }
+
+
+_default_controller: Optional[AdmissionController] = None
+_default_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """Renvoie le contrôleur d'admission partagé, configuré par l'environnement"""
+    global _default_controller
+    with _default_controller_lock:
+        if _default_controller is None:
+            _default_controller = AdmissionController.from_env()
+        return _default_controller
@@ -1,29 +1,274 @@
-from anthropic import Anthropic, APIError, APIConnectionError, RateLimitError
 import os
-from typing import Optional, Dict, Any
+from abc import ABC, abstractmethod
+from contextlib import AsyncExitStack, ExitStack
+from typing import Optional, Dict, Any, Iterator, AsyncIterator, List, Tuple, Union
 import logging
+from .cache import ResponseCache, get_default_cache, make_cache_key
+from .tokens import compute_cost, content_text, get_token_counter, min_cacheable_tokens
+from .resilience import CircuitOpenError, Resilience
+from .rate_limiter import RateLimiter, Slot, estimate_request_tokens, get_rate_limiter
+from .single_flight import get_async_single_flight, get_single_flight
+from .usage import get_usage_stats
+from .metrics import get_metrics
+from .lazy import lazy_import
+
+anthropic = lazy_import("anthropic")
 
 logger = logging.getLogger(__name__)
 
-class AnthropicClient:
-    def __init__(self):
-        """Initialise le client Anthropic avec gestion des erreurs"""
+# Un prompt est une chaîne ou une liste de blocs de contenu, éventuellement marqués
+# par `cache_control` pour le cache de prompts du fournisseur
+Prompt = Union[str, List[Dict[str, Any]]]
+CACHE_CONTROL = {"type": "ephemeral"}
+
+class _AnthropicClientBase(ABC):
+    """Configuration et logique communes aux clients Anthropic synchrone et asynchrone"""
+    MAX_TOKENS = 4096
+
+    def __init__(
+        self,
+        cache: Optional[ResponseCache] = None,
+        http_client=None,
+        resilience: Optional[Resilience] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        prompt_caching: Optional[bool] = None
+    ):
+        """Initialise le client Anthropic avec gestion des erreurs
+
+        Args:
+            cache: Cache de réponses à utiliser (cache partagé du processus si non spécifié)
+            http_client: Client HTTP (pool de connexions) à utiliser par le SDK
+            resilience: Politique de nouvelles tentatives et disjoncteur (disjoncteur partagé "anthropic" par défaut)
+            rate_limiter: Limiteur de débit RPM/TPM (limiteur partagé "anthropic" s'il est configuré)
+            prompt_caching: Marque le prompt système et les blocs du prompt comme points d'arrêt du
+                cache de prompts lorsque leur préfixe atteint la taille minimale mise en cache
+                (LLM_PROMPT_CACHING, activé par défaut)
+        """
+        if prompt_caching is None:
+            prompt_caching = os.environ.get("LLM_PROMPT_CACHING", "1").lower() not in ("0", "false", "no")
+        self.prompt_caching = prompt_caching
+        self.usage_stats = get_usage_stats()
+        self.metrics = get_metrics()
+        self.resilience = resilience or Resilience("anthropic")
+        self.rate_limiter = rate_limiter if rate_limiter is not None else get_rate_limiter("anthropic")
         try:
             api_key = os.environ.get("ANTHROPIC_API_KEY")
             if not api_key:
                 raise ValueError("ANTHROPIC_API_KEY manquant dans les variables d'environnement")
-            
-            self.client = Anthropic(api_key=api_key)
+
+            self.client = self._create_client(api_key, http_client)
             self.default_model = "claude-3-5-sonnet-20241022"
+            self.cache = cache if cache is not None else get_default_cache()
+            # Les requêtes identiques simultanées partagent un seul appel au fournisseur
+            self.single_flight = get_single_flight()
+            self.async_single_flight = get_async_single_flight()
             logger.info("Client Anthropic initialisé avec succès")
-            
+
         except Exception as e:
             logger.error(f"Erreur d'initialisation du client Anthropic : {str(e)}")
             raise
 
+    @abstractmethod
+    def _create_client(self, api_key: str, http_client=None):
+        """Crée le client du SDK (synchrone ou asynchrone)"""
+
+    def _content(self, prompt: Prompt) -> Prompt:
+        """Contenu du message utilisateur : les marques cache_control sont retirées si le cache de prompts est désactivé"""
+        if isinstance(prompt, str) or self.prompt_caching:
+            return prompt
+        return [{key: value for key, value in block.items() if key != "cache_control"} for block in prompt]
+
+    @staticmethod
+    def _cache_breakpoints(params: Dict[str, Any]) -> None:
+        """
+        Retire les points d'arrêt cache_control dont le préfixe (prompt système et blocs
+        précédents compris) est plus court que le minimum mis en cache par le modèle :
+        le fournisseur les ignorerait, et les prompts courts ne sont donc pas marqués.
+        """
+        minimum = min_cacheable_tokens(params["model"])
+        counter = get_token_counter(params["model"])
+        prefix = 0
+
+        def keep_eligible(blocks):
+            nonlocal prefix
+            eligible = []
+            for block in blocks:
+                prefix += counter.count(block.get("text", ""))
+                if "cache_control" in block and prefix < minimum:
+                    block = {key: value for key, value in block.items() if key != "cache_control"}
+                eligible.append(block)
+            return eligible
+
+        if isinstance(params.get("system"), list):
+            params["system"] = keep_eligible(params["system"])
+        message = params["messages"][0]
+        if isinstance(message["content"], list):
+            message["content"] = keep_eligible(message["content"])
+
+    def _prepare_request(self, prompt: Prompt, system_prompt: Optional[str], model: Optional[str]) -> Dict[str, Any]:
+        """Valide le prompt et construit les paramètres de la requête et la clé de cache associée
+
+        Raises:
+            ValueError: Si le prompt est invalide
+        """
+        if not isinstance(prompt, (str, list)) or len(content_text(prompt).strip()) < 10:
+            error_msg = "Le prompt doit être une chaîne de caractères d'au moins 10 caractères"
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+
+        selected_model = model or self.default_model
+        params = {
+            "model": selected_model,
+            "messages": [{"role": "user", "content": self._content(prompt)}],
+            "max_tokens": self.MAX_TOKENS
+        }
+        if system_prompt:
+            # Le prompt système, identique d'un appel à l'autre, ouvre le préfixe mis en cache
+            params["system"] = (
+                [{"type": "text", "text": system_prompt, "cache_control": CACHE_CONTROL}]
+                if self.prompt_caching else system_prompt
+            )
+        if self.prompt_caching:
+            self._cache_breakpoints(params)
+        return {
+            "params": params,
+            "cache_key": make_cache_key(selected_model, system_prompt, content_text(prompt), self.MAX_TOKENS)
+        }
+
+    def _get_cached(self, request: Dict[str, Any]) -> Optional[str]:
+        if self.cache is None:
+            return None
+        cached = self.cache.get(request["cache_key"])
+        if cached is not None:
+            logger.info(f"Réponse servie depuis le cache (modèle: {request['params']['model']})")
+        return cached
+
+    def _extract_text(self, response, request: Dict[str, Any]) -> str:
+        """Extrait le texte de la réponse et l'enregistre dans le cache"""
+        if not response.content:
+            error_msg = "Aucun contenu dans la réponse de l'API"
+            logger.error(error_msg)
+            raise anthropic.APIError(error_msg, request=None, body=None)
+
+        text = response.content[0].text
+        self.usage_stats.record_anthropic(getattr(response, "usage", None), request["params"]["model"])
+        self._store(request, text)
+        return text
+
+    def _store(self, request: Dict[str, Any], text: Optional[str]) -> None:
+        if self.cache is not None and text:
+            self.cache.set(request["cache_key"], text)
+
+    @staticmethod
+    def _usage_tokens(response) -> Optional[int]:
+        """Tokens réellement consommés d'après la réponse ou le message final d'un flux"""
+        usage = getattr(response, "usage", None)
+        input_tokens = getattr(usage, "input_tokens", None)
+        output_tokens = getattr(usage, "output_tokens", None)
+        if isinstance(input_tokens, int) and isinstance(output_tokens, int):
+            return input_tokens + output_tokens
+        return None
+
+    def _send(self, request: Dict[str, Any], func):
+        """Envoie la requête via le limiteur de débit (s'il est configuré) et la politique de résilience"""
+        if self.rate_limiter is None:
+            return self.resilience.call(func)
+        tokens = estimate_request_tokens(request["params"])
+        max_tokens = request["params"].get("max_tokens")
+        return self.resilience.call(lambda: self.rate_limiter.call(func, tokens, self._usage_tokens, max_tokens))
+
+    async def _asend(self, request: Dict[str, Any], func):
+        """Version asynchrone de _send"""
+        if self.rate_limiter is None:
+            return await self.resilience.acall(func)
+        tokens = estimate_request_tokens(request["params"])
+        max_tokens = request["params"].get("max_tokens")
+        return await self.resilience.acall(
+            lambda: self.rate_limiter.acall(func, tokens, self._usage_tokens, max_tokens)
+        )
+
+    def _send_stream(self, request: Dict[str, Any], func) -> Tuple[Any, Optional[Slot]]:
+        """
+        Ouvre un flux comme _send, mais la place du limiteur reste acquise jusqu'à la
+        fin du flux : l'appelant la libère avec l'usage final (Slot.release).
+        """
+        if self.rate_limiter is None:
+            return self.resilience.call(func), None
+        tokens = estimate_request_tokens(request["params"])
+        max_tokens = request["params"].get("max_tokens")
+        return self.resilience.call(lambda: self.rate_limiter.open(func, tokens, max_tokens))
+
+    async def _asend_stream(self, request: Dict[str, Any], func) -> Tuple[Any, Optional[Slot]]:
+        """Version asynchrone de _send_stream"""
+        if self.rate_limiter is None:
+            return await self.resilience.acall(func), None
+        tokens = estimate_request_tokens(request["params"])
+        max_tokens = request["params"].get("max_tokens")
+        return await self.resilience.acall(lambda: self.rate_limiter.aopen(func, tokens, max_tokens))
+
+    def count_tokens(self, prompt: Prompt, system_prompt: Optional[str] = None, model: Optional[str] = None) -> int:
+        """Renvoie le nombre de tokens d'entrée de la requête (prompts et enveloppe des messages)"""
+        return get_token_counter(model or self.default_model).count_messages(content_text(prompt), system_prompt)
+
+    def estimate_cost(
+        self,
+        prompt: Prompt,
+        system_prompt: Optional[str] = None,
+        model: Optional[str] = None,
+        expected_output_tokens: Optional[int] = None
+    ) -> float:
+        """
+        Estime le coût de la génération en fonction du modèle et du nombre de tokens.
+
+        Args:
+            prompt: Le prompt principal
+            system_prompt: Le prompt système optionnel
+            model: Le modèle à utiliser (utilise le modèle par défaut si non spécifié)
+            expected_output_tokens: Nombre de tokens de sortie attendu (par défaut MAX_TOKENS,
+                ce qui donne une borne supérieure)
+
+        Returns:
+            Le coût estimé en dollars
+        """
+        selected_model = model or self.default_model
+        input_tokens = self.count_tokens(prompt, system_prompt, selected_model)
+        if expected_output_tokens is None:
+            expected_output_tokens = self.MAX_TOKENS
+        return compute_cost(selected_model, input_tokens, expected_output_tokens)
+
+    def _translate_error(self, e: Exception) -> Exception:
+        """Convertit une exception du SDK en erreur à remonter à l'appelant"""
+        if isinstance(e, CircuitOpenError):
+            logger.error(str(e))
+            return e
+
+        if isinstance(e, anthropic.RateLimitError):
+            error_msg = "Limite de taux d'API dépassée. Veuillez réessayer plus tard."
+            logger.error(f"{error_msg} Détails : {str(e)}")
+            return anthropic.APIError(error_msg, request=e.request, body=e.body)
+
+        if isinstance(e, anthropic.APIConnectionError):
+            error_msg = "Erreur de connexion à l'API Anthropic. Vérifiez votre connexion internet."
+            logger.error(f"{error_msg} Détails : {str(e)}")
+            return anthropic.APIConnectionError(message=error_msg, request=e.request)
+
+        if isinstance(e, anthropic.APIError):
+            error_msg = f"Erreur de l'API Anthropic : {str(e)}"
+            logger.error(error_msg)
+            return anthropic.APIError(error_msg, request=e.request, body=e.body)
+
+        error_msg = f"Erreur inattendue : {str(e)}"
+        logger.error(error_msg)
+        return Exception(error_msg)
+
+
+class AnthropicClient(_AnthropicClientBase):
+    def _create_client(self, api_key: str, http_client=None) -> "anthropic.Anthropic":
+        return anthropic.Anthropic(api_key=api_key, http_client=http_client, max_retries=0)
+
     def generate(
         self,
-        prompt: str,
+        prompt: Prompt,
         system_prompt: Optional[str] = None,
         model: Optional[str] = None
     ) -> str:
@@ -31,7 +276,8 @@ class AnthropicClient:
         Génère une réponse à partir du modèle Claude avec gestion robuste des erreurs.
 
         Args:
-            prompt: Le prompt principal (doit contenir au moins 10 caractères)
+            prompt: Le prompt principal (au moins 10 caractères), ou ses blocs de contenu
+                (les blocs marqués par `cache_control` sont mis en cache par le fournisseur)
             system_prompt: Le prompt système optionnel
             model: Le modèle à utiliser (utilise le modèle par défaut si non spécifié)
 
@@ -43,50 +289,163 @@ class AnthropicClient:
             APIError: En cas d'erreur de l'API Anthropic
             Exception: Pour les autres erreurs inattendues
         """
-        # Validation des entrées
-        if not isinstance(prompt, str) or len(prompt.strip()) < 10:
-            error_msg = "Le prompt doit être une chaîne de caractères d'au moins 10 caractères"
-            logger.error(error_msg)
-            raise ValueError(error_msg)
+        request = self._prepare_request(prompt, system_prompt, model)
 
         try:
-            messages = [{
-                "role": "user",
-                "content": prompt
-            }]
-
-            logger.info(f"Génération de réponse avec le modèle {model or self.default_model}")
-            
-            response = self.client.messages.create(
-                model=model or self.default_model,
-                messages=messages,
-                system=system_prompt,
-                max_tokens=4096
+            cached = self._get_cached(request)
+            if cached is not None:
+                return cached
+
+            logger.info(f"Génération de réponse avec le modèle {request['params']['model']}")
+            return self.single_flight.do(request["cache_key"], lambda: self._create(request))
+
+        except Exception as e:
+            raise self._translate_error(e) from e
+
+    def _create(self, request: Dict[str, Any]) -> str:
+        with self.metrics.track("anthropic", request["params"]["model"], "generate"):
+            return self._extract_text(
+                self._send(request, lambda: self.client.messages.create(**request["params"])), request
             )
 
-            if not response.content:
-                error_msg = "Aucun contenu dans la réponse de l'API"
-                logger.error(error_msg)
-                raise APIError(error_msg)
+    def generate_stream(
+        self,
+        prompt: Prompt,
+        system_prompt: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> Iterator[str]:
+        """
+        Génère une réponse en streaming : les fragments de texte sont renvoyés dès leur réception.
+        La réponse complète est enregistrée dans le cache à la fin du flux.
 
-            return response.content[0].text
+        Args:
+            prompt: Le prompt principal (au moins 10 caractères), ou ses blocs de contenu
+                (les blocs marqués par `cache_control` sont mis en cache par le fournisseur)
+            system_prompt: Le prompt système optionnel
+            model: Le modèle à utiliser (utilise le modèle par défaut si non spécifié)
 
-        except RateLimitError as e:
-            error_msg = "Limite de taux d'API dépassée. Veuillez réessayer plus tard."
-            logger.error(f"{error_msg} Détails : {str(e)}")
-            raise APIError(error_msg) from e
-            
-        except APIConnectionError as e:
-            error_msg = "Erreur de connexion à l'API Anthropic. Vérifiez votre connexion internet."
-            logger.error(f"{error_msg} Détails : {str(e)}")
-            raise APIConnectionError(error_msg) from e
-            
-        except APIError as e:
-            error_msg = f"Erreur de l'API Anthropic : {str(e)}"
-            logger.error(error_msg)
-            raise APIError(error_msg) from e
-            
+        Yields:
+            Les fragments successifs de la réponse
+        """
+        request = self._prepare_request(prompt, system_prompt, model)
+        cached = self._get_cached(request)
+        if cached is not None:
+            yield cached
+            return
+
+        yield from self.single_flight.stream(request["cache_key"], lambda: self._stream(request))
+
+    def _stream(self, request: Dict[str, Any]) -> Iterator[str]:
+        chunks = []
+        slot, used = None, None
+        try:
+            logger.info(f"Génération en streaming avec le modèle {request['params']['model']}")
+            with self.metrics.track("anthropic", request["params"]["model"], "stream") as call, ExitStack() as stack:
+                # Les nouvelles tentatives ne portent que sur l'ouverture du flux
+                stream, slot = self._send_stream(
+                    request, lambda: stack.enter_context(self.client.messages.stream(**request["params"]))
+                )
+                for text in stream.text_stream:
+                    call.first_token()
+                    chunks.append(text)
+                    yield text
+                final = stream.get_final_message()
+                used = self._usage_tokens(final)
+                self.usage_stats.record_anthropic(getattr(final, "usage", None), request["params"]["model"])
         except Exception as e:
-            error_msg = f"Erreur inattendue : {str(e)}"
-            logger.error(error_msg)
-            raise Exception(error_msg) from e
+            raise self._translate_error(e) from e
+        finally:
+            if slot is not None:
+                slot.release(used)
+
+        self._store(request, "".join(chunks))
+
+
+class AsyncAnthropicClient(_AnthropicClientBase):
+    """Client Anthropic asynchrone, basé sur anthropic.AsyncAnthropic"""
+
+    def _create_client(self, api_key: str, http_client=None) -> "anthropic.AsyncAnthropic":
+        return anthropic.AsyncAnthropic(api_key=api_key, http_client=http_client, max_retries=0)
+
+    async def agenerate(
+        self,
+        prompt: Prompt,
+        system_prompt: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> str:
+        """
+        Version asynchrone de AnthropicClient.generate.
+
+        Args:
+            prompt: Le prompt principal (au moins 10 caractères), ou ses blocs de contenu
+                (les blocs marqués par `cache_control` sont mis en cache par le fournisseur)
+            system_prompt: Le prompt système optionnel
+            model: Le modèle à utiliser (utilise le modèle par défaut si non spécifié)
+
+        Returns:
+            La réponse générée par le modèle
+
+        Raises:
+            ValueError: Si le prompt est invalide
+            APIError: En cas d'erreur de l'API Anthropic
+            Exception: Pour les autres erreurs inattendues
+        """
+        request = self._prepare_request(prompt, system_prompt, model)
+
+        try:
+            cached = self._get_cached(request)
+            if cached is not None:
+                return cached
+
+            logger.info(f"Génération de réponse avec le modèle {request['params']['model']}")
+            async def send():
+                with self.metrics.track("anthropic", request["params"]["model"], "generate"):
+                    response = await self._asend(request, lambda: self.client.messages.create(**request["params"]))
+                    return self._extract_text(response, request)
+
+            return await self.async_single_flight.do(request["cache_key"], send)
+
+        except Exception as e:
+            raise self._translate_error(e) from e
+
+    async def agenerate_stream(
+        self,
+        prompt: Prompt,
+        system_prompt: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Version asynchrone de AnthropicClient.generate_stream"""
+        request = self._prepare_request(prompt, system_prompt, model)
+        cached = self._get_cached(request)
+        if cached is not None:
+            yield cached
+            return
+
+        async for chunk in self.async_single_flight.stream(request["cache_key"], lambda: self._astream(request)):
+            yield chunk
+
+    async def _astream(self, request: Dict[str, Any]) -> AsyncIterator[str]:
+        chunks = []
+        slot, used = None, None
+        try:
+            logger.info(f"Génération en streaming avec le modèle {request['params']['model']}")
+            with self.metrics.track("anthropic", request["params"]["model"], "stream") as call:
+                async with AsyncExitStack() as stack:
+                    # Les nouvelles tentatives ne portent que sur l'ouverture du flux
+                    stream, slot = await self._asend_stream(
+                        request, lambda: stack.enter_async_context(self.client.messages.stream(**request["params"]))
+                    )
+                    async for text in stream.text_stream:
+                        call.first_token()
+                        chunks.append(text)
+                        yield text
+                    final = await stream.get_final_message()
+                    used = self._usage_tokens(final)
+                    self.usage_stats.record_anthropic(getattr(final, "usage", None), request["params"]["model"])
+        except Exception as e:
+            raise self._translate_error(e) from e
+        finally:
+            if slot is not None:
+                await slot.arelease(used)
+
+        self._store(request, "".join(chunks))
@@ -0,0 +1,283 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(text: Optional[str]) -> str:
+    """Normalise un texte pour le calcul de clé (fins de ligne, espaces de fin)"""
+    if not text:
+        return ""
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+def make_cache_key(
+    model: str,
+    system_prompt: Optional[str],
+    prompt: str,
+    max_tokens: int,
+    response_format: Optional[Dict[str, Any]] = None
+) -> str:
+    """
+    Calcule la clé de cache d'une requête à partir du tuple normalisé
+    (modèle, prompt système, prompt, max_tokens), complété du format de
+    réponse imposé s'il y en a un.
+
+    Returns:
+        L'empreinte SHA-256 hexadécimale de la requête
+    """
+    parts = [model, _normalize(system_prompt), _normalize(prompt), max_tokens]
+    if response_format is not None:
+        parts.append(response_format)
+    payload = json.dumps(parts, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _MemoryTier:
+    """Niveau LRU en mémoire, protégé par un verrou"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, now: float) -> Tuple[Optional[str], bool]:
+        """Renvoie (valeur, expirée)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, False
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return None, True
+            self._entries.move_to_end(key)
+            return value, False
+
+    def set(self, key: str, value: str, expires_at: float) -> int:
+        """Ajoute une entrée et renvoie le nombre d'entrées évincées"""
+        if self.max_entries <= 0:
+            return 0
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _DiskTier:
+    """Niveau persistant SQLite avec éviction par taille totale"""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)"
+            )
+
+    def get(self, key: str, now: float) -> Tuple[Optional[str], bool]:
+        """Renvoie (valeur, expirée)"""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None, False
+            value, expires_at = row
+            if expires_at <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None, True
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (now, key)
+            )
+            return value, False
+
+    def set(self, key: str, value: str, expires_at: float, now: float) -> int:
+        """Ajoute une entrée et renvoie le nombre d'entrées évincées"""
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return 0
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, expires_at, now)
+            )
+            return self._evict(now)
+
+    def _evict(self, now: float) -> int:
+        """Supprime les entrées expirées puis les moins récemment utilisées au-delà de max_bytes"""
+        evicted = self._conn.execute(
+            "DELETE FROM responses WHERE expires_at <= ?", (now,)
+        ).rowcount
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return evicted
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        return evicted
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """
+    Cache de réponses à deux niveaux, adressé par contenu :
+    un LRU en mémoire devant un stockage SQLite persistant optionnel.
+    """
+
+    def __init__(
+        self,
+        memory_max_entries: int = 256,
+        ttl: float = 24 * 3600,
+        path: Optional[str] = None,
+        disk_max_bytes: int = 64 * 1024 * 1024
+    ):
+        """
+        Args:
+            memory_max_entries: Nombre maximal d'entrées du niveau mémoire
+            ttl: Durée de vie des entrées en secondes
+            path: Chemin du fichier SQLite (niveau disque désactivé si None)
+            disk_max_bytes: Taille maximale cumulée des réponses stockées sur disque
+        """
+        self.ttl = ttl
+        self._memory = _MemoryTier(memory_max_entries)
+        self._disk = _DiskTier(path, disk_max_bytes) if path else None
+        self._stats_lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    @classmethod
+    def from_env(cls) -> Optional["ResponseCache"]:
+        """
+        Construit le cache à partir des variables d'environnement :
+        LLM_CACHE_ENABLED, LLM_CACHE_PATH, LLM_CACHE_TTL,
+        LLM_CACHE_MEMORY_ENTRIES et LLM_CACHE_DISK_MAX_BYTES.
+
+        Returns:
+            Le cache configuré, ou None si le cache est désactivé
+        """
+        if os.environ.get("LLM_CACHE_ENABLED", "1").lower() in ("0", "false", "no"):
+            return None
+        return cls(
+            memory_max_entries=int(os.environ.get("LLM_CACHE_MEMORY_ENTRIES", 256)),
+            ttl=float(os.environ.get("LLM_CACHE_TTL", 24 * 3600)),
+            path=os.environ.get("LLM_CACHE_PATH") or None,
+            disk_max_bytes=int(os.environ.get("LLM_CACHE_DISK_MAX_BYTES", 64 * 1024 * 1024))
+        )
+
+    def _count(self, name: str, value: int = 1) -> None:
+        if value:
+            with self._stats_lock:
+                self._stats[name] += value
+
+    def get(self, key: str) -> Optional[str]:
+        """Renvoie la réponse en cache pour la clé, ou None"""
+        now = time.time()
+        value, expired = self._memory.get(key, now)
+        self._count("expirations", int(expired))
+        if value is not None:
+            self._count("memory_hits")
+            return value
+
+        if self._disk is not None:
+            try:
+                value, expired = self._disk.get(key, now)
+            except sqlite3.Error as e:
+                logger.warning(f"Lecture du cache disque impossible : {str(e)}")
+                value, expired = None, False
+            self._count("expirations", int(expired))
+            if value is not None:
+                self._count("disk_hits")
+                self._count("evictions", self._memory.set(key, value, now + self.ttl))
+                return value
+
+        self._count("misses")
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        """Stocke une réponse dans les deux niveaux"""
+        now = time.time()
+        expires_at = now + self.ttl
+        self._count("evictions", self._memory.set(key, value, expires_at))
+        if self._disk is not None:
+            try:
+                self._count("evictions", self._disk.set(key, value, expires_at, now))
+            except sqlite3.Error as e:
+                logger.warning(f"Écriture du cache disque impossible : {str(e)}")
+
+    def clear(self) -> None:
+        """Vide les deux niveaux du cache"""
+        self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Renvoie les compteurs de succès/échecs et le taux de succès"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        total = hits + stats["misses"]
+        stats["hits"] = hits
+        stats["hit_rate"] = hits / total if total else 0.0
+        stats["memory_entries"] = len(self._memory)
+        return stats
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_cache_loaded = False
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> Optional[ResponseCache]:
+    """Renvoie le cache partagé du processus, configuré depuis l'environnement"""
+    global _default_cache, _default_cache_loaded
+    with _default_cache_lock:
+        if not _default_cache_loaded:
+            _default_cache = ResponseCache.from_env()
+            _default_cache_loaded = True
+        return _default_cache
@@ -0,0 +1,160 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .anthropic_client import AnthropicClient, AsyncAnthropicClient
+from .lazy import lazy_import
+from .openai_client import AsyncOpenAIClient, OpenAIClient, OpenAIModel
+
+# Les SDK et le client HTTP ne sont importés qu'à la construction du premier client
+anthropic = lazy_import("anthropic")
+httpx = lazy_import("httpx")
+openai = lazy_import("openai")
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class PoolConfig:
+    """Paramètres du pool de connexions HTTP partagé par les clients d'un fournisseur"""
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 60.0
+    timeout: float = 120.0
+
+    @classmethod
+    def from_env(cls) -> "PoolConfig":
+        """
+        Lit la configuration depuis LLM_POOL_MAX_CONNECTIONS, LLM_POOL_MAX_KEEPALIVE,
+        LLM_POOL_KEEPALIVE_EXPIRY et LLM_HTTP_TIMEOUT.
+        """
+        return cls(
+            max_connections=int(os.environ.get("LLM_POOL_MAX_CONNECTIONS", cls.max_connections)),
+            max_keepalive_connections=int(os.environ.get("LLM_POOL_MAX_KEEPALIVE", cls.max_keepalive_connections)),
+            keepalive_expiry=float(os.environ.get("LLM_POOL_KEEPALIVE_EXPIRY", cls.keepalive_expiry)),
+            timeout=float(os.environ.get("LLM_HTTP_TIMEOUT", cls.timeout))
+        )
+
+    def limits(self) -> "httpx.Limits":
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry
+        )
+
+class ClientRegistry:
+    """
+    Registre des clients fournisseurs du processus : chaque client (et son pool
+    de connexions keep-alive) est construit une seule fois puis partagé entre
+    les workers Gradio. Les clients des SDK sont thread-safe.
+    """
+
+    def __init__(self, pool_config: Optional[PoolConfig] = None):
+        self.pool_config = pool_config or PoolConfig.from_env()
+        self._clients: Dict[Tuple[str, Optional[str]], Any] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, key: Tuple[str, Optional[str]], factory: Callable[[], Any]) -> Any:
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = factory()
+                self._clients[key] = client
+                logger.info(f"Client partagé créé : {key[0]}")
+            return client
+
+    def _http_options(self) -> Dict[str, Any]:
+        return {"limits": self.pool_config.limits(), "timeout": self.pool_config.timeout}
+
+    def openai(self, default_model: OpenAIModel = "gpt-4o-mini") -> OpenAIClient:
+        return self._get_or_create(("openai", default_model), lambda: OpenAIClient(
+            default_model=default_model,
+            http_client=openai.DefaultHttpxClient(**self._http_options())
+        ))
+
+    def async_openai(self, default_model: OpenAIModel = "gpt-4o-mini") -> AsyncOpenAIClient:
+        return self._get_or_create(("async_openai", default_model), lambda: AsyncOpenAIClient(
+            default_model=default_model,
+            http_client=openai.DefaultAsyncHttpxClient(**self._http_options())
+        ))
+
+    def anthropic(self) -> AnthropicClient:
+        return self._get_or_create(("anthropic", None), lambda: AnthropicClient(
+            http_client=anthropic.DefaultHttpxClient(**self._http_options())
+        ))
+
+    def async_anthropic(self) -> AsyncAnthropicClient:
+        return self._get_or_create(("async_anthropic", None), lambda: AsyncAnthropicClient(
+            http_client=anthropic.DefaultAsyncHttpxClient(**self._http_options())
+        ))
+
+    def warm_up(self, timeout: float = 5.0) -> Dict[str, bool]:
+        """
+        Pré-établit les connexions TLS des clients synchrones en parallèle
+        (requête légère de liste des modèles). Les échecs sont journalisés
+        sans interrompre le démarrage.
+
+        Returns:
+            Le statut du préchauffage par fournisseur
+        """
+        targets = {
+            "openai": lambda: self.openai().client.with_options(timeout=timeout).models.list(),
+            "anthropic": lambda: self.anthropic().client.with_options(timeout=timeout).models.list()
+        }
+
+        def run(item):
+            name, call = item
+            try:
+                call()
+                return name, True
+            except Exception as e:
+                logger.warning(f"Préchauffage des connexions {name} impossible : {str(e)}")
+                return name, False
+
+        with ThreadPoolExecutor(max_workers=len(targets)) as pool:
+            status = dict(pool.map(run, targets.items()))
+        logger.info(f"Préchauffage des connexions terminé : {status}")
+        return status
+
+    def close(self) -> None:
+        """Ferme les pools de connexions des clients synchrones et vide le registre"""
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for (kind, _), client in clients.items():
+            if not kind.startswith("async_"):
+                client.client.close()
+
+
+_registry: Optional[ClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ClientRegistry:
+    """Renvoie le registre de clients partagé du processus"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ClientRegistry()
+    return _registry
+
+
+def get_openai_client(default_model: OpenAIModel = "gpt-4o-mini") -> OpenAIClient:
+    return get_registry().openai(default_model)
+
+
+def get_async_openai_client(default_model: OpenAIModel = "gpt-4o-mini") -> AsyncOpenAIClient:
+    return get_registry().async_openai(default_model)
+
+
+def get_anthropic_client() -> AnthropicClient:
+    return get_registry().anthropic()
+
+
+def get_async_anthropic_client() -> AsyncAnthropicClient:
+    return get_registry().async_anthropic()
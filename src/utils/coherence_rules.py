@@ -0,0 +1,219 @@
+"""
+Règles de cohérence locales, évaluées sans appel au fournisseur.
+
+Les règles détectent les défauts triviaux d'une spécification : sections en
+double, sections ou éléments vides, contraintes numériques contradictoires sur
+une même métrique (« < 200ms » et « < 2s ») et références à des sections ou
+exigences qui n'existent pas. Les sections qui passent toutes les règles sont
+les seules transmises au modèle pour l'analyse approfondie.
+"""
+import logging
+import re
+from dataclasses import dataclass, field
+from itertools import combinations
+from typing import Any, Dict, List, Set, Tuple
+
+from .practices import normalize_key
+
+logger = logging.getLogger(__name__)
+
+# Éléments qui ne disent rien : ils sont signalés comme vides
+PLACEHOLDERS = frozenset({"todo", "tbd", "a definir", "a completer", "a preciser", "n/a", "-", "?"})
+
+# Borne, valeur et unité d'une contrainte numérique
+_OPERATOR = (
+    r"<=|>=|≤|≥|<|>|="
+    r"|\b(?:en moins de|moins de|au plus|au maximum|maximum|max|inférieure? à|jusqu'à|sous"
+    r"|ne (?:doit|doivent) pas dépasser|plus de|au moins|au minimum|minimum|supérieure? à)"
+)
+_NUMBER = r"\d{1,3}(?:[   ]\d{3})+(?:[.,]\d+)?|\d+(?:[.,]\d+)?"
+_UNIT = r"k€|€|euros?|%|ms|millisecondes?|secondes?|sec|s|minutes?|min|heures?|h|jours?|j"
+_BOUND = re.compile(
+    rf"(?:(?P<operator>{_OPERATOR})\s*)?(?P<value>{_NUMBER})\s*(?P<unit>{_UNIT})(?!\w)",
+    re.IGNORECASE
+)
+
+_UPPER = {"<", "<=", "≤", "en moins de", "moins de", "au plus", "au maximum", "maximum", "max",
+          "inferieur a", "inferieure a", "jusqu'a", "sous", "ne doit pas depasser", "ne doivent pas depasser"}
+_LOWER = {">", ">=", "≥", "plus de", "au moins", "au minimum", "minimum", "superieur a", "superieure a"}
+
+# Unité → (grandeur, facteur vers l'unité de référence)
+_UNITS = {
+    "ms": ("durée", 1), "milliseconde": ("durée", 1), "millisecondes": ("durée", 1),
+    "s": ("durée", 1000), "sec": ("durée", 1000), "seconde": ("durée", 1000), "secondes": ("durée", 1000),
+    "min": ("durée", 60_000), "minute": ("durée", 60_000), "minutes": ("durée", 60_000),
+    "h": ("durée", 3_600_000), "heure": ("durée", 3_600_000), "heures": ("durée", 3_600_000),
+    "j": ("durée", 86_400_000), "jour": ("durée", 86_400_000), "jours": ("durée", 86_400_000),
+    "%": ("pourcentage", 1),
+    "€": ("montant", 1), "euro": ("montant", 1), "euros": ("montant", 1), "k€": ("montant", 1000),
+}
+
+# Mots ignorés pour identifier la métrique qui précède une borne
+_STOPWORDS = frozenset({
+    "a", "au", "aux", "avec", "d", "de", "des", "doit", "doivent", "du", "en", "est", "et", "etre",
+    "l", "la", "le", "les", "ne", "ou", "par", "pas", "pour", "sont", "sur", "un", "une"
+})
+
+_SECTION_REFERENCE = re.compile(
+    r"\b(?:voir|cf\.?)\s+(?:la\s+)?section\s+[«\"']?\s*(?P<target>[^»\"'.,;:()]+)",
+    re.IGNORECASE
+)
+_ITEM_REFERENCE = re.compile(r"\b(?P<kind>exigence|contrainte)\s+(?:n°\s*|no\s+|#)?(?P<number>\d+)\b", re.IGNORECASE)
+_IDENTIFIER = re.compile(r"\b(?P<prefix>[A-Z]{2,5})-(?P<number>\d+)\b")
+
+# Section visée par une référence numérotée (« exigence 3 »)
+_REFERENCE_SECTIONS = {"exigence": "exigences", "contrainte": "contraintes"}
+
+
+@dataclass
+class RulesReport:
+    """Résultat des règles locales"""
+    findings: List[str] = field(default_factory=list)
+    passed_sections: List[Dict[str, Any]] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class _Bound:
+    item: str
+    section: int
+    metric: Tuple[str, ...]
+    dimension: str
+    kind: str
+    value: float
+
+
+def _items(content: Any) -> List[str]:
+    if content is None:
+        return []
+    lines = content if isinstance(content, list) else str(content).splitlines()
+    return [str(line).strip() for line in lines if str(line).strip()]
+
+
+def _bounds(item: str, section: int) -> List[_Bound]:
+    """Bornes numériques d'un élément, chacune rattachée aux mots qui la précèdent"""
+    bounds = []
+    start = 0
+    for match in _BOUND.finditer(item):
+        words = re.findall(r"[a-z]+", normalize_key(item[start:match.start()]))
+        start = match.end()
+        operator = normalize_key(match.group("operator") or "=")
+        metric = tuple(word for word in words if word not in _STOPWORDS)
+        if not metric:
+            continue
+        dimension, factor = _UNITS[match.group("unit").lower()]
+        value = float(re.sub(r"[   ]", "", match.group("value")).replace(",", ".")) * factor
+        kind = "max" if operator in _UPPER else "min" if operator in _LOWER else "eq"
+        bounds.append(_Bound(item, section, metric, dimension, kind, value))
+    return bounds
+
+
+def _contradict(a: _Bound, b: _Bound) -> bool:
+    if a.metric != b.metric or a.dimension != b.dimension or a.value == b.value:
+        return False
+    if a.kind == b.kind:
+        return True
+    kinds = {a.kind: a.value, b.kind: b.value}
+    if "max" in kinds and "min" in kinds:
+        return kinds["max"] < kinds["min"]
+    if "max" in kinds:
+        return kinds["eq"] > kinds["max"]
+    return kinds["eq"] < kinds["min"]
+
+
+def _check_duplicates(sections: List[Tuple[str, List[str]]], failed: Set[int]) -> List[str]:
+    findings = []
+    titles: Dict[str, int] = {}
+    for index, (title, items) in enumerate(sections):
+        key = normalize_key(title)
+        if key in titles:
+            findings.append(f"Section en double : {title}")
+            failed.add(index)
+        titles.setdefault(key, index)
+
+        seen: Set[str] = set()
+        for item in items:
+            if normalize_key(item) in seen:
+                findings.append(f"Élément en double dans « {title} » : {item}")
+                failed.add(index)
+            seen.add(normalize_key(item))
+    return findings
+
+
+def _check_empty(sections: List[Tuple[str, List[str]]], failed: Set[int]) -> List[str]:
+    findings = []
+    for index, (title, items) in enumerate(sections):
+        if not items:
+            findings.append(f"Section vide : {title}")
+            failed.add(index)
+        for item in items:
+            if normalize_key(item) in PLACEHOLDERS:
+                findings.append(f"Élément vide dans « {title} » : {item}")
+                failed.add(index)
+    return findings
+
+
+def _check_numeric_constraints(sections: List[Tuple[str, List[str]]], failed: Set[int]) -> List[str]:
+    findings = []
+    bounds = [bound for index, (_, items) in enumerate(sections) for item in items for bound in _bounds(item, index)]
+    for a, b in combinations(bounds, 2):
+        if _contradict(a, b):
+            findings.append(f"Contraintes numériques contradictoires : « {a.item} » et « {b.item} »")
+            failed.update((a.section, b.section))
+    return findings
+
+
+def _check_references(sections: List[Tuple[str, List[str]]], failed: Set[int]) -> List[str]:
+    findings = []
+    titles = [normalize_key(title) for title, _ in sections]
+    counts = {normalize_key(title): len(items) for title, items in sections}
+    defined = {match.group(0) for _, items in sections for item in items
+               for match in [_IDENTIFIER.match(item)] if match}
+    prefixes = {identifier.split("-")[0] for identifier in defined}
+
+    for index, (title, items) in enumerate(sections):
+        for item in items:
+            undefined = []
+            for match in _SECTION_REFERENCE.finditer(item):
+                target = normalize_key(match.group("target"))
+                exists = (int(target) <= len(sections)) if target.isdigit() else any(
+                    target == key or target.startswith(f"{key} ") for key in titles if key
+                )
+                if not exists:
+                    undefined.append(f"section {match.group('target').strip()}")
+            for match in _ITEM_REFERENCE.finditer(item):
+                count = counts.get(_REFERENCE_SECTIONS[match.group("kind").lower()], 0)
+                if not 1 <= int(match.group("number")) <= count:
+                    undefined.append(match.group(0))
+            for match in _IDENTIFIER.finditer(item):
+                if match.start() and match.group("prefix") in prefixes and match.group(0) not in defined:
+                    undefined.append(match.group(0))
+            for reference in undefined:
+                findings.append(f"Référence non définie dans « {title} » : {reference}")
+                failed.add(index)
+    return findings
+
+
+RULES = (_check_duplicates, _check_empty, _check_numeric_constraints, _check_references)
+
+
+def check_specification(spec: Dict[str, Any], rules=RULES) -> RulesReport:
+    """
+    Applique les règles locales aux sections d'une spécification.
+
+    Args:
+        spec: La spécification (title, sections)
+        rules: Les règles à appliquer, dans l'ordre des constats
+
+    Returns:
+        Les constats et les sections qui ont passé toutes les règles
+    """
+    raw_sections = [section for section in spec.get("sections") or [] if isinstance(section, dict)]
+    sections = [(str(section.get("title", "")).strip(), _items(section.get("content"))) for section in raw_sections]
+    failed: Set[int] = set()
+    findings = [finding for rule in rules for finding in rule(sections, failed)]
+    if findings:
+        logger.info(f"Règles locales : {len(findings)} constat(s), {len(failed)} section(s) écartée(s)")
+    return RulesReport(
+        findings=findings,
+        passed_sections=[section for index, section in enumerate(raw_sections) if index not in failed]
+    )
@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+StreamFactory = Callable[[], AsyncIterator[str]]
+SyncStreamFactory = Callable[[], Iterator[str]]
+
+
+@dataclass(frozen=True)
+class HedgingConfig:
+    """Paramètres du déclenchement de la requête de couverture"""
+    quantile: float = 0.95
+    multiplier: float = 1.0
+    default_delay: float = 4.0
+    min_delay: float = 0.5
+    max_delay: float = 20.0
+    min_samples: int = 20
+
+    @classmethod
+    def from_env(cls) -> "HedgingConfig":
+        """
+        Lit la configuration depuis LLM_HEDGE_QUANTILE, LLM_HEDGE_MULTIPLIER,
+        LLM_HEDGE_DEFAULT_DELAY, LLM_HEDGE_MIN_DELAY, LLM_HEDGE_MAX_DELAY et LLM_HEDGE_MIN_SAMPLES.
+        """
+        return cls(
+            quantile=float(os.environ.get("LLM_HEDGE_QUANTILE", cls.quantile)),
+            multiplier=float(os.environ.get("LLM_HEDGE_MULTIPLIER", cls.multiplier)),
+            default_delay=float(os.environ.get("LLM_HEDGE_DEFAULT_DELAY", cls.default_delay)),
+            min_delay=float(os.environ.get("LLM_HEDGE_MIN_DELAY", cls.min_delay)),
+            max_delay=float(os.environ.get("LLM_HEDGE_MAX_DELAY", cls.max_delay)),
+            min_samples=int(os.environ.get("LLM_HEDGE_MIN_SAMPLES", cls.min_samples))
+        )
+
+
+class LatencyTracker:
+    """Fenêtre glissante des délais avant premier token d'un fournisseur"""
+
+    def __init__(self, window: int = 200):
+        self._samples: "deque[float]" = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self._samples.append(latency)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Renvoie le quantile q des délais observés, ou None sans échantillon"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, max(0, math.ceil(q * len(samples)) - 1))]
+
+
+class Hedger:
+    """
+    Requêtes de couverture entre deux fournisseurs : si le fournisseur principal
+    n'a pas produit de premier token après le quantile p95 de ses délais observés,
+    la même requête est envoyée au fournisseur secondaire ; le premier à répondre
+    est conservé et l'autre est annulé. Une erreur avant le premier token bascule
+    immédiatement sur l'autre fournisseur.
+
+    Le délai écoulé d'une requête annulée avant son premier token est enregistré
+    comme borne inférieure de son délai : sans ces échantillons censurés, seules
+    les réponses rapides alimenteraient le p95, qui baisserait à chaque couverture.
+    """
+
+    def __init__(self, config: Optional[HedgingConfig] = None):
+        self.config = config or HedgingConfig.from_env()
+        self._trackers: Dict[str, LatencyTracker] = {}
+        self._lock = threading.Lock()
+
+    def tracker(self, provider: str) -> LatencyTracker:
+        with self._lock:
+            if provider not in self._trackers:
+                self._trackers[provider] = LatencyTracker()
+            return self._trackers[provider]
+
+    def hedge_delay(self, provider: str) -> float:
+        """Délai d'attente du premier token avant d'envoyer la requête de couverture"""
+        tracker = self.tracker(provider)
+        if len(tracker) < self.config.min_samples:
+            return self.config.default_delay
+        delay = tracker.quantile(self.config.quantile) * self.config.multiplier
+        return min(self.config.max_delay, max(self.config.min_delay, delay))
+
+    def order(self, providers: List[str]) -> List[str]:
+        """Trie les fournisseurs par délai médian observé (ordre donné tant que les mesures manquent)"""
+        medians = {name: self.tracker(name).quantile(0.5) for name in providers}
+        if any(len(self.tracker(name)) < self.config.min_samples for name in providers):
+            return list(providers)
+        return sorted(providers, key=lambda name: medians[name])
+
+    async def stream(
+        self,
+        primary: Tuple[str, StreamFactory],
+        secondary: Tuple[str, StreamFactory]
+    ) -> AsyncIterator[str]:
+        """
+        Diffuse la réponse du premier fournisseur à produire un token.
+
+        Args:
+            primary: (nom, fabrique du flux) du fournisseur principal
+            secondary: (nom, fabrique du flux) du fournisseur de couverture
+
+        Yields:
+            Les fragments de la réponse retenue
+
+        Raises:
+            Exception: L'erreur du dernier fournisseur si aucun n'a pu répondre
+        """
+        started: Dict[str, float] = {}
+        streams: Dict[asyncio.Task, Tuple[str, AsyncIterator[str]]] = {}
+
+        def launch(provider: Tuple[str, StreamFactory]) -> None:
+            name, factory = provider
+            iterator = factory()
+            started[name] = time.monotonic()
+            streams[asyncio.ensure_future(iterator.__anext__())] = (name, iterator)
+
+        launch(primary)
+        pending = set(streams)
+        hedged = False
+        winner: Optional[Tuple[asyncio.Task, str, AsyncIterator[str]]] = None
+        last_error: Optional[BaseException] = None
+
+        try:
+            while pending and winner is None:
+                timeout = None if hedged else self.hedge_delay(primary[0])
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    logger.info(
+                        f"Pas de premier token de {primary[0]} après {timeout:.1f} s, "
+                        f"requête de couverture envoyée à {secondary[0]}"
+                    )
+                    hedged = True
+                    launch(secondary)
+                    pending = {task for task in streams if not task.done()}
+                    continue
+
+                for task in done:
+                    name, iterator = streams[task]
+                    if task.exception() is None:
+                        winner = (task, name, iterator)
+                        break
+                    last_error = task.exception()
+                    logger.warning(f"Échec du fournisseur {name} : {str(last_error)}")
+                    if not hedged:
+                        hedged = True
+                        logger.info(f"Bascule sur le fournisseur {secondary[0]}")
+                        launch(secondary)
+                        pending = {task for task in streams if not task.done()}
+        finally:
+            for task, (name, iterator) in streams.items():
+                if winner is None or task is not winner[0]:
+                    if winner is not None and not task.done():
+                        self.tracker(name).record(time.monotonic() - started[name])
+                    await self._cancel(task, iterator)
+
+        if winner is None:
+            if isinstance(last_error, StopAsyncIteration):
+                return
+            raise last_error
+
+        task, name, iterator = winner
+        try:
+            first = task.result()
+        except StopAsyncIteration:
+            return
+        self.tracker(name).record(time.monotonic() - started[name])
+        if hedged:
+            logger.info(f"Réponse retenue : {name}")
+        yield first
+        async for chunk in iterator:
+            yield chunk
+
+    @staticmethod
+    async def _cancel(task: asyncio.Task, iterator: AsyncIterator[str]) -> None:
+        """Annule la requête perdante et ferme son flux (et sa connexion)"""
+        if not task.done():
+            task.cancel()
+            try:
+                await task
+            except BaseException:
+                pass
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            try:
+                await aclose()
+            except Exception:
+                pass
+
+    def failover_stream(
+        self,
+        primary: Tuple[str, SyncStreamFactory],
+        secondary: Tuple[str, SyncStreamFactory]
+    ) -> Iterator[str]:
+        """
+        Version synchrone, sans couverture : bascule sur le fournisseur secondaire
+        si le principal échoue avant son premier token.
+        """
+        providers: List[Tuple[str, SyncStreamFactory]] = [primary, secondary]
+        for index, (name, factory) in enumerate(providers):
+            started = time.monotonic()
+            iterator = factory()
+            try:
+                first = next(iterator)
+            except StopIteration:
+                return
+            except Exception as e:
+                if index == len(providers) - 1:
+                    raise
+                logger.warning(f"Échec du fournisseur {name}, bascule sur {providers[index + 1][0]} : {str(e)}")
+                continue
+            self.tracker(name).record(time.monotonic() - started)
+            yield first
+            yield from iterator
+            return
+
+
+_hedger: Optional[Hedger] = None
+_hedger_lock = threading.Lock()
+
+
+def get_hedger() -> Hedger:
+    """Renvoie le gestionnaire de couverture partagé du processus (délais observés communs)"""
+    global _hedger
+    with _hedger_lock:
+        if _hedger is None:
+            _hedger = Hedger()
+        return _hedger
@@ -0,0 +1,256 @@
+"""
+File de travaux persistante, stockée dans SQLite.
+
+Une évaluation soumise devient un travail : `submit` renvoie aussitôt son
+identifiant, et des processus workers (voir worker.py) l'exécutent puis
+enregistrent le résultat. Le fichier partagé permet de faire varier le nombre de
+workers indépendamment de l'interface et du service HTTP, et les travaux
+survivent aux redémarrages.
+
+Un worker qui réserve un travail obtient un bail (`lease`) qu'il prolonge tant
+qu'il s'exécute. Si le worker meurt, le bail expire et le travail est repris par
+un autre worker, dans la limite de `max_attempts` tentatives.
+"""
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(tempfile.gettempdir(), "llm_jobs.sqlite3")
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+# Durée d'un bail sans prolongation, en secondes
+DEFAULT_LEASE = 60.0
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+class JobNotFound(KeyError):
+    """Aucun travail ne porte cet identifiant"""
+
+
+@dataclass(frozen=True)
+class Job:
+    id: str
+    status: str
+    payload: Dict[str, Any]
+    result: Optional[str]
+    error: Optional[str]
+    attempts: int
+    created_at: float
+    updated_at: float
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Représentation JSON du travail (sans la spécification soumise)"""
+        return {
+            "id": self.id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "attempts": self.attempts,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+
+_COLUMNS = "id, status, payload, result, error, attempts, created_at, updated_at"
+
+
+def _job(row) -> Job:
+    return Job(row[0], row[1], json.loads(row[2]), row[3], row[4], row[5], row[6], row[7])
+
+
+class JobQueue:
+    """File de travaux partagée entre processus par un fichier SQLite"""
+
+    def __init__(self, path: str = DEFAULT_PATH, lease: float = DEFAULT_LEASE, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        """
+        Args:
+            path: Fichier SQLite de la file
+            lease: Durée d'un bail, en secondes : un travail dont le bail expire est repris
+            max_attempts: Nombre maximal d'exécutions d'un travail (reprises après erreur ou arrêt du worker)
+        """
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0, isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    worker TEXT,
+                    lease_until REAL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    @classmethod
+    def from_env(cls) -> "JobQueue":
+        """Lit la configuration depuis LLM_JOBS_PATH, LLM_JOBS_LEASE et LLM_JOBS_MAX_ATTEMPTS"""
+        return cls(
+            path=os.environ.get("LLM_JOBS_PATH") or DEFAULT_PATH,
+            lease=float(os.environ.get("LLM_JOBS_LEASE", DEFAULT_LEASE)),
+            max_attempts=int(os.environ.get("LLM_JOBS_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS))
+        )
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def submit(self, payload: Dict[str, Any]) -> str:
+        """Ajoute un travail à la file et renvoie son identifiant"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(payload, ensure_ascii=False), now, now)
+            )
+        logger.info(f"Travail {job_id} soumis")
+        return job_id
+
+    def get(self, job_id: str) -> Job:
+        """
+        Raises:
+            JobNotFound: Si le travail n'existe pas
+        """
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise JobNotFound(job_id)
+        return _job(row)
+
+    def claim(self, worker: str) -> Optional[Job]:
+        """
+        Réserve le plus ancien travail en attente, ou dont le bail a expiré
+        (worker arrêté en cours d'exécution), pour la durée d'un bail.
+
+        Returns:
+            Le travail réservé, ou None si la file est vide
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            expired = conn.execute(
+                "SELECT id, attempts FROM jobs WHERE status = ? AND lease_until < ?", (RUNNING, now)
+            ).fetchall()
+            for job_id, attempts in expired:
+                if attempts >= self.max_attempts:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, error = ?, worker = NULL, lease_until = NULL, updated_at = ? WHERE id = ?",
+                        (FAILED, f"Abandonné après {attempts} tentative(s) interrompue(s)", now, job_id)
+                    )
+                    logger.error(f"Travail {job_id} abandonné après {attempts} tentative(s)")
+                else:
+                    conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?", (QUEUED, now, job_id))
+                    logger.warning(f"Travail {job_id} repris : bail expiré")
+
+            row = conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, worker = ?, lease_until = ?, updated_at = ? WHERE id = ?",
+                (RUNNING, worker, now + self.lease, now, row[0])
+            )
+        return self.get(row[0])
+
+    def heartbeat(self, job_id: str, worker: str) -> bool:
+        """
+        Prolonge le bail d'un travail en cours.
+
+        Returns:
+            False si le travail n'est plus réservé par ce worker
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_until = ?, updated_at = ? WHERE id = ? AND status = ? AND worker = ?",
+                (now + self.lease, now, job_id, RUNNING, worker)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker: str, result: str) -> None:
+        """Enregistre le résultat d'un travail réservé par ce worker"""
+        self._finish(job_id, worker, DONE, result=result)
+
+    def fail(self, job_id: str, worker: str, error: str, retry: bool = True) -> None:
+        """
+        Enregistre l'échec d'un travail : il est remis en file s'il reste des
+        tentatives et que l'erreur est transitoire (retry), sinon il échoue.
+        """
+        job = self.get(job_id)
+        if retry and job.attempts < self.max_attempts:
+            self._finish(job_id, worker, QUEUED, error=error)
+            logger.warning(f"Travail {job_id} remis en file après l'erreur : {error}")
+        else:
+            self._finish(job_id, worker, FAILED, error=error)
+            logger.error(f"Travail {job_id} en échec : {error}")
+
+    def _finish(self, job_id: str, worker: str, status: str, result: Optional[str] = None, error: Optional[str] = None) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                """UPDATE jobs SET status = ?, result = ?, error = ?, worker = NULL, lease_until = NULL, updated_at = ?
+                   WHERE id = ? AND status = ? AND worker = ?""",
+                (status, result, error, time.time(), job_id, RUNNING, worker)
+            )
+
+    def wait(self, job_id: str, timeout: Optional[float] = None, poll_interval: float = 0.5) -> Job:
+        """Attend la fin d'un travail (ou l'expiration du délai) et le renvoie"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job.finished or (deadline is not None and time.monotonic() >= deadline):
+                return job
+            time.sleep(poll_interval)
+
+    def stats(self) -> Dict[str, int]:
+        """Nombre de travaux par statut"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0, **dict(rows)}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_default_queue: Optional[JobQueue] = None
+_default_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Renvoie la file de travaux partagée du processus, configurée par l'environnement"""
+    global _default_queue
+    with _default_queue_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue.from_env()
+        return _default_queue
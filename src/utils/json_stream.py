@@ -0,0 +1,255 @@
+"""
+Lecture tolérante des réponses JSON des modèles.
+
+`JsonItemParser` extrait les objets d'un tableau au fil du flux, dès que chacun
+se ferme. `repair_json` corrige localement une réponse mal formée (bloc de code
+Markdown, texte autour, virgules en trop, réponse tronquée) plutôt que de
+relancer la génération.
+"""
+import json
+import logging
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_CLOSERS = {"{": "}", "[": "]"}
+# Nombre maximal de points de coupure essayés par repair_json
+MAX_REPAIR_ATTEMPTS = 64
+
+
+def _close(text: str) -> str:
+    """Ferme la chaîne et les conteneurs laissés ouverts, en retirant les virgules pendantes"""
+    output: List[str] = []
+    stack: List[str] = []
+    in_string = escape = False
+    for char in text:
+        if in_string:
+            output.append(char)
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append(_CLOSERS[char])
+        elif char in "}]":
+            while output and output[-1].isspace():
+                output.pop()
+            if output and output[-1] == ",":
+                output.pop()
+            if stack:
+                stack.pop()
+        output.append(char)
+        if not stack and char in "}]":
+            # Le texte qui suit la valeur racine est ignoré
+            break
+
+    if in_string:
+        if escape:
+            output.pop()
+        output.append('"')
+    closed = "".join(output).rstrip()
+    while closed.endswith(","):
+        closed = closed[:-1].rstrip()
+    if closed.endswith(":"):
+        closed += "null"
+    return closed + "".join(reversed(stack))
+
+
+def _root_start(text: str) -> int:
+    starts = [index for index in (text.find("{"), text.find("[")) if index >= 0]
+    return min(starts) if starts else -1
+
+
+def _comma_positions(text: str) -> List[int]:
+    """Positions des virgules hors des chaînes (points de coupure de repair_json)"""
+    positions = []
+    in_string = escape = False
+    for index, char in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == ",":
+            positions.append(index)
+    return positions
+
+
+def repair_json(text: str) -> str:
+    """
+    Corrige localement une réponse JSON mal formée : ignore le texte autour de la
+    valeur racine, retire les virgules pendantes et ferme les chaînes et conteneurs
+    laissés ouverts. Si le dernier élément est inexploitable, il est abandonné.
+
+    Raises:
+        ValueError: Si aucune valeur JSON ne peut être reconstituée
+    """
+    start = _root_start(text)
+    if start < 0:
+        raise ValueError("Aucune valeur JSON dans la réponse")
+    text = text[start:]
+
+    candidates = [text] + [text[:position] for position in reversed(_comma_positions(text))]
+    for candidate in candidates[:MAX_REPAIR_ATTEMPTS]:
+        repaired = _close(candidate)
+        try:
+            json.loads(repaired)
+        except json.JSONDecodeError:
+            continue
+        return repaired
+    raise ValueError("Réponse JSON irréparable")
+
+
+def parse_json(text: str) -> Any:
+    """
+    Décode une réponse JSON, en la réparant localement si nécessaire.
+
+    Raises:
+        ValueError: Si la réponse ne peut pas être réparée
+    """
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        logger.warning(f"Réponse JSON mal formée, réparation locale : {e}")
+        return json.loads(repair_json(text))
+
+
+class JsonItemParser:
+    """
+    Analyseur JSON incrémental : renvoie chaque objet d'un tableau dès sa
+    fermeture, sans attendre la fin de la réponse.
+
+    Le tableau suivi est la valeur de `key` dans l'objet racine, ou la racine
+    elle-même si elle est un tableau. Les objets réparés par close() sont
+    renvoyés comme les autres et listés dans `repaired` : ils peuvent être
+    incomplets.
+    """
+
+    def __init__(self, key: Optional[str] = None):
+        self.key = key
+        self._buffer: List[str] = []
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._expecting_key = False
+        self._last_key: Optional[str] = None
+        self._array_depth: Optional[int] = None
+        self._item_start: Optional[int] = None
+        self._done = False
+        self.repaired: List[Dict[str, Any]] = []
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Ajoute un fragment de la réponse et renvoie les objets complétés par ce fragment"""
+        items = []
+        for char in chunk:
+            if self._done:
+                break
+            position = len(self._buffer)
+            self._buffer.append(char)
+            if self._in_string:
+                self._read_string(char, position)
+                continue
+            if not self._stack and char not in _CLOSERS:
+                # Texte avant la valeur racine (bloc de code Markdown, introduction)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = position
+            elif char in _CLOSERS:
+                self._open(char, position)
+            elif char in "}]":
+                item = self._close_container(position)
+                if item is not None:
+                    items.append(item)
+            elif char == "," and len(self._stack) == 1 and self._stack[0] == "}":
+                self._expecting_key = True
+            elif char == ":":
+                self._expecting_key = False
+        return items
+
+    def _read_string(self, char: str, position: int) -> None:
+        if self._escape:
+            self._escape = False
+        elif char == "\\":
+            self._escape = True
+        elif char == '"':
+            self._in_string = False
+            if self._expecting_key and len(self._stack) == 1:
+                try:
+                    self._last_key = json.loads("".join(self._buffer[self._string_start:position + 1]))
+                except json.JSONDecodeError:
+                    self._last_key = None
+
+    def _open(self, char: str, position: int) -> None:
+        depth = len(self._stack)
+        if char == "[" and self._array_depth is None:
+            # Un tableau racine est accepté même si une clé est attendue
+            at_root = depth == 0
+            at_key = depth == 1 and self._stack[0] == "}" and self._last_key == self.key
+            if at_root or at_key:
+                self._array_depth = depth + 1
+        if char == "{" and self._array_depth is not None and depth == self._array_depth:
+            self._item_start = position
+        self._stack.append(_CLOSERS[char])
+        if depth == 0 and char == "{":
+            self._expecting_key = True
+
+    def _close_container(self, position: int) -> Optional[Dict[str, Any]]:
+        if not self._stack:
+            return None
+        self._stack.pop()
+        depth = len(self._stack)
+        if depth == 0:
+            self._done = True
+        if self._array_depth is not None and depth < self._array_depth:
+            # Fin du tableau suivi : les éléments suivants éventuels sont ignorés
+            self._done = True
+            return None
+        if self._item_start is None or depth != self._array_depth:
+            return None
+
+        text = "".join(self._buffer[self._item_start:position + 1])
+        self._item_start = None
+        try:
+            item = parse_json(text)
+        except ValueError as e:
+            logger.warning(f"Élément JSON ignoré : {e}")
+            return None
+        return item if isinstance(item, dict) else None
+
+    def close(self) -> List[Dict[str, Any]]:
+        """
+        Termine l'analyse : un dernier objet tronqué (réponse interrompue) est
+        réparé localement, ajouté à `repaired` et renvoyé s'il est exploitable.
+        """
+        if self._done or self._item_start is None:
+            return []
+        text = "".join(self._buffer[self._item_start:])
+        self._item_start = None
+        self._done = True
+        try:
+            item = json.loads(repair_json(text))
+        except ValueError:
+            return []
+        if not isinstance(item, dict) or not item:
+            return []
+        logger.info("Dernier élément JSON tronqué réparé localement")
+        self.repaired.append(item)
+        return [item]
+
+    def items(self, chunks) -> Iterator[Dict[str, Any]]:
+        """Analyse un flux de fragments et renvoie les objets au fil de l'eau"""
+        for chunk in chunks:
+            yield from self.feed(chunk)
+        yield from self.close()
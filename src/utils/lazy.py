@@ -0,0 +1,25 @@
+"""
+Import différé des dépendances lourdes (SDK des fournisseurs, client HTTP).
+
+`lazy_import` renvoie un module mandataire : le module réel n'est importé qu'au
+premier accès à l'un de ses attributs, puis chaque accès lui est délégué. Le
+mandataire n'est pas inscrit dans sys.modules : un `mock.patch("openai.OpenAI")`
+reste visible au travers du mandataire.
+"""
+import importlib
+import types
+
+
+class _LazyModule(types.ModuleType):
+    def __getattr__(self, attr: str):
+        # Appelé seulement pour les attributs absents du mandataire ; import_module
+        # est protégé par le verrou d'import et ne charge le module qu'une fois
+        return getattr(importlib.import_module(self.__name__), attr)
+
+    def __dir__(self):
+        return dir(importlib.import_module(self.__name__))
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """Module chargé au premier accès à l'un de ses attributs"""
+    return _LazyModule(name)
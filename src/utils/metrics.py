@@ -0,0 +1,354 @@
+"""
+Métriques des appels aux fournisseurs et des agents, au format d'exposition Prometheus.
+
+Chaque thread incrémente ses propres compteurs et histogrammes (dictionnaires
+locaux au thread) : l'enregistrement ne prend aucun verrou et coûte quelques
+centaines de nanosecondes. Les valeurs des threads ne sont agrégées qu'à la
+lecture (`snapshot`, `render`), au moment de la collecte. Les valeurs d'un
+thread terminé sont reportées dans un registre commun, puis son registre est libéré.
+
+Familles enregistrées :
+
+- `llm_request_duration_seconds` (histogramme) : durée des appels, nouvelles tentatives comprises ;
+- `llm_time_to_first_token_seconds` (histogramme) : délai avant le premier fragment d'un flux ;
+- `llm_request_errors_total` : erreurs des appels, par type d'exception ;
+- `llm_tokens_total` : tokens d'entrée, de sortie, lus et écrits en cache, d'après les `usage` ;
+- `llm_cost_dollars_total` : coût réel des appels, d'après les tokens facturés ;
+- `llm_agent_duration_seconds` (histogramme) et `llm_agent_errors_total` : méthodes des agents.
+"""
+import functools
+import inspect
+import logging
+import math
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+from .tokens import compute_usage_cost
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+Labels = Tuple[Tuple[str, str], ...]
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Bornes des histogrammes de latence, en secondes
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+REQUEST_DURATION = "llm_request_duration_seconds"
+TIME_TO_FIRST_TOKEN = "llm_time_to_first_token_seconds"
+REQUEST_ERRORS = "llm_request_errors_total"
+TOKENS = "llm_tokens_total"
+COST = "llm_cost_dollars_total"
+AGENT_DURATION = "llm_agent_duration_seconds"
+AGENT_ERRORS = "llm_agent_errors_total"
+
+# Type et description de chaque famille, pour l'exposition
+FAMILIES: Dict[str, Tuple[str, str]] = {
+    REQUEST_DURATION: ("histogram", "Durée des appels aux fournisseurs, nouvelles tentatives comprises"),
+    TIME_TO_FIRST_TOKEN: ("histogram", "Délai avant le premier fragment d'une réponse en streaming"),
+    REQUEST_ERRORS: ("counter", "Appels aux fournisseurs en erreur, par type d'exception"),
+    TOKENS: ("counter", "Tokens consommés, d'après le champ usage des réponses"),
+    COST: ("counter", "Coût des appels en dollars, d'après les tokens facturés"),
+    AGENT_DURATION: ("histogram", "Durée des méthodes des agents"),
+    AGENT_ERRORS: ("counter", "Méthodes des agents en erreur, par type d'exception"),
+}
+
+
+class _Shard:
+    """Compteurs et histogrammes d'un thread, modifiés par ce seul thread"""
+    __slots__ = ("counters", "histograms")
+
+    def __init__(self):
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        # Par série : effectif de chaque intervalle (dernier : +Inf), puis la somme des valeurs
+        self.histograms: Dict[Tuple[str, Labels], List[float]] = {}
+
+    def merged(self, other: "_Shard") -> "_Shard":
+        """Nouveau registre cumulant ce registre et `other`"""
+        shard = _Shard()
+        shard.counters = dict(self.counters)
+        shard.histograms = {key: list(series) for key, series in self.histograms.items()}
+        for key, value in other.counters.items():
+            shard.counters[key] = shard.counters.get(key, 0.0) + value
+        for key, series in other.histograms.items():
+            total = shard.histograms.get(key)
+            shard.histograms[key] = list(series) if total is None else [a + b for a, b in zip(total, series)]
+        return shard
+
+
+class _ThreadToken:
+    """Objet local au thread, libéré à la fin du thread : son finaliseur retire le registre du thread"""
+    __slots__ = ("__weakref__",)
+
+
+class Metrics:
+    """Registre de compteurs et d'histogrammes, sans verrou à l'enregistrement"""
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._local = threading.local()
+        # Le premier registre cumule les valeurs des threads terminés
+        self._shards: List[_Shard] = [_Shard()]
+        # Ne protège que l'ajout et le retrait du registre d'un thread
+        self._lock = threading.Lock()
+
+    def _register(self) -> _Shard:
+        """Crée le registre du thread courant, au premier enregistrement"""
+        shard = self._local.shard = _Shard()
+        token = self._local.token = _ThreadToken()
+        weakref.finalize(token, self._retire, shard)
+        with self._lock:
+            self._shards.append(shard)
+        return shard
+
+    def _retire(self, shard: _Shard) -> None:
+        """Reporte les valeurs d'un thread terminé dans le registre commun et libère son registre"""
+        with self._lock:
+            # Remplacement plutôt que modification : une collecte en cours, qui a copié
+            # la liste des registres, ne compte pas deux fois les valeurs reportées
+            self._shards[0] = self._shards[0].merged(shard)
+            self._shards.remove(shard)
+
+    def inc(self, name: str, labels: Labels = (), value: float = 1.0) -> None:
+        """Incrémente un compteur"""
+        try:
+            counters = self._local.shard.counters
+        except AttributeError:
+            counters = self._register().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0.0) + value
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        """Ajoute une observation à un histogramme"""
+        try:
+            histograms = self._local.shard.histograms
+        except AttributeError:
+            histograms = self._register().histograms
+        key = (name, labels)
+        series = histograms.get(key)
+        if series is None:
+            series = histograms[key] = [0.0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def track(self, provider: str, model: str, operation: str) -> "CallTracker":
+        """Mesure un appel au fournisseur : `with metrics.track(...) as call: ...; call.first_token()`"""
+        return CallTracker(self, (("provider", provider), ("model", model), ("operation", operation)))
+
+    def record_usage(
+        self,
+        provider: str,
+        model: Optional[str],
+        input_tokens: int,
+        cache_read_tokens: int,
+        cache_write_tokens: int,
+        output_tokens: int
+    ) -> None:
+        """Enregistre les tokens d'une réponse (input_tokens inclut les tokens lus et écrits en cache) et son coût"""
+        model = model or "unknown"
+        labels = (("provider", provider), ("model", model))
+        for kind, tokens in (
+            ("input", input_tokens), ("output", output_tokens),
+            ("cache_read", cache_read_tokens), ("cache_write", cache_write_tokens)
+        ):
+            if tokens:
+                self.inc(TOKENS, labels + (("kind", kind),), tokens)
+        try:
+            cost = compute_usage_cost(model, input_tokens, output_tokens, cache_read_tokens, cache_write_tokens)
+        except ValueError:
+            # Modèle sans tarif connu : seuls les tokens sont comptés
+            return
+        self.inc(COST, labels, cost)
+
+    def instrument(self, func: F) -> F:
+        """Décorateur mesurant la durée et les erreurs d'une méthode d'agent (synchrone ou asynchrone)"""
+        agent, _, method = func.__qualname__.rpartition(".")
+        labels = (("agent", agent or func.__module__), ("method", method))
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    self.inc(AGENT_ERRORS, labels + (("type", type(e).__name__),))
+                    raise
+                finally:
+                    self.observe(AGENT_DURATION, labels, time.perf_counter() - started)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                self.inc(AGENT_ERRORS, labels + (("type", type(e).__name__),))
+                raise
+            finally:
+                self.observe(AGENT_DURATION, labels, time.perf_counter() - started)
+        return wrapper
+
+    def snapshot(self) -> Tuple[Dict[Tuple[str, Labels], float], Dict[Tuple[str, Labels], List[float]]]:
+        """
+        Agrège les valeurs de tous les threads.
+
+        Returns:
+            Les compteurs, et pour chaque histogramme l'effectif de chaque intervalle suivi de la somme
+        """
+        with self._lock:
+            shards = list(self._shards)
+        counters: Dict[Tuple[str, Labels], float] = {}
+        histograms: Dict[Tuple[str, Labels], List[float]] = {}
+        for shard in shards:
+            # Copies atomiques sous le GIL : le thread propriétaire peut continuer d'écrire
+            for key, value in dict(shard.counters).items():
+                counters[key] = counters.get(key, 0.0) + value
+            for key, series in dict(shard.histograms).items():
+                series = list(series)
+                total = histograms.get(key)
+                histograms[key] = series if total is None else [a + b for a, b in zip(total, series)]
+        return counters, histograms
+
+    def render(self) -> str:
+        """Exposition au format texte de Prometheus (version 0.0.4)"""
+        counters, histograms = self.snapshot()
+        lines: List[str] = []
+        for name, (kind, help_text) in FAMILIES.items():
+            if kind == "counter":
+                series = sorted((labels, value) for (family, labels), value in counters.items() if family == name)
+            else:
+                series = sorted((labels, value) for (family, labels), value in histograms.items() if family == name)
+            if not series:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in series:
+                if kind == "counter":
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                cumulative = 0.0
+                for bound, count in zip(self.buckets + (math.inf,), value):
+                    cumulative += count
+                    bucket_labels = labels + (("le", "+Inf" if bound == math.inf else repr(float(bound))),)
+                    lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {_format_value(cumulative)}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value[-1])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {_format_value(cumulative)}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def reset(self) -> None:
+        with self._lock:
+            for shard in self._shards:
+                shard.counters.clear()
+                shard.histograms.clear()
+
+
+class CallTracker:
+    """Mesure d'un appel au fournisseur : durée, délai du premier fragment et erreur éventuelle"""
+    __slots__ = ("metrics", "labels", "started", "first_token_at")
+
+    def __init__(self, metrics: Metrics, labels: Labels):
+        self.metrics = metrics
+        self.labels = labels
+
+    def __enter__(self) -> "CallTracker":
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        return self
+
+    def first_token(self) -> None:
+        """Signale la réception du premier fragment d'un flux (les suivants sont ignorés)"""
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+            self.metrics.observe(TIME_TO_FIRST_TOKEN, self.labels[:2], self.first_token_at - self.started)
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.metrics.observe(REQUEST_DURATION, self.labels, time.perf_counter() - self.started)
+        if exc_type is not None and issubclass(exc_type, Exception):
+            self.metrics.inc(REQUEST_ERRORS, self.labels + (("type", exc_type.__name__),))
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def format_gauges(prefix: str, stats: Dict[str, Any], help_text: str) -> str:
+    """
+    Expose les valeurs numériques d'un dictionnaire de statistiques (ex. `stats()` du
+    cache, de la file de travaux ou du contrôle d'admission) comme des jauges `<prefix>_<clé>`.
+    """
+    lines: List[str] = []
+    for key, value in stats.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        name = f"{prefix}_{key}"
+        lines += [f"# HELP {name} {help_text} : {key}", f"# TYPE {name} gauge", f"{name} {_format_value(value)}"]
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1", collect: Optional[Callable[[], str]] = None):
+    """
+    Expose les métriques à l'adresse http://<host>:<port>/metrics, depuis un thread
+    démon (processus sans serveur HTTP propre : interface Gradio, workers).
+
+    Args:
+        port: Port d'écoute
+        host: Adresse d'écoute (boucle locale par défaut ; "0.0.0.0" pour une collecte distante)
+        collect: Fonction renvoyant l'exposition (par défaut celle du registre partagé)
+
+    Returns:
+        Le serveur démarré (`shutdown()` pour l'arrêter)
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    collect = collect or get_metrics().render
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = collect().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"Métriques exposées sur http://{host}:{server.server_port}/metrics")
+    return server
+
+
+_default_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """Renvoie le registre de métriques partagé du processus"""
+    return _default_metrics
+
+
+def instrument(func: F) -> F:
+    """Décorateur `Metrics.instrument` du registre partagé"""
+    return _default_metrics.instrument(func)
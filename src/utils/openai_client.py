@@ -1,25 +1,74 @@
-import openai
 import os
-from typing import Optional, Literal
+from abc import ABC, abstractmethod
+from typing import Optional, Literal, Dict, Any, Iterator, AsyncIterator, List, Tuple, Union
 import logging
 from functools import lru_cache
+from .cache import ResponseCache, get_default_cache, make_cache_key
+from .tokens import compute_cost, content_text, get_token_counter
+from .resilience import Resilience
+from .rate_limiter import RateLimiter, Slot, estimate_request_tokens, get_rate_limiter
+from .single_flight import get_async_single_flight, get_single_flight
+from .usage import get_usage_stats
+from .metrics import get_metrics
+from .json_stream import parse_json
+from .lazy import lazy_import
+
+openai = lazy_import("openai")
 
 logger = logging.getLogger(__name__)
 
-class OpenAIClient:
-    MODELS = Literal["gpt-4o-mini", "gpt-4o"]
+OpenAIModel = Literal["gpt-4o-mini", "gpt-4o"]
+# Les blocs de contenu (format Anthropic) sont aplatis : le cache de prompts d'OpenAI est
+# automatique et porte sur le plus long préfixe commun des messages
+Prompt = Union[str, List[Dict[str, Any]]]
+# Le dernier chunk d'un flux porte l'usage de la requête (tokens lus en cache compris)
+STREAM_OPTIONS = {"include_usage": True}
+# Mode JSON : la réponse est un objet JSON valide (le prompt doit mentionner « JSON »)
+JSON_OBJECT = {"type": "json_object"}
+
+
+def json_schema_format(name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Format de réponse imposant un schéma JSON (sorties structurées strictes)"""
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+
+class _OpenAIClientBase(ABC):
+    """Configuration et logique communes aux clients OpenAI synchrone et asynchrone"""
+    MODELS = OpenAIModel
 
-    def __init__(self, default_model: MODELS = "gpt-4o-mini"):
+    def __init__(
+        self,
+        default_model: MODELS = "gpt-4o-mini",
+        cache: Optional[ResponseCache] = None,
+        http_client=None,
+        resilience: Optional[Resilience] = None,
+        rate_limiter: Optional[RateLimiter] = None
+    ):
         """Initialise le client OpenAI avec gestion des erreurs et support des modèles GPT-4o mini et GPT-4o
 
         Args:
             default_model: Le modèle OpenAI à utiliser par défaut (gpt-4o-mini ou gpt-4o)
+            cache: Cache de réponses à utiliser (cache partagé du processus si non spécifié)
+            http_client: Client HTTP (pool de connexions) à utiliser par le SDK
+            resilience: Politique de nouvelles tentatives et disjoncteur (disjoncteur partagé "openai" par défaut)
+            rate_limiter: Limiteur de débit RPM/TPM (limiteur partagé "openai" s'il est configuré)
         """
         self.api_key = self._get_api_key()
-        self.client = openai.OpenAI(api_key=self.api_key)
+        self.resilience = resilience or Resilience("openai")
+        self.rate_limiter = rate_limiter if rate_limiter is not None else get_rate_limiter("openai")
+        self.client = self._create_client(http_client)
         self.default_model = default_model
+        self.cache = cache if cache is not None else get_default_cache()
+        # Les requêtes identiques simultanées partagent un seul appel au fournisseur
+        self.single_flight = get_single_flight()
+        self.async_single_flight = get_async_single_flight()
+        self.usage_stats = get_usage_stats()
+        self.metrics = get_metrics()
         logger.info(f"Client OpenAI initialisé avec succès (modèle par défaut: {default_model})")
 
+    @abstractmethod
+    def _create_client(self, http_client=None):
+        """Crée le client du SDK (synchrone ou asynchrone)"""
+
     @staticmethod
     @lru_cache(maxsize=1)
     def _get_api_key() -> str:
@@ -29,7 +78,148 @@ class OpenAIClient:
             raise ValueError("OPENAI_API_KEY manquant dans les variables d'environnement")
         return api_key
 
-    def generate(self, prompt: str, system_prompt: Optional[str] = None, model: Optional[MODELS] = None) -> str:
+    def _prepare_request(
+        self,
+        prompt: Prompt,
+        system_prompt: Optional[str],
+        model: Optional[MODELS],
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Construit les paramètres de la requête et la clé de cache associée (prompt système en tête, pour le cache de préfixe)"""
+        prompt = content_text(prompt)
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+
+        selected_model = model or self.default_model
+        max_tokens = self._max_tokens(selected_model)
+
+        params = {"model": selected_model, "messages": messages, "max_tokens": max_tokens}
+        if response_format is not None:
+            params["response_format"] = response_format
+        return {
+            "params": params,
+            "cache_key": make_cache_key(selected_model, system_prompt, prompt, max_tokens, response_format)
+        }
+
+    @staticmethod
+    def _max_tokens(model: str) -> int:
+        return 4096 if model == "gpt-4o" else 2048  # GPT-4o mini a une limite de 2048 tokens
+
+    def _get_cached(self, request: Dict[str, Any]) -> Optional[str]:
+        if self.cache is None:
+            return None
+        cached = self.cache.get(request["cache_key"])
+        if cached is not None:
+            logger.info(f"Réponse servie depuis le cache (modèle: {request['params']['model']})")
+        return cached
+
+    def _extract_content(self, response, request: Dict[str, Any]) -> str:
+        """Extrait le texte de la réponse et l'enregistre dans le cache"""
+        if not response.choices:
+            raise ValueError("Aucune réponse générée")
+
+        content = response.choices[0].message.content
+        self.usage_stats.record_openai(getattr(response, "usage", None), request["params"]["model"])
+        self._store(request, content)
+        return content
+
+    def _store(self, request: Dict[str, Any], content: Optional[str]) -> None:
+        if self.cache is not None and content:
+            self.cache.set(request["cache_key"], content)
+
+    @staticmethod
+    def _usage_tokens(response) -> Optional[int]:
+        """Tokens réellement consommés d'après la réponse ou le dernier chunk d'un flux (include_usage)"""
+        total = getattr(getattr(response, "usage", None), "total_tokens", None)
+        return total if isinstance(total, int) else None
+
+    def _send(self, request: Dict[str, Any], func):
+        """Envoie la requête via le limiteur de débit (s'il est configuré) et la politique de résilience"""
+        if self.rate_limiter is None:
+            return self.resilience.call(func)
+        tokens = estimate_request_tokens(request["params"])
+        max_tokens = request["params"].get("max_tokens")
+        return self.resilience.call(lambda: self.rate_limiter.call(func, tokens, self._usage_tokens, max_tokens))
+
+    async def _asend(self, request: Dict[str, Any], func):
+        """Version asynchrone de _send"""
+        if self.rate_limiter is None:
+            return await self.resilience.acall(func)
+        tokens = estimate_request_tokens(request["params"])
+        max_tokens = request["params"].get("max_tokens")
+        return await self.resilience.acall(
+            lambda: self.rate_limiter.acall(func, tokens, self._usage_tokens, max_tokens)
+        )
+
+    def _send_stream(self, request: Dict[str, Any], func) -> Tuple[Any, Optional[Slot]]:
+        """
+        Ouvre un flux comme _send, mais la place du limiteur reste acquise jusqu'à la
+        fin du flux : l'appelant la libère avec l'usage final (Slot.release).
+        """
+        if self.rate_limiter is None:
+            return self.resilience.call(func), None
+        tokens = estimate_request_tokens(request["params"])
+        max_tokens = request["params"].get("max_tokens")
+        return self.resilience.call(lambda: self.rate_limiter.open(func, tokens, max_tokens))
+
+    async def _asend_stream(self, request: Dict[str, Any], func) -> Tuple[Any, Optional[Slot]]:
+        """Version asynchrone de _send_stream"""
+        if self.rate_limiter is None:
+            return await self.resilience.acall(func), None
+        tokens = estimate_request_tokens(request["params"])
+        max_tokens = request["params"].get("max_tokens")
+        return await self.resilience.acall(lambda: self.rate_limiter.aopen(func, tokens, max_tokens))
+
+    @staticmethod
+    def _chunk_text(chunk) -> Optional[str]:
+        """Extrait le fragment de texte d'un chunk de streaming"""
+        if not chunk.choices:
+            return None
+        return chunk.choices[0].delta.content
+
+    @classmethod
+    def get_available_models(cls) -> list[MODELS]:
+        """Renvoie la liste des modèles disponibles"""
+        return list(cls.MODELS.__args__)
+
+    def count_tokens(self, prompt: Prompt, system_prompt: Optional[str] = None, model: Optional[MODELS] = None) -> int:
+        """Renvoie le nombre de tokens d'entrée de la requête (prompts et enveloppe des messages)"""
+        return get_token_counter(model or self.default_model).count_messages(content_text(prompt), system_prompt)
+
+    def estimate_cost(
+        self,
+        prompt: Prompt,
+        system_prompt: Optional[str] = None,
+        model: Optional[MODELS] = None,
+        expected_output_tokens: Optional[int] = None
+    ) -> float:
+        """
+        Estime le coût de la génération en fonction du modèle et du nombre de tokens.
+
+        Args:
+            prompt: Le prompt principal
+            system_prompt: Le prompt système optionnel
+            model: Le modèle à utiliser (gpt-4o-mini ou gpt-4o, utilise le modèle par défaut si non spécifié)
+            expected_output_tokens: Nombre de tokens de sortie attendu (par défaut la limite max_tokens du modèle,
+                ce qui donne une borne supérieure)
+
+        Returns:
+            Le coût estimé en dollars
+        """
+        selected_model = model or self.default_model
+        input_tokens = self.count_tokens(prompt, system_prompt, selected_model)
+        if expected_output_tokens is None:
+            expected_output_tokens = self._max_tokens(selected_model)
+        return compute_cost(selected_model, input_tokens, expected_output_tokens)
+
+
+class OpenAIClient(_OpenAIClientBase):
+    def _create_client(self, http_client=None) -> "openai.OpenAI":
+        return openai.OpenAI(api_key=self.api_key, http_client=http_client, max_retries=0)
+
+    def generate(self, prompt: Prompt, system_prompt: Optional[str] = None, model: Optional[OpenAIModel] = None, response_format: Optional[Dict[str, Any]] = None) -> str:
         """
         Génère une réponse à partir du modèle GPT spécifié avec gestion robuste des erreurs.
 
@@ -37,65 +227,183 @@ class OpenAIClient:
             prompt: Le prompt principal
             system_prompt: Le prompt système optionnel
             model: Le modèle à utiliser (gpt-4o-mini ou gpt-4o, utilise le modèle par défaut si non spécifié)
+            response_format: Format de réponse imposé (JSON_OBJECT ou json_schema_format(...))
 
         Returns:
             La réponse générée par le modèle
         """
         try:
-            messages = []
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            messages.append({"role": "user", "content": prompt})
-
-            selected_model = model or self.default_model
-            max_tokens = 4096 if selected_model == "gpt-4o" else 2048  # GPT-4o mini a une limite de 2048 tokens
-
-            response = self.client.chat.completions.create(
-                model=selected_model,
-                messages=messages,
-                max_tokens=max_tokens
+            request = self._prepare_request(prompt, system_prompt, model, response_format)
+            cached = self._get_cached(request)
+            if cached is not None:
+                return cached
+
+            return self.single_flight.do(request["cache_key"], lambda: self._create(request))
+
+        except openai.APIError as e:
+            logger.error(f"Erreur API OpenAI : {str(e)}")
+            raise
+        except Exception as e:
+            logger.error(f"Erreur inattendue lors de la génération : {str(e)}")
+            raise
+
+    def _create(self, request: Dict[str, Any]) -> str:
+        with self.metrics.track("openai", request["params"]["model"], "generate"):
+            return self._extract_content(
+                self._send(request, lambda: self.client.chat.completions.create(**request["params"])), request
             )
 
-            if not response.choices:
-                raise ValueError("Aucune réponse générée")
+    def generate_json(
+        self,
+        prompt: Prompt,
+        system_prompt: Optional[str] = None,
+        model: Optional[OpenAIModel] = None,
+        response_format: Dict[str, Any] = JSON_OBJECT
+    ) -> Any:
+        """
+        Génère une réponse JSON (mode JSON ou schéma imposé) et la décode. Une réponse
+        mal formée ou tronquée est réparée localement, sans nouvel appel au modèle.
 
-            return response.choices[0].message.content
+        Raises:
+            ValueError: Si la réponse ne peut pas être réparée
+        """
+        return parse_json(self.generate(prompt, system_prompt, model, response_format))
+
+    def generate_stream(self, prompt: Prompt, system_prompt: Optional[str] = None, model: Optional[OpenAIModel] = None, response_format: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """
+        Génère une réponse en streaming : les fragments de texte sont renvoyés dès leur réception.
+        La réponse complète est enregistrée dans le cache à la fin du flux.
 
+        Args:
+            prompt: Le prompt principal
+            system_prompt: Le prompt système optionnel
+            model: Le modèle à utiliser (gpt-4o-mini ou gpt-4o, utilise le modèle par défaut si non spécifié)
+            response_format: Format de réponse imposé (JSON_OBJECT ou json_schema_format(...))
+
+        Yields:
+            Les fragments successifs de la réponse
+        """
+        request = self._prepare_request(prompt, system_prompt, model, response_format)
+        cached = self._get_cached(request)
+        if cached is not None:
+            yield cached
+            return
+
+        yield from self.single_flight.stream(request["cache_key"], lambda: self._stream(request))
+
+    def _stream(self, request: Dict[str, Any]) -> Iterator[str]:
+        chunks = []
+        slot, used = None, None
+        try:
+            with self.metrics.track("openai", request["params"]["model"], "stream") as call:
+                stream, slot = self._send_stream(request, lambda: self.client.chat.completions.create(
+                    **request["params"], stream=True, stream_options=STREAM_OPTIONS
+                ))
+                for chunk in stream:
+                    self.usage_stats.record_openai(getattr(chunk, "usage", None), request["params"]["model"])
+                    used = self._usage_tokens(chunk) or used
+                    text = self._chunk_text(chunk)
+                    if text:
+                        call.first_token()
+                        chunks.append(text)
+                        yield text
         except openai.APIError as e:
             logger.error(f"Erreur API OpenAI : {str(e)}")
             raise
         except Exception as e:
             logger.error(f"Erreur inattendue lors de la génération : {str(e)}")
             raise
+        finally:
+            if slot is not None:
+                slot.release(used)
 
-    @classmethod
-    def get_available_models(cls) -> list[MODELS]:
-        """Renvoie la liste des modèles disponibles"""
-        return list(cls.MODELS.__args__)
+        self._store(request, "".join(chunks))
+
+
+class AsyncOpenAIClient(_OpenAIClientBase):
+    """Client OpenAI asynchrone, basé sur openai.AsyncOpenAI"""
 
-    def estimate_cost(self, prompt: str, system_prompt: Optional[str] = None, model: Optional[MODELS] = None) -> float:
+    def _create_client(self, http_client=None) -> "openai.AsyncOpenAI":
+        return openai.AsyncOpenAI(api_key=self.api_key, http_client=http_client, max_retries=0)
+
+    async def agenerate(self, prompt: Prompt, system_prompt: Optional[str] = None, model: Optional[OpenAIModel] = None, response_format: Optional[Dict[str, Any]] = None) -> str:
         """
-        Estime le coût de la génération en fonction du modèle et du nombre de tokens.
+        Version asynchrone de OpenAIClient.generate.
 
         Args:
             prompt: Le prompt principal
             system_prompt: Le prompt système optionnel
             model: Le modèle à utiliser (gpt-4o-mini ou gpt-4o, utilise le modèle par défaut si non spécifié)
+            response_format: Format de réponse imposé (JSON_OBJECT ou json_schema_format(...))
 
         Returns:
-            Le coût estimé en dollars
+            La réponse générée par le modèle
         """
-        selected_model = model or self.default_model
-        total_tokens = len(prompt.split()) + (len(system_prompt.split()) if system_prompt else 0)
+        try:
+            request = self._prepare_request(prompt, system_prompt, model, response_format)
+            cached = self._get_cached(request)
+            if cached is not None:
+                return cached
+
+            async def send():
+                with self.metrics.track("openai", request["params"]["model"], "generate"):
+                    response = await self._asend(request, lambda: self.client.chat.completions.create(**request["params"]))
+                    return self._extract_content(response, request)
+
+            return await self.async_single_flight.do(request["cache_key"], send)
+
+        except openai.APIError as e:
+            logger.error(f"Erreur API OpenAI : {str(e)}")
+            raise
+        except Exception as e:
+            logger.error(f"Erreur inattendue lors de la génération : {str(e)}")
+            raise
 
-        if selected_model == "gpt-4o-mini":
-            input_cost = 0.15 / 1_000_000  # $0.15 par million de tokens en entrée
-            output_cost = 0.60 / 1_000_000  # $0.60 par million de tokens en sortie
-        else:  # gpt-4o
-            input_cost = 2.50 / 1_000_000  # $2.50 par million de tokens en entrée
-            output_cost = 10.0 / 1_000_000  # $10.00 par million de tokens en sortie
+    async def agenerate_json(
+        self,
+        prompt: Prompt,
+        system_prompt: Optional[str] = None,
+        model: Optional[OpenAIModel] = None,
+        response_format: Dict[str, Any] = JSON_OBJECT
+    ) -> Any:
+        """Version asynchrone de OpenAIClient.generate_json"""
+        return parse_json(await self.agenerate(prompt, system_prompt, model, response_format))
 
-        estimated_input_cost = total_tokens * input_cost
-        estimated_output_cost = total_tokens * output_cost  # Estimation grossière, peut varier
+    async def agenerate_stream(self, prompt: Prompt, system_prompt: Optional[str] = None, model: Optional[OpenAIModel] = None, response_format: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """Version asynchrone de OpenAIClient.generate_stream"""
+        request = self._prepare_request(prompt, system_prompt, model, response_format)
+        cached = self._get_cached(request)
+        if cached is not None:
+            yield cached
+            return
+
+        async for chunk in self.async_single_flight.stream(request["cache_key"], lambda: self._astream(request)):
+            yield chunk
+
+    async def _astream(self, request: Dict[str, Any]) -> AsyncIterator[str]:
+        chunks = []
+        slot, used = None, None
+        try:
+            with self.metrics.track("openai", request["params"]["model"], "stream") as call:
+                stream, slot = await self._asend_stream(request, lambda: self.client.chat.completions.create(
+                    **request["params"], stream=True, stream_options=STREAM_OPTIONS
+                ))
+                async for chunk in stream:
+                    self.usage_stats.record_openai(getattr(chunk, "usage", None), request["params"]["model"])
+                    used = self._usage_tokens(chunk) or used
+                    text = self._chunk_text(chunk)
+                    if text:
+                        call.first_token()
+                        chunks.append(text)
+                        yield text
+        except openai.APIError as e:
+            logger.error(f"Erreur API OpenAI : {str(e)}")
+            raise
+        except Exception as e:
+            logger.error(f"Erreur inattendue lors de la génération : {str(e)}")
+            raise
+        finally:
+            if slot is not None:
+                await slot.arelease(used)
 
-        return estimated_input_cost + estimated_output_cost
+        self._store(request, "".join(chunks))
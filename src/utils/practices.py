@@ -0,0 +1,268 @@
+"""
+Catalogue local de bonnes pratiques.
+
+Les pratiques sont indexées par technologie, domaine et tag (index inversés). Les
+intersections technologie × domaine, le motif de requête le plus fréquent, sont
+précalculées au chargement. Le fichier est compact : les valeurs des trois champs
+indexés sont internées dans un vocabulaire et chaque pratique est une ligne
+[titre, description, source, technologies, domaines, tags] d'indices.
+"""
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "data", "bonnes_pratiques.json")
+INDEXED_FIELDS = ("technologies", "domaines", "tags")
+
+# Poids du classement : domaine demandé, tag correspondant à une contrainte, technologie demandée
+DOMAIN_WEIGHT = 2.0
+TAG_WEIGHT = 3.0
+TECHNOLOGY_WEIGHT = 1.0
+# Longueur maximale d'un nom court (Go, R, C), repéré dans un texte libre avec sa casse exacte
+SHORT_LABEL_LENGTH = 2
+
+
+def normalize_key(value: Any) -> str:
+    """Clé d'index : minuscules, sans accents, espaces réduits"""
+    text = unicodedata.normalize("NFKD", str(value).lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(text.split())
+
+
+def _copy(practice: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: list(value) if isinstance(value, list) else value for key, value in practice.items()}
+
+
+def _as_list(value: Any) -> List[str]:
+    if not value:
+        return []
+    values = value if isinstance(value, list) else [value]
+    return [str(item).strip() for item in values if str(item).strip()]
+
+
+class PracticesCatalog:
+    """Catalogue de bonnes pratiques en mémoire, avec index inversés et recherche classée"""
+
+    def __init__(self, practices: Iterable[Dict[str, Any]] = (), path: Optional[str] = None):
+        """
+        Args:
+            practices: Les pratiques initiales
+            path: Fichier où persist() enregistre le catalogue enrichi (aucun si non spécifié)
+        """
+        self.path = path
+        self._practices: List[Dict[str, Any]] = []
+        self._keys: Set[Tuple[str, str]] = set()
+        self._index: Dict[str, Dict[str, Set[int]]] = {field: defaultdict(set) for field in INDEXED_FIELDS}
+        self._by_technology_domain: Dict[Tuple[str, str], Set[int]] = defaultdict(set)
+        # Libellé d'origine de chaque clé d'index, pour mentions()
+        self._labels: Dict[str, Dict[str, str]] = {field: {} for field in INDEXED_FIELDS}
+        self._lock = threading.Lock()
+        self.add(practices)
+
+    @classmethod
+    def load(cls, path: str) -> "PracticesCatalog":
+        """Charge un catalogue au format compact"""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        vocabulary = data["vocabulaire"]
+        practices = [
+            {
+                "titre": titre,
+                "description": description,
+                "source": source,
+                **{field: [vocabulary[field][i] for i in ids] for field, ids in zip(INDEXED_FIELDS, indexes)}
+            }
+            for titre, description, source, *indexes in data["pratiques"]
+        ]
+        catalog = cls(practices)
+        logger.info(f"Catalogue de bonnes pratiques chargé : {len(catalog)} pratique(s)")
+        return catalog
+
+    def save(self, path: str) -> None:
+        """Enregistre le catalogue au format compact"""
+        with self._lock:
+            practices = list(self._practices)
+
+        vocabulary: Dict[str, Dict[str, int]] = {field: {} for field in INDEXED_FIELDS}
+        rows = []
+        for practice in practices:
+            indexes = [
+                [vocabulary[field].setdefault(value, len(vocabulary[field])) for value in practice[field]]
+                for field in INDEXED_FIELDS
+            ]
+            rows.append([practice["titre"], practice["description"], practice.get("source", ""), *indexes])
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Un fichier temporaire propre à chaque écriture : deux écrivains simultanés
+        # (threads ou processus) ne se partagent jamais un fichier à moitié écrit
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp", delete=False
+        ) as f:
+            temporary = f.name
+            try:
+                json.dump(
+                    {"version": 1, "vocabulaire": {field: list(values) for field, values in vocabulary.items()}, "pratiques": rows},
+                    f, ensure_ascii=False, separators=(",", ":")
+                )
+            except BaseException:
+                f.close()
+                os.unlink(temporary)
+                raise
+        os.replace(temporary, path)
+
+    def persist(self) -> None:
+        """Enregistre le catalogue dans son fichier de persistance, s'il en a un"""
+        if self.path:
+            self.save(self.path)
+
+    def __len__(self) -> int:
+        return len(self._practices)
+
+    def practices(self) -> List[Dict[str, Any]]:
+        """Copie de toutes les pratiques du catalogue"""
+        with self._lock:
+            return [_copy(practice) for practice in self._practices]
+
+    def add(self, practices: Iterable[Dict[str, Any]], domaine: Optional[str] = None) -> int:
+        """
+        Ajoute des pratiques au catalogue (les doublons de titre et de technologies sont ignorés).
+
+        Args:
+            practices: Les pratiques (titre, description, source, technologies, domaines, tags)
+            domaine: Domaine à associer aux pratiques, en plus des leurs (ex. celui de la requête)
+
+        Returns:
+            Le nombre de pratiques ajoutées
+        """
+        added = 0
+        with self._lock:
+            for practice in practices:
+                if not isinstance(practice, dict) or not str(practice.get("titre", "")).strip():
+                    continue
+                entry = {
+                    "titre": str(practice["titre"]).strip(),
+                    "description": str(practice.get("description", "")).strip(),
+                    "source": str(practice.get("source", "")).strip(),
+                    **{field: _as_list(practice.get(field)) for field in INDEXED_FIELDS}
+                }
+                if domaine and normalize_key(domaine) not in {normalize_key(d) for d in entry["domaines"]}:
+                    entry["domaines"].append(domaine)
+                key = (normalize_key(entry["titre"]), ",".join(sorted(normalize_key(t) for t in entry["technologies"])))
+                if key in self._keys:
+                    continue
+                self._keys.add(key)
+                self._index_practice(len(self._practices), entry)
+                self._practices.append(entry)
+                added += 1
+        return added
+
+    def _index_practice(self, practice_id: int, practice: Dict[str, Any]) -> None:
+        for field in INDEXED_FIELDS:
+            for value in practice[field]:
+                self._index[field][normalize_key(value)].add(practice_id)
+                self._labels[field].setdefault(normalize_key(value), value)
+        for technology in practice["technologies"]:
+            for domaine in practice["domaines"]:
+                self._by_technology_domain[(normalize_key(technology), normalize_key(domaine))].add(practice_id)
+
+    def _matching_tags(self, contraintes: List[str]) -> Dict[str, Set[int]]:
+        """Tags correspondant aux contraintes : égalité, ou suite de mots contenue dans la contrainte"""
+        matches = {}
+        for contrainte in contraintes:
+            padded = f" {normalize_key(contrainte)} "
+            for tag, ids in self._index["tags"].items():
+                if f" {tag} " in padded:
+                    matches[tag] = ids
+        return matches
+
+    def mentions(self, field: str, text: str) -> List[str]:
+        """
+        Valeurs connues d'un champ indexé (ex. les technologies) citées dans un texte libre,
+        en mots entiers et sans tenir compte de la casse ni des accents. Les noms courts
+        (Go, R) sont repérés avec leur casse exacte, et une valeur précédée d'un nombre
+        est une unité (« 10 Go »), pas une mention.
+        """
+        normalized = normalize_key(text)
+        with self._lock:
+            labels = list(self._labels[field].items())
+        found = []
+        for key, label in labels:
+            haystack, needle = (text, label) if len(key) <= SHORT_LABEL_LENGTH else (normalized, key)
+            if re.search(rf"(?<!\w)(?<!\d\s){re.escape(needle)}(?!\w)", haystack):
+                found.append(label)
+        return found
+
+    def missing_technologies(self, technologies: List[str], domaine: str) -> List[str]:
+        """Technologies demandées sans aucune pratique du domaine dans le catalogue"""
+        domain_key = normalize_key(domaine)
+        with self._lock:
+            return [t for t in _as_list(technologies) if not self._by_technology_domain.get((normalize_key(t), domain_key))]
+
+    def search(
+        self,
+        technologies: List[str],
+        domaine: str,
+        contraintes: List[str],
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Recherche classée : les pratiques d'au moins une des technologies demandées
+        (toutes si aucune n'est précisée) qui relèvent du domaine ou d'une contrainte.
+
+        Returns:
+            Les pratiques, de la plus pertinente à la moins pertinente
+        """
+        technology_keys = [normalize_key(t) for t in _as_list(technologies)]
+        domain_key = normalize_key(domaine)
+        with self._lock:
+            tags = self._matching_tags(_as_list(contraintes))
+            in_domain = self._index["domaines"].get(domain_key, set())
+            with_tags = set().union(*tags.values()) if tags else set()
+
+            if technology_keys:
+                in_technologies = set().union(*(self._index["technologies"].get(key, set()) for key in technology_keys))
+                candidates = set().union(*(self._by_technology_domain.get((key, domain_key), set()) for key in technology_keys))
+                candidates |= in_technologies & with_tags
+            else:
+                candidates = in_domain | with_tags
+
+            def score(practice_id: int) -> Tuple[float, int]:
+                value = DOMAIN_WEIGHT if practice_id in in_domain else 0.0
+                value += TAG_WEIGHT * sum(practice_id in ids for ids in tags.values())
+                value += TECHNOLOGY_WEIGHT * sum(
+                    practice_id in self._index["technologies"].get(key, ()) for key in technology_keys
+                )
+                return -value, practice_id
+
+            ranked = sorted(candidates, key=score)[:limit]
+            return [_copy(self._practices[practice_id]) for practice_id in ranked]
+
+
+_default_catalog: Optional[PracticesCatalog] = None
+_default_catalog_lock = threading.Lock()
+
+
+def get_practices_catalog() -> PracticesCatalog:
+    """
+    Renvoie le catalogue partagé, chargé au premier appel depuis le fichier livré,
+    complété des pratiques apprises enregistrées dans LLM_PRACTICES_PATH.
+    """
+    global _default_catalog
+    with _default_catalog_lock:
+        if _default_catalog is None:
+            catalog = PracticesCatalog.load(DEFAULT_PATH)
+            learned_path = os.environ.get("LLM_PRACTICES_PATH")
+            if learned_path and os.path.exists(learned_path):
+                catalog.add(PracticesCatalog.load(learned_path).practices())
+            catalog.path = learned_path or None
+            _default_catalog = catalog
+        return _default_catalog
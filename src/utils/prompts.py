@@ -0,0 +1,304 @@
+"""
+Modèles de prompts partagés par le pipeline et les agents.
+
+Les modèles sont dédentés et compilés une seule fois à l'import. Chacun a un
+budget de tokens d'entrée : lorsque le prompt rendu le dépasse, les champs les
+plus volumineux sont réduits en premier. Dans un champ, le budget est réparti
+entre ses sections (titre suivi d'éléments de liste) : chaque section réduite
+garde ses premiers éléments et indique le nombre d'éléments omis.
+"""
+import inspect
+import logging
+import re
+from string import Template
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .tokens import get_token_counter
+
+logger = logging.getLogger(__name__)
+
+# Taille minimale (en tokens) en dessous de laquelle un champ n'est plus réduit
+MIN_FIELD_TOKENS = 32
+# Élément de liste (puce, case à cocher, numéro) ou ligne de continuation indentée
+_LIST_ITEM = re.compile(r"^(?:\s+\S|[-*+] |\d+[.)] )")
+
+
+def _as_lines(value: Union[str, List[Any], None]) -> List[str]:
+    if value is None:
+        return []
+    lines = value if isinstance(value, list) else str(value).split("\n")
+    return [str(line).strip() for line in lines if str(line).strip()]
+
+
+def serialize_spec(spec: Dict[str, Any]) -> str:
+    """
+    Sérialisation compacte et canonique d'une spécification : titre, description,
+    puis une liste à puces par section. Accepte la spécification du formulaire
+    (title, description, sections) comme celle des agents (titre, description,
+    exigences, contraintes).
+    """
+    title = spec.get("title") or spec.get("titre")
+    description = spec.get("description")
+    sections = [(section.get("title", ""), section.get("content")) for section in spec.get("sections") or []]
+    for key, label in (("exigences", "Exigences"), ("contraintes", "Contraintes")):
+        if key in spec:
+            sections.append((label, spec[key]))
+
+    lines = []
+    if title:
+        lines.append(f"Titre : {str(title).strip()}")
+    if description:
+        lines.append(f"Description : {' '.join(str(description).split())}")
+    for label, content in sections:
+        items = _as_lines(content)
+        if items:
+            lines.append(f"{label} :")
+            lines += [f"- {item}" for item in items]
+    return "\n".join(lines)
+
+
+def _sections(text: str) -> List[Tuple[Optional[str], List[str]]]:
+    """Découpe un texte en sections : une ligne de titre (None en tête de texte) et ses éléments de liste"""
+    sections: List[Tuple[Optional[str], List[str]]] = []
+    for line in text.split("\n"):
+        if _LIST_ITEM.match(line):
+            if not sections:
+                sections.append((None, []))
+            sections[-1][1].append(line)
+        else:
+            sections.append((line, []))
+    return sections
+
+
+def _join_section(header: Optional[str], items: List[str]) -> str:
+    return "\n".join(([header] if header is not None else []) + items)
+
+
+def _shrink_section(header: Optional[str], items: List[str], target: int, counter) -> str:
+    """Conserve les premiers éléments de la section qui tiennent dans `target` tokens, suivis d'une marque d'omission"""
+    if not items:
+        return _shrink_words(header or "", target, counter)
+
+    def keep(count: int) -> str:
+        return _join_section(header, items[:count] + [f"[… {len(items) - count} élément(s) omis]"])
+
+    low, high = 0, len(items) - 1
+    while low < high:
+        middle = (low + high + 1) // 2
+        if counter.count(keep(middle)) <= target:
+            low = middle
+        else:
+            high = middle - 1
+    return keep(low)
+
+
+def _shrink(text: str, target: int, counter) -> str:
+    """
+    Réduit un texte à au plus `target` tokens (marques d'omission comprises). Le
+    budget est réparti entre les sections : les plus petites sont conservées
+    entières, les plus volumineuses perdent leurs derniers éléments.
+    """
+    sections = _sections(text)
+    if any(items for _, items in sections):
+        sizes = {index: counter.count(_join_section(*section)) for index, section in enumerate(sections)}
+        caps = _caps(sizes, target - len(sections))
+        text = "\n".join(
+            _shrink_section(header, items, caps[index], counter) if index in caps else _join_section(header, items)
+            for index, (header, items) in enumerate(sections)
+        )
+        if counter.count(text) <= target:
+            return text
+    return _shrink_words(text, target, counter)
+
+
+def _shrink_words(text: str, target: int, counter) -> str:
+    """Tronque un texte à au plus `target` tokens en conservant ses premiers mots"""
+    if counter.count(text) <= target:
+        return text
+    words = text.split()
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if counter.count(" ".join(words[:middle]) + " […]") <= target:
+            low = middle
+        else:
+            high = middle - 1
+    return " ".join(words[:low]) + " […]"
+
+
+def _caps(sizes: Dict[Any, int], available: int) -> Dict[Any, int]:
+    """
+    Répartit le budget disponible entre les champs : les plus petits sont conservés
+    entiers, les plus volumineux sont ramenés à une même taille plafond.
+    """
+    caps = {}
+    remaining = available
+    ordered = sorted(sizes.items(), key=lambda item: item[1])
+    for index, (name, size) in enumerate(ordered):
+        share = remaining // (len(ordered) - index)
+        if size <= share:
+            remaining -= size
+            continue
+        for other, _ in ordered[index:]:
+            caps[other] = max(MIN_FIELD_TOKENS, share)
+        break
+    return caps
+
+
+class PromptTemplate:
+    """Modèle de prompt dédenté, compilé à la construction et borné par un budget de tokens"""
+
+    def __init__(self, name: str, template: str, budget: int, model: str = "gpt-4o-mini"):
+        """
+        Args:
+            name: Nom du modèle (journaux)
+            template: Texte du modèle, avec des champs $nom
+            budget: Nombre maximal de tokens du prompt rendu
+            model: Modèle dont le tokenizer sert au décompte
+        """
+        self.name = name
+        self.budget = budget
+        self._template = Template(inspect.cleandoc(template))
+        self._counter = get_token_counter(model)
+        self._fields = {
+            match.group("named") or match.group("braced")
+            for match in self._template.pattern.finditer(self._template.template)
+            if match.group("named") or match.group("braced")
+        }
+        self._static_tokens = self._counter.count(self._template.safe_substitute({field: "" for field in self._fields}))
+        first = next(self._template.pattern.finditer(self._template.template), None)
+        self.prefix = self._template.template[:first.start()] if first else self._template.template
+
+    def render(self, **fields: Any) -> str:
+        """
+        Rend le prompt en réduisant les champs les plus volumineux si le budget est dépassé.
+
+        Raises:
+            KeyError: Si un champ du modèle n'est pas fourni
+        """
+        values = {name: "" if value is None else str(value).strip() for name, value in fields.items()}
+        missing = self._fields - values.keys()
+        if missing:
+            raise KeyError(f"Champs manquants pour le prompt {self.name} : {', '.join(sorted(missing))}")
+
+        prompt = self._template.substitute(values)
+        excess = self._counter.count(prompt) - self.budget
+        if excess <= 0:
+            return prompt
+
+        logger.warning(f"Prompt {self.name} réduit de {excess} tokens pour respecter le budget de {self.budget}")
+        originals = {name: values[name] for name in self._fields}
+        sizes = {name: self._counter.count(text) for name, text in originals.items()}
+        available = self.budget - self._static_tokens
+        # Deux passes au plus : la seconde absorbe l'écart dû aux jonctions entre fragments
+        for _ in range(2):
+            for name, cap in _caps(sizes, available).items():
+                values[name] = _shrink(originals[name], cap, self._counter)
+            prompt = self._template.substitute(values)
+            excess = self._counter.count(prompt) - self.budget
+            if excess <= 0:
+                return prompt
+            available -= excess
+
+        logger.warning(f"Budget du prompt {self.name} dépassé de {excess} tokens")
+        return prompt
+
+    def blocks(self, prompt: str, cache: bool = True) -> List[Dict[str, Any]]:
+        """
+        Découpe un prompt rendu en blocs de contenu : le préfixe statique (marqué
+        comme point d'arrêt du cache de prompts Anthropic) puis la partie variable.
+        Le client Anthropic retire la marque tant que le préfixe, prompt système
+        compris, n'atteint pas la taille minimale mise en cache par le modèle.
+
+        Args:
+            prompt: Prompt rendu par ce modèle
+            cache: Ajoute `cache_control` au bloc du préfixe
+
+        Returns:
+            La liste des blocs de texte (un seul bloc si le prompt ne commence pas par le préfixe)
+        """
+        if not self.prefix.strip() or not prompt.startswith(self.prefix) or len(prompt) == len(self.prefix):
+            return [{"type": "text", "text": prompt}]
+        static = {"type": "text", "text": self.prefix}
+        if cache:
+            static["cache_control"] = {"type": "ephemeral"}
+        return [static, {"type": "text", "text": prompt[len(self.prefix):]}]
+
+    def count(self, **fields: Any) -> int:
+        """Nombre de tokens du prompt rendu"""
+        return self._counter.count(self.render(**fields))
+
+
+# Chaque modèle commence par ses instructions et son format de réponse, identiques
+# d'un appel à l'autre, et se termine par les champs variables : le préfixe commun
+# peut ainsi être servi par le cache de prompts des fournisseurs.
+# Les tâches générées atteignent 4096 tokens (max_tokens de l'agent) : le budget
+# couvre ces tâches et une spécification au budget de TASKS sans réduction.
+EVALUATION = PromptTemplate("evaluation", """
+    Vous êtes un expert en rédaction de spécifications techniques.
+    Évaluez et optimisez la spécification fournie plus bas, à la lumière des tâches générées :
+
+    1. Évaluez cette spécification sur 10 points
+    2. Identifiez 3 points forts
+    3. Identifiez 3 points à améliorer
+    4. Proposez une version améliorée
+
+    Spécification :
+    $specification
+
+    Tâches générées :
+    $tasks
+    """, budget=6000)
+
+TASKS = PromptTemplate("tasks", """
+    Transforme la spécification fournie plus bas en une liste de tâches Markdown.
+    Génère une liste de tâches Markdown avec des cases à cocher, organisée par catégories.
+    Chaque tâche doit être spécifique, mesurable et réalisable.
+    Utilise ce format :
+
+    ## [Catégorie]
+    - [ ] Tâche 1
+    - [ ] Tâche 2
+
+    Spécification :
+    $specification
+    """, budget=1500)
+
+STRUCTURATION = PromptTemplate("structuration", """
+    Propose des recommandations d'amélioration pour la spécification technique fournie plus bas.
+    Réponds uniquement par la liste des recommandations, une par ligne, précédée d'un tiret.
+
+    Spécification :
+    $specification
+    """, budget=1500)
+
+BEST_PRACTICES = PromptTemplate("best_practices", """
+    En tant qu'expert en bonnes pratiques de développement logiciel, recommande des bonnes pratiques
+    pour le contexte décrit plus bas.
+
+    Format de réponse attendu (JSON) :
+    {"pratiques": [{"titre": "Titre de la bonne pratique", "description": "Description détaillée",
+      "technologies": ["liste", "des", "technologies"], "domaines": ["liste", "des", "domaines"],
+      "tags": ["liste", "des", "tags"], "source": "Source de la bonne pratique"}]}
+
+    Contexte :
+    - Technologies : $technologies
+    - Domaine : $domaine
+    - Contraintes : $contraintes
+    """, budget=800)
+
+COHERENCE = PromptTemplate("coherence", """
+    Analysez cette spécification et identifiez les incohérences.
+    Listez les incohérences trouvées avec des suggestions de correction, en suivant ce format :
+    - Incohérence : [description]
+      Suggestion : [correction proposée]
+
+    Spécification :
+    $specification
+    """, budget=1500)
+
+
+def join_items(items: Optional[List[Any]], empty: str = "Aucune") -> str:
+    """Liste compacte séparée par des virgules"""
+    items = _as_lines(items)
+    return ", ".join(items) if items else empty
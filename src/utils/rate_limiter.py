@@ -0,0 +1,426 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple, TypeVar
+
+from .tokens import MESSAGE_OVERHEAD, REPLY_OVERHEAD, content_text, get_token_counter
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+THROTTLE_STATUS_CODES = {429, 529}
+DEFAULT_STORE_PATH = os.path.join(tempfile.gettempdir(), "llm_rate_limits.sqlite3")
+
+
+def estimate_request_tokens(params: Dict[str, Any]) -> int:
+    """
+    Estime les tokens décomptés par le fournisseur pour une requête : les tokens
+    d'entrée (messages, prompt système, enveloppe) plus max_tokens, que les
+    fournisseurs réservent avant la génération.
+    """
+    counter = get_token_counter(params["model"])
+    contents = [content_text(message["content"]) for message in params["messages"]]
+    if params.get("system"):
+        contents.append(content_text(params["system"]))
+    input_tokens = sum(counter.count_batch(contents)) + MESSAGE_OVERHEAD * len(contents) + REPLY_OVERHEAD
+    return input_tokens + params.get("max_tokens", 0)
+
+
+def is_throttled(error: BaseException) -> bool:
+    """Le fournisseur signale une limite de débit atteinte ou une surcharge"""
+    return getattr(error, "status_code", None) in THROTTLE_STATUS_CODES
+
+
+class _BucketStore:
+    """
+    Seaux à jetons persistés dans SQLite : chaque réservation est une transaction
+    exclusive, ce qui partage les budgets entre tous les processus utilisant le même fichier.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0, isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS buckets (
+                    name TEXT PRIMARY KEY,
+                    level REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    @staticmethod
+    def _level(conn: sqlite3.Connection, name: str, capacity: float, now: float) -> float:
+        """Niveau courant du seau, rechargé linéairement sur une minute"""
+        row = conn.execute("SELECT level, updated_at FROM buckets WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return capacity
+        level, updated_at = row
+        return min(capacity, level + max(0.0, now - updated_at) * capacity / 60.0)
+
+    def reserve(self, demands: Dict[str, Tuple[float, float]]) -> float:
+        """
+        Prélève atomiquement chaque quantité si tous les seaux la couvrent.
+
+        Args:
+            demands: {nom du seau: (quantité, capacité par minute)}
+
+        Returns:
+            0 si la réservation est faite, sinon le délai d'attente estimé en secondes
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            levels = {name: self._level(conn, name, capacity, now) for name, (_, capacity) in demands.items()}
+            wait = max(
+                (amount - levels[name]) * 60.0 / capacity
+                for name, (amount, capacity) in demands.items()
+            )
+            if wait > 0:
+                return wait
+            conn.executemany(
+                "INSERT OR REPLACE INTO buckets (name, level, updated_at) VALUES (?, ?, ?)",
+                [(name, levels[name] - amount, now) for name, (amount, _) in demands.items()]
+            )
+            return 0.0
+
+    def refund(self, name: str, amount: float, capacity: float) -> None:
+        """Restitue une partie d'une réservation surestimée"""
+        now = time.time()
+        with self._transaction() as conn:
+            level = min(capacity, self._level(conn, name, capacity, now) + amount)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (name, level, updated_at) VALUES (?, ?, ?)",
+                (name, level, now)
+            )
+
+
+class AdaptiveConcurrency:
+    """
+    Fenêtre de concurrence AIMD : elle croît d'environ une requête par fenêtre
+    réussie et est divisée par deux lorsqu'une limite de débit ou une latence
+    excessive est observée (au plus une réduction par `cooldown` secondes).
+
+    La latence cible `latency_target` vaut pour une réponse de `reference_tokens`
+    tokens : elle est proportionnelle au max_tokens de chaque requête, une longue
+    génération n'étant pas un signal de surcharge.
+    """
+
+    def __init__(
+        self,
+        initial: int = 8,
+        minimum: int = 1,
+        maximum: int = 64,
+        latency_target: Optional[float] = 30.0,
+        decrease_factor: float = 0.5,
+        cooldown: float = 1.0,
+        reference_tokens: int = 1024
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.reference_tokens = reference_tokens
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self._limit = float(initial)
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return max(self.minimum, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def try_acquire(self) -> bool:
+        with self._condition:
+            if self._in_flight >= self.limit:
+                return False
+            self._in_flight += 1
+            return True
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+
+    async def aacquire(self, poll_interval: float = 0.05) -> None:
+        while not self.try_acquire():
+            await asyncio.sleep(poll_interval)
+
+    def target(self, max_tokens: Optional[int] = None) -> Optional[float]:
+        """Latence cible d'une requête générant au plus max_tokens tokens"""
+        if self.latency_target is None or not max_tokens:
+            return self.latency_target
+        return self.latency_target * max(1.0, max_tokens / self.reference_tokens)
+
+    def release(self, latency: float, throttled: bool = False, max_tokens: Optional[int] = None) -> None:
+        """Libère une place et ajuste la fenêtre selon le résultat de la requête"""
+        target = self.target(max_tokens)
+        with self._condition:
+            self._in_flight -= 1
+            slow = target is not None and latency > target
+            if throttled or slow:
+                now = time.monotonic()
+                if now - self._last_decrease >= self.cooldown:
+                    self._last_decrease = now
+                    self._limit = max(float(self.minimum), self._limit * self.decrease_factor)
+                    logger.info(
+                        f"Fenêtre de concurrence réduite à {self.limit} "
+                        f"({'limite de débit' if throttled else f'latence {latency:.1f} s'})"
+                    )
+            else:
+                self._limit = min(float(self.maximum), self._limit + 1.0 / self._limit)
+            self._condition.notify_all()
+
+    def cancel(self) -> None:
+        """Libère une place sans ajuster la fenêtre (requête abandonnée avant l'envoi)"""
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+
+class Slot:
+    """
+    Place de concurrence et réservation de budget d'une requête. Pour un flux,
+    elles restent acquises jusqu'à la fin ou la fermeture du flux.
+    """
+
+    def __init__(self, limiter: "RateLimiter", tokens: int, max_tokens: Optional[int] = None):
+        self.limiter = limiter
+        self.tokens = tokens
+        self.max_tokens = max_tokens
+        self.started = time.monotonic()
+        self._released = False
+
+    def _release_concurrency(self, throttled: bool) -> bool:
+        if self._released:
+            return False
+        self._released = True
+        self.limiter.concurrency.release(time.monotonic() - self.started, throttled, self.max_tokens)
+        return True
+
+    def release(self, used: Optional[int] = None, throttled: bool = False) -> None:
+        """
+        Libère la place et restitue les tokens non consommés (sans effet au second appel).
+
+        Args:
+            used: Les tokens réellement consommés, s'ils sont connus
+            throttled: Le fournisseur a signalé une limite de débit
+        """
+        if self._release_concurrency(throttled):
+            self.limiter.settle(self.tokens, used)
+
+    async def arelease(self, used: Optional[int] = None, throttled: bool = False) -> None:
+        """Version asynchrone de release : la restitution SQLite est faite hors de la boucle d'événements"""
+        if self._release_concurrency(throttled):
+            await asyncio.to_thread(self.limiter.settle, self.tokens, used)
+
+
+class RateLimiter:
+    """
+    Limiteur de débit côté client d'un fournisseur : budgets de requêtes (RPM)
+    et de tokens (TPM) par minute partagés entre processus, et fenêtre de
+    concurrence adaptative propre au processus.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None,
+        path: str = DEFAULT_STORE_PATH,
+        concurrency: Optional[AdaptiveConcurrency] = None
+    ):
+        self.provider = provider
+        self.rpm = rpm
+        self.tpm = tpm
+        self.concurrency = concurrency or AdaptiveConcurrency()
+        self._store = _BucketStore(path) if rpm or tpm else None
+
+    @classmethod
+    def from_env(cls, provider: str) -> Optional["RateLimiter"]:
+        """
+        Construit le limiteur à partir de <PROVIDER>_RPM_LIMIT et <PROVIDER>_TPM_LIMIT
+        (ex. OPENAI_RPM_LIMIT), LLM_RATE_LIMIT_PATH, LLM_CONCURRENCY_INITIAL,
+        LLM_CONCURRENCY_MAX et LLM_LATENCY_TARGET.
+
+        Returns:
+            Le limiteur configuré, ou None si aucun budget n'est défini pour le fournisseur
+        """
+        prefix = provider.upper()
+        rpm = int(os.environ.get(f"{prefix}_RPM_LIMIT", 0)) or None
+        tpm = int(os.environ.get(f"{prefix}_TPM_LIMIT", 0)) or None
+        if rpm is None and tpm is None:
+            return None
+        latency_target = float(os.environ.get("LLM_LATENCY_TARGET", 30.0))
+        return cls(
+            provider,
+            rpm=rpm,
+            tpm=tpm,
+            path=os.environ.get("LLM_RATE_LIMIT_PATH") or DEFAULT_STORE_PATH,
+            concurrency=AdaptiveConcurrency(
+                initial=int(os.environ.get("LLM_CONCURRENCY_INITIAL", 8)),
+                maximum=int(os.environ.get("LLM_CONCURRENCY_MAX", 64)),
+                latency_target=latency_target or None
+            )
+        )
+
+    def _demands(self, tokens: int) -> Dict[str, Tuple[float, float]]:
+        demands = {}
+        if self.rpm:
+            demands[f"{self.provider}:requests"] = (1, self.rpm)
+        if self.tpm:
+            if tokens > self.tpm:
+                logger.warning(f"Requête de {tokens} tokens supérieure au budget TPM {self.provider} ({self.tpm})")
+            demands[f"{self.provider}:tokens"] = (min(tokens, self.tpm), self.tpm)
+        return demands
+
+    def _reserve(self, tokens: int) -> float:
+        if self._store is None:
+            return 0.0
+        return self._store.reserve(self._demands(tokens))
+
+    def acquire_budget(self, tokens: int) -> None:
+        """Attend que les budgets RPM et TPM couvrent la requête, puis les prélève"""
+        while True:
+            wait = self._reserve(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def aacquire_budget(self, tokens: int) -> None:
+        """Version asynchrone de acquire_budget : la transaction SQLite est faite hors de la boucle d'événements"""
+        while True:
+            wait = await asyncio.to_thread(self._reserve, tokens) if self._store is not None else 0.0
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def settle(self, reserved: int, used: Optional[int]) -> None:
+        """Restitue au budget TPM les tokens réservés mais non consommés"""
+        if self._store is None or not self.tpm or not isinstance(used, int):
+            return
+        unused = min(reserved, self.tpm) - used
+        if unused > 0:
+            self._store.refund(f"{self.provider}:tokens", unused, self.tpm)
+
+    def open(self, func: Callable[[], T], tokens: int, max_tokens: Optional[int] = None) -> Tuple[T, Slot]:
+        """
+        Exécute func dans la fenêtre de concurrence, après réservation des budgets, sans
+        libérer la place : l'appelant la libère avec Slot.release (ex. à la fin d'un flux).
+
+        Args:
+            func: L'appel au fournisseur
+            tokens: Les tokens réservés pour la requête
+            max_tokens: Les tokens de sortie demandés, qui fixent la latence cible
+
+        Returns:
+            Le résultat de func et la place acquise
+        """
+        self.concurrency.acquire()
+        try:
+            self.acquire_budget(tokens)
+        except BaseException:
+            self.concurrency.cancel()
+            raise
+        slot = Slot(self, tokens, max_tokens)
+        try:
+            return func(), slot
+        except Exception as e:
+            slot.release(throttled=is_throttled(e))
+            raise
+        except BaseException:
+            slot.release()
+            raise
+
+    async def aopen(
+        self,
+        func: Callable[[], Awaitable[T]],
+        tokens: int,
+        max_tokens: Optional[int] = None
+    ) -> Tuple[T, Slot]:
+        """Version asynchrone de open"""
+        await self.concurrency.aacquire()
+        try:
+            await self.aacquire_budget(tokens)
+        except BaseException:
+            self.concurrency.cancel()
+            raise
+        slot = Slot(self, tokens, max_tokens)
+        try:
+            return await func(), slot
+        except Exception as e:
+            await slot.arelease(throttled=is_throttled(e))
+            raise
+        except BaseException:
+            await asyncio.shield(slot.arelease())
+            raise
+
+    def call(
+        self,
+        func: Callable[[], T],
+        tokens: int,
+        usage: Optional[Callable[[T], Optional[int]]] = None,
+        max_tokens: Optional[int] = None
+    ) -> T:
+        """
+        Exécute func dans la fenêtre de concurrence, après réservation des budgets.
+
+        Args:
+            func: L'appel au fournisseur
+            tokens: Les tokens réservés pour la requête
+            usage: Extrait de la réponse le nombre de tokens réellement consommés
+            max_tokens: Les tokens de sortie demandés, qui fixent la latence cible
+        """
+        result, slot = self.open(func, tokens, max_tokens)
+        slot.release(usage(result) if usage is not None else None)
+        return result
+
+    async def acall(
+        self,
+        func: Callable[[], Awaitable[T]],
+        tokens: int,
+        usage: Optional[Callable[[T], Optional[int]]] = None,
+        max_tokens: Optional[int] = None
+    ) -> T:
+        """Version asynchrone de call"""
+        result, slot = await self.aopen(func, tokens, max_tokens)
+        await slot.arelease(usage(result) if usage is not None else None)
+        return result
+
+
+_limiters: Dict[str, Optional[RateLimiter]] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str) -> Optional[RateLimiter]:
+    """Renvoie le limiteur partagé du fournisseur, ou None s'il n'est pas configuré"""
+    with _limiters_lock:
+        if provider not in _limiters:
+            _limiters[provider] = RateLimiter.from_env(provider)
+        return _limiters[provider]
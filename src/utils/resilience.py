@@ -0,0 +1,255 @@
+import asyncio
+import email.utils
+import logging
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+# SDK dont les erreurs de connexion sont transitoires
+_SDK_MODULES = ("openai", "anthropic")
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+class CircuitOpenError(Exception):
+    """Le disjoncteur du fournisseur est ouvert : l'appel est refusé sans être envoyé"""
+
+    def __init__(self, provider: str, retry_in: float):
+        super().__init__(
+            f"Le fournisseur {provider} est temporairement indisponible, nouvel essai possible dans {retry_in:.0f} s"
+        )
+        self.provider = provider
+        self.retry_in = retry_in
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Nouvelles tentatives avec backoff exponentiel et jitter complet"""
+    max_attempts: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 20.0
+
+    def backoff(self, attempt: int) -> float:
+        """Délai avant la tentative suivante (attempt commence à 1)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur par fournisseur : après `failure_threshold` échecs consécutifs,
+    les appels échouent immédiatement pendant `recovery_timeout` secondes, puis
+    un appel d'essai est autorisé (état semi-ouvert).
+    """
+
+    def __init__(self, provider: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.recovery_timeout:
+                return "half_open"
+            return "open"
+
+    def before_call(self) -> bool:
+        """
+        Returns:
+            True si l'appel autorisé est l'appel d'essai de l'état semi-ouvert
+
+        Raises:
+            CircuitOpenError: Si le disjoncteur est ouvert
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            elapsed = time.monotonic() - self._opened_at
+            if elapsed >= self.recovery_timeout and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            raise CircuitOpenError(self.provider, max(0.0, self.recovery_timeout - elapsed))
+
+    def release_trial(self) -> None:
+        """Libère l'appel d'essai interrompu (annulation) sans compter ni succès ni échec"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"Disjoncteur {self.provider} refermé")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(f"Disjoncteur {self.provider} ouvert après {self._failures} échecs consécutifs")
+                self._opened_at = time.monotonic()
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Erreurs transitoires : connexion, délai dépassé, limite de débit, surcharge ou erreur serveur"""
+    # Seuls les SDK déjà chargés peuvent avoir levé l'erreur : aucun n'est importé ici
+    connection_errors = tuple(sys.modules[name].APIConnectionError for name in _SDK_MODULES if name in sys.modules)
+    if isinstance(error, connection_errors):
+        return True
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    """Analyse une durée au format des en-têtes de limite OpenAI (ex. « 1s », « 6m0s », « 250ms »)"""
+    parts = _DURATION_PART.findall(value)
+    if not parts or "".join(number + unit for number, unit in parts) != value:
+        return None
+    factors = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(number) * factors[unit] for number, unit in parts)
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """
+    Délai imposé par le fournisseur, lu dans les en-têtes de la réponse :
+    retry-after-ms, retry-after (secondes ou date HTTP), puis les en-têtes
+    de réinitialisation des limites OpenAI et Anthropic.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                date = email.utils.parsedate_to_datetime(value)
+                return max(0.0, date.timestamp() - time.time())
+    except (TypeError, ValueError):
+        pass
+
+    resets = []
+    for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        if headers.get(name):
+            resets.append(_parse_duration(headers[name]))
+    for name in ("anthropic-ratelimit-requests-reset", "anthropic-ratelimit-tokens-reset"):
+        if headers.get(name):
+            try:
+                date = datetime.fromisoformat(headers[name].replace("Z", "+00:00"))
+                resets.append(max(0.0, date.timestamp() - time.time()))
+            except (TypeError, ValueError):
+                continue
+    resets = [reset for reset in resets if reset is not None]
+    return max(resets) if resets else None
+
+
+class Resilience:
+    """Applique la politique de nouvelles tentatives et le disjoncteur d'un fournisseur à un appel"""
+
+    def __init__(self, provider: str, policy: Optional[RetryPolicy] = None, breaker: Optional[CircuitBreaker] = None):
+        self.provider = provider
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker or get_circuit_breaker(provider)
+
+    def _next_delay(self, error: BaseException, attempt: int) -> Optional[float]:
+        """Délai avant la prochaine tentative, ou None si l'erreur doit être remontée"""
+        if not is_retryable(error):
+            # Le fournisseur a répondu : l'erreur vient de la requête, pas de sa disponibilité
+            self.breaker.record_success()
+            return None
+        self.breaker.record_failure()
+        if attempt >= self.policy.max_attempts:
+            return None
+        delay = retry_after(error)
+        if delay is None:
+            delay = self.policy.backoff(attempt)
+        delay = min(delay, self.policy.max_delay)
+        logger.warning(
+            f"Erreur transitoire {self.provider} ({type(error).__name__}), "
+            f"tentative {attempt + 1}/{self.policy.max_attempts} dans {delay:.2f} s"
+        )
+        return delay
+
+    def call(self, func: Callable[[], T]) -> T:
+        """Exécute func avec nouvelles tentatives sur les erreurs transitoires"""
+        attempt = 0
+        while True:
+            attempt += 1
+            trial = self.breaker.before_call()
+            try:
+                result = func()
+            except Exception as e:
+                delay = self._next_delay(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            except BaseException:
+                # Interruption : sans cela le disjoncteur resterait semi-ouvert indéfiniment
+                if trial:
+                    self.breaker.release_trial()
+                raise
+            self.breaker.record_success()
+            return result
+
+    async def acall(self, func: Callable[[], Awaitable[T]]) -> T:
+        """Version asynchrone de call"""
+        attempt = 0
+        while True:
+            attempt += 1
+            trial = self.breaker.before_call()
+            try:
+                result = await func()
+            except Exception as e:
+                delay = self._next_delay(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Annulation (hedging, délai client) : l'essai est libéré sans être compté
+                if trial:
+                    self.breaker.release_trial()
+                raise
+            self.breaker.record_success()
+            return result
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(provider: str) -> CircuitBreaker:
+    """Renvoie le disjoncteur partagé du fournisseur"""
+    with _breakers_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(provider)
+        return _breakers[provider]
+
+
+def reset_circuit_breakers() -> None:
+    """Oublie l'état de tous les disjoncteurs (tests, rechargement de configuration)"""
+    with _breakers_lock:
+        _breakers.clear()
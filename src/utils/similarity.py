@@ -0,0 +1,204 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Nombre premier de Mersenne 2^31 - 1 : les produits a * x restent dans un uint64
+_PRIME = (1 << 31) - 1
+_WORD = re.compile(r"\w+")
+
+
+def normalize_text(text: str) -> str:
+    """Minuscules, sans accents ni ponctuation, espaces réduits"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(_WORD.findall(text))
+
+
+def shingles(text: str, size: int = 3) -> Set[int]:
+    """Empreintes CRC32 des n-grammes de mots du texte normalisé (les mots seuls pour un texte court)"""
+    words = normalize_text(text).split()
+    if len(words) < size:
+        grams = words
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return {zlib.crc32(gram.encode("utf-8")) & _PRIME for gram in grams}
+
+
+@dataclass(frozen=True)
+class SimilarMatch:
+    id: int
+    similarity: float
+    payload: str
+
+
+class SimilarityIndex:
+    """
+    Index de quasi-doublons : signatures MinHash des textes et LSH par bandes.
+    Une requête ne compare que les entrées partageant au moins une bande avec
+    elle, ce qui garde la recherche en dessous de la milliseconde même avec des
+    centaines de milliers d'entrées. La similarité retournée est l'estimation
+    MinHash de l'indice de Jaccard des n-grammes de mots.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.85,
+        num_perm: int = 128,
+        bands: int = 16,
+        path: Optional[str] = None,
+        seed: int = 42
+    ):
+        """
+        Args:
+            threshold: Similarité minimale pour qu'une entrée soit retournée
+            num_perm: Nombre de permutations MinHash (taille de la signature)
+            bands: Nombre de bandes LSH (num_perm doit en être un multiple)
+            path: Fichier SQLite de persistance (index en mémoire seulement si non spécifié)
+            seed: Graine des permutations (doit rester fixe pour un même fichier)
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm doit être un multiple de bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+
+        self._signatures: Dict[int, Tuple[str, np.ndarray]] = {}
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+        self._payloads: Dict[int, str] = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._conn = self._open(path) if path else None
+
+    @classmethod
+    def from_env(cls) -> Optional["SimilarityIndex"]:
+        """
+        Construit l'index à partir de LLM_SIMILARITY_ENABLED, LLM_SIMILARITY_THRESHOLD
+        et LLM_SIMILARITY_PATH.
+
+        Returns:
+            L'index configuré, ou None s'il est désactivé (par défaut)
+        """
+        if os.environ.get("LLM_SIMILARITY_ENABLED", "0").lower() in ("0", "false", "no"):
+            return None
+        return cls(
+            threshold=float(os.environ.get("LLM_SIMILARITY_THRESHOLD", 0.85)),
+            path=os.environ.get("LLM_SIMILARITY_PATH") or None
+        )
+
+    def _open(self, path: str) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS specs (
+                    id INTEGER PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    signature BLOB NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )"""
+            )
+        # Seules les signatures sont chargées en mémoire, les résultats restent sur disque
+        for spec_id, namespace, blob in conn.execute("SELECT id, namespace, signature FROM specs"):
+            self._index(spec_id, namespace, np.frombuffer(blob, dtype=np.uint32))
+            self._next_id = max(self._next_id, spec_id + 1)
+        logger.info(f"Index de similarité chargé : {len(self._signatures)} spécification(s)")
+        return conn
+
+    def signature(self, text: str) -> np.ndarray:
+        """Signature MinHash du texte"""
+        hashes = np.fromiter(shingles(text), dtype=np.uint64)
+        if hashes.size == 0:
+            return np.full(self._a.shape[0], _PRIME, dtype=np.uint32)
+        return ((self._a * hashes + self._b) % _PRIME).min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, namespace: str, signature: np.ndarray) -> List[bytes]:
+        prefix = namespace.encode("utf-8") + b"\0"
+        return [prefix + signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _index(self, spec_id: int, namespace: str, signature: np.ndarray) -> None:
+        self._signatures[spec_id] = (namespace, signature)
+        for bucket, key in zip(self._buckets, self._band_keys(namespace, signature)):
+            bucket.setdefault(key, []).append(spec_id)
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def add(self, text: str, payload: str, namespace: str = "") -> int:
+        """
+        Indexe un texte et le résultat associé.
+
+        Args:
+            text: Le texte comparé (titre, description, exigences)
+            payload: Le résultat à réutiliser
+            namespace: Espace de comparaison (ex. le modèle utilisé)
+
+        Returns:
+            L'identifiant de l'entrée
+        """
+        signature = self.signature(text)
+        with self._lock:
+            spec_id = self._next_id
+            self._next_id += 1
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT INTO specs (id, namespace, signature, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                        (spec_id, namespace, signature.tobytes(), payload, time.time())
+                    )
+            else:
+                self._payloads[spec_id] = payload
+            self._index(spec_id, namespace, signature)
+        return spec_id
+
+    def query(self, text: str, namespace: str = "") -> Optional[SimilarMatch]:
+        """Renvoie l'entrée la plus similaire au-dessus du seuil, ou None"""
+        signature = self.signature(text)
+        with self._lock:
+            candidates = set()
+            for bucket, key in zip(self._buckets, self._band_keys(namespace, signature)):
+                candidates.update(bucket.get(key, ()))
+
+            best_id, best_similarity = None, 0.0
+            for spec_id in candidates:
+                similarity = float(np.count_nonzero(self._signatures[spec_id][1] == signature)) / signature.size
+                if similarity > best_similarity:
+                    best_id, best_similarity = spec_id, similarity
+
+            if best_id is None or best_similarity < self.threshold:
+                return None
+            if self._conn is not None:
+                payload = self._conn.execute("SELECT payload FROM specs WHERE id = ?", (best_id,)).fetchone()[0]
+            else:
+                payload = self._payloads[best_id]
+        return SimilarMatch(best_id, best_similarity, payload)
+
+
+_default_index: Optional[SimilarityIndex] = None
+_default_index_loaded = False
+_default_index_lock = threading.Lock()
+
+
+def get_similarity_index() -> Optional[SimilarityIndex]:
+    """Renvoie l'index de similarité partagé du processus (None s'il est désactivé)"""
+    global _default_index, _default_index_loaded
+    with _default_index_lock:
+        if not _default_index_loaded:
+            _default_index = SimilarityIndex.from_env()
+            _default_index_loaded = True
+        return _default_index
@@ -0,0 +1,250 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import weakref
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, TypeVar
+
+from .cache import _normalize
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def make_flight_key(*parts: Any) -> str:
+    """
+    Calcule la clé de regroupement d'une requête à partir de ses champs normalisés
+    (les listes sont jointes ligne par ligne, comme dans le formulaire).
+    """
+    normalized = [
+        _normalize("\n".join(str(item) for item in part) if isinstance(part, list) else part and str(part))
+        for part in parts
+    ]
+    payload = json.dumps(normalized, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _SharedStream:
+    """
+    Flux partagé entre plusieurs lecteurs synchrones : le lecteur qui a besoin
+    du fragment suivant le lit dans la source, les autres le reprennent dans le
+    tampon. La source est fermée si tous les lecteurs abandonnent avant la fin.
+    """
+
+    def __init__(self, source: Iterator[T], on_done: Callable[[], None]):
+        self._source = source
+        self._on_done = on_done
+        self._buffer: List[T] = []
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+        self._readers = 0
+
+    def subscribe(self) -> Iterator[T]:
+        with self._lock:
+            self._readers += 1
+        index = 0
+        try:
+            while True:
+                if index < len(self._buffer):
+                    index += 1
+                    yield self._buffer[index - 1]
+                    continue
+                with self._lock:
+                    if index < len(self._buffer):
+                        continue
+                    if self._done:
+                        if self._error is not None:
+                            raise self._error
+                        return
+                    try:
+                        self._buffer.append(next(self._source))
+                    except StopIteration:
+                        self._finish()
+                    except Exception as e:
+                        self._error = e
+                        self._finish()
+        finally:
+            with self._lock:
+                self._readers -= 1
+                abandoned = self._readers == 0 and not self._done
+                if abandoned:
+                    self._finish()
+            if abandoned:
+                close = getattr(self._source, "close", None)
+                if close is not None:
+                    close()
+
+    def _finish(self) -> None:
+        self._done = True
+        self._on_done()
+
+
+class SingleFlight:
+    """
+    Regroupe les appels identiques simultanés (même clé) : un seul calcul est
+    exécuté et tous les appelants reçoivent son résultat, son erreur ou son flux.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _SharedStream] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key: str, func: Callable[[], T]) -> T:
+        """Exécute func, ou attend le calcul déjà en cours pour la même clé"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            logger.info("Requête identique en cours : résultat partagé")
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def stream(self, key: str, factory: Callable[[], Iterator[T]]) -> Iterator[T]:
+        """Diffuse le flux de factory, ou s'abonne au flux déjà en cours pour la même clé"""
+        with self._lock:
+            shared = self._streams.get(key)
+            if shared is None:
+                shared = self._streams[key] = _SharedStream(factory(), lambda: self._forget(key, shared))
+            else:
+                self.coalesced += 1
+                logger.info("Flux identique en cours : abonnement au flux partagé")
+            subscription = shared.subscribe()
+        return subscription
+
+    def _forget(self, key: str, shared: Any) -> None:
+        with self._lock:
+            if self._streams.get(key) is shared:
+                del self._streams[key]
+
+
+class _AsyncSharedStream:
+    """
+    Flux partagé entre plusieurs lecteurs asynchrones, alimenté par une tâche
+    dédiée : l'annulation d'un lecteur n'interrompt pas les autres, et la tâche
+    est annulée si tous les lecteurs abandonnent avant la fin.
+    """
+
+    def __init__(self, factory: Callable[[], AsyncIterator[T]], on_done: Callable[[], None]):
+        self._on_done = on_done
+        self._buffer: List[T] = []
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._changed = asyncio.Event()
+        self._readers = 0
+        self._task = asyncio.ensure_future(self._produce(factory))
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def _produce(self, factory: Callable[[], AsyncIterator[T]]) -> None:
+        try:
+            async for chunk in factory():
+                self._buffer.append(chunk)
+                self._notify()
+        except Exception as e:
+            self._error = e
+        finally:
+            self._done = True
+            self._on_done()
+            self._notify()
+
+    async def subscribe(self) -> AsyncIterator[T]:
+        self._readers += 1
+        index = 0
+        try:
+            while True:
+                if index < len(self._buffer):
+                    index += 1
+                    yield self._buffer[index - 1]
+                    continue
+                if self._done:
+                    if self._error is not None:
+                        raise self._error
+                    return
+                await self._changed.wait()
+        finally:
+            self._readers -= 1
+            if self._readers == 0 and not self._done:
+                self._task.cancel()
+
+
+class AsyncSingleFlight:
+    """Version asynchrone de SingleFlight (les calculs en cours sont propres à chaque boucle d'événements)"""
+
+    def __init__(self):
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+        self.coalesced = 0
+
+    def _in_flight(self) -> Dict[str, Any]:
+        return self._loops.setdefault(asyncio.get_running_loop(), {})
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """Attend le résultat de factory, ou celui du calcul déjà en cours pour la même clé"""
+        in_flight = self._in_flight()
+        task = in_flight.get(("do", key))
+        if task is None:
+            task = in_flight[("do", key)] = asyncio.ensure_future(factory())
+            task.add_done_callback(lambda _: in_flight.pop(("do", key), None))
+        else:
+            self.coalesced += 1
+            logger.info("Requête identique en cours : résultat partagé")
+        # Le calcul partagé survit à l'annulation d'un des appelants
+        return await asyncio.shield(task)
+
+    def stream(self, key: str, factory: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """Diffuse le flux de factory, ou s'abonne au flux déjà en cours pour la même clé"""
+        in_flight = self._in_flight()
+        shared = in_flight.get(("stream", key))
+        if shared is None:
+            shared = in_flight[("stream", key)] = _AsyncSharedStream(
+                factory, lambda: in_flight.pop(("stream", key), None)
+            )
+        else:
+            self.coalesced += 1
+            logger.info("Flux identique en cours : abonnement au flux partagé")
+        return shared.subscribe()
+
+
+_single_flight = SingleFlight()
+_async_single_flight = AsyncSingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """Renvoie le regroupement des appels synchrones partagé par les clients du processus"""
+    return _single_flight
+
+
+def get_async_single_flight() -> AsyncSingleFlight:
+    """Renvoie le regroupement des appels asynchrones partagé par les clients du processus"""
+    return _async_single_flight
@@ -0,0 +1,81 @@
+"""
+Métriques locales d'une spécification, calculées sans appel au modèle.
+
+Le nombre d'exigences et de contraintes, la spécificité des exigences (présence
+de chiffres), la présence de contraintes légales et le score de qualité de la
+description sont exacts et reproductibles. Les motifs sont compilés une fois ;
+`analyze_batch` évalue un lot de spécifications et agrège les résultats en
+opérations vectorisées.
+"""
+import re
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+# Notions attendues dans la description : chacune compte pour une part du score
+DESCRIPTION_NOTIONS = (
+    re.compile(r"objecti(?:f|ve)", re.IGNORECASE),
+    re.compile(r"fonctionnalit|functionalit|feature", re.IGNORECASE),
+    re.compile(r"contrainte|constraint", re.IGNORECASE),
+)
+SPECIFIC = re.compile(r"\d")
+LEGAL = re.compile(
+    r"l[ée]gal|\blois?\b|\blaws?\b|\brgpd\b|\bgdpr\b|\bcnil\b|juridique|r[ée]glement|regulat"
+    r"|conformit[ée]|complian|\bcomply\b|licen[cs]e|\bhipaa\b|\bpci[- ]?dss\b|\brgaa\b",
+    re.IGNORECASE
+)
+
+Items = Union[str, Sequence[str], None]
+
+
+def _items(value: Items) -> List[str]:
+    if not value:
+        return []
+    lines = value.splitlines() if isinstance(value, str) else value
+    return [str(line).strip() for line in lines if str(line).strip()]
+
+
+def analyze_batch(specs: Sequence[Tuple[str, Items, Items]]) -> List[Dict[str, Any]]:
+    """
+    Calcule les métriques d'un lot de spécifications.
+
+    Args:
+        specs: Les spécifications, sous forme de triplets (description, exigences, contraintes)
+
+    Returns:
+        Pour chaque spécification : quality_score, requirements_analysis (count, specificity)
+        et constraints_analysis (count, has_legal)
+    """
+    size = len(specs)
+    descriptions = [str(description or "") for description, _, _ in specs]
+    requirements = [_items(items) for _, items, _ in specs]
+    constraints = [_items(items) for _, _, items in specs]
+
+    notions = np.array(
+        [[bool(pattern.search(description)) for pattern in DESCRIPTION_NOTIONS] for description in descriptions],
+        dtype=bool
+    ).reshape(size, len(DESCRIPTION_NOTIONS))
+    filled = np.fromiter((bool(description.strip()) for description in descriptions), dtype=bool, count=size)
+    # Une description non vide vaut une part, chaque notion présente une part de plus
+    scores = np.where(filled, (1 + notions.sum(axis=1)) / (len(DESCRIPTION_NOTIONS) + 1), 0.0)
+
+    requirement_counts = np.fromiter(map(len, requirements), dtype=np.int64, count=size)
+    constraint_counts = np.fromiter(map(len, constraints), dtype=np.int64, count=size)
+    # Un seul passage du motif par spécification, sur ses éléments joints
+    specificity = np.fromiter((bool(SPECIFIC.search("\n".join(items))) for items in requirements), dtype=bool, count=size)
+    has_legal = np.fromiter((bool(LEGAL.search("\n".join(items))) for items in constraints), dtype=bool, count=size)
+
+    return [
+        {
+            "quality_score": float(score),
+            "requirements_analysis": {"count": int(requirement_count), "specificity": bool(specific)},
+            "constraints_analysis": {"count": int(constraint_count), "has_legal": bool(legal)}
+        }
+        for score, requirement_count, specific, constraint_count, legal
+        in zip(scores, requirement_counts, specificity, constraint_counts, has_legal)
+    ]
+
+
+def analyze(description: str, requirements: Items, constraints: Items) -> Dict[str, Any]:
+    """Calcule les métriques d'une seule spécification (voir analyze_batch)"""
+    return analyze_batch([(description, requirements, constraints)])[0]
@@ -0,0 +1,175 @@
+import logging
+import math
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Pré-découpage proche de celui des tokenizers BPE de GPT-4o : mots avec leur espace
+# de tête, nombres par groupes de 3 chiffres, suites de ponctuation, blancs
+_PRETOKENIZE = re.compile(r" ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|\s+")
+
+# Surcoût en tokens de l'enveloppe de chaque message et de l'amorce de la réponse
+MESSAGE_OVERHEAD = 3
+REPLY_OVERHEAD = 3
+
+# Prix en dollars par million de tokens (entrée, sortie)
+PRICING: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.0),
+    "claude-3-5-sonnet-20241022": (3.0, 15.0),
+}
+
+# Prix des tokens d'entrée lus et écrits dans le cache de prompts, relatifs au prix d'entrée
+CACHE_PRICING: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.5, 1.0),
+    "gpt-4o": (0.5, 1.0),
+    "claude-3-5-sonnet-20241022": (0.1, 1.25),
+}
+
+# Taille minimale (en tokens) d'un préfixe mis en cache par Anthropic : un point d'arrêt
+# cache_control placé avant ce seuil est ignoré par le fournisseur
+MIN_CACHEABLE_TOKENS = 1024
+
+# Encodages tiktoken exacts, utilisés lorsque tiktoken et ses fichiers sont disponibles localement
+_TIKTOKEN_ENCODINGS = {"gpt-4o-mini": "o200k_base", "gpt-4o": "o200k_base"}
+
+
+def content_text(content: Union[str, List[Dict[str, Any]], None]) -> str:
+    """Texte d'un contenu de message : chaîne telle quelle, ou concaténation des blocs de texte"""
+    if content is None or isinstance(content, str):
+        return content or ""
+    return "".join(block.get("text", "") for block in content if isinstance(block, dict))
+
+
+@lru_cache(maxsize=65536)
+def _count_piece(piece: str) -> int:
+    """
+    Estime le nombre de tokens d'un fragment pré-découpé. Les mots courts
+    correspondent à une seule entrée du vocabulaire ; au-delà, les fusions BPE
+    produisent environ un token par 4 caractères, moins pour les caractères accentués.
+    Ce n'est qu'une estimation : l'écart avec le tokenizer réel reste de l'ordre de 15 %
+    sur des spécifications en français ou en anglais (voir tests/test_tokens.py).
+    """
+    word = piece.lstrip(" ")
+    if not word or word.isspace() or word.isdigit():
+        return 1
+    if not word[0].isalpha():
+        return math.ceil(len(word) / 2)
+    weight = len(word) + sum(1 for char in word if ord(char) > 127)
+    if weight <= 6:
+        return 1
+    return 1 + math.ceil((weight - 6) / 4)
+
+
+class TokenCounter:
+    """
+    Compteur de tokens pour un modèle donné. Le comptage n'est exact que pour les modèles
+    GPT-4o lorsque tiktoken et son encodage sont disponibles ; dans tous les autres cas, y
+    compris pour les modèles Claude dont le tokenizer n'est pas public, c'est une estimation.
+    Les budgets de prompts et les coûts prévisionnels en héritent ; les coûts réels sont
+    relevés dans les champs usage des réponses.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self._encoding = self._load_encoding(model)
+
+    @staticmethod
+    def _load_encoding(model: str):
+        encoding_name = _TIKTOKEN_ENCODINGS.get(model)
+        if encoding_name is None:
+            return None
+        try:
+            import tiktoken
+            return tiktoken.get_encoding(encoding_name)
+        except Exception as e:
+            logger.info(f"Encodage {encoding_name} indisponible, estimation locale utilisée : {str(e)}")
+            return None
+
+    @property
+    def exact(self) -> bool:
+        return self._encoding is not None
+
+    def count(self, text: Optional[str]) -> int:
+        """Renvoie le nombre de tokens d'un texte"""
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode_ordinary(text))
+        return sum(_count_piece(piece) for piece in _PRETOKENIZE.findall(text))
+
+    def count_batch(self, texts: Iterable[Optional[str]]) -> List[int]:
+        """Renvoie le nombre de tokens de chaque texte (les fragments communs ne sont estimés qu'une fois)"""
+        texts = [text or "" for text in texts]
+        if self._encoding is not None:
+            return [len(tokens) for tokens in self._encoding.encode_ordinary_batch(texts)]
+        return [self.count(text) for text in texts]
+
+    def count_messages(self, prompt: str, system_prompt: Optional[str] = None) -> int:
+        """Renvoie le nombre de tokens d'entrée d'une requête (prompt système, prompt et enveloppe)"""
+        total = self.count(prompt) + MESSAGE_OVERHEAD + REPLY_OVERHEAD
+        if system_prompt:
+            total += self.count(system_prompt) + MESSAGE_OVERHEAD
+        return total
+
+
+_counters: Dict[str, TokenCounter] = {}
+_counters_lock = threading.Lock()
+
+
+def get_token_counter(model: str) -> TokenCounter:
+    """Renvoie le compteur partagé du modèle"""
+    counter = _counters.get(model)
+    if counter is None:
+        with _counters_lock:
+            counter = _counters.setdefault(model, TokenCounter(model))
+    return counter
+
+
+def count_tokens(text: Optional[str], model: str = "gpt-4o-mini") -> int:
+    return get_token_counter(model).count(text)
+
+
+def count_tokens_batch(texts: Iterable[Optional[str]], model: str = "gpt-4o-mini") -> List[int]:
+    return get_token_counter(model).count_batch(texts)
+
+
+def min_cacheable_tokens(model: str) -> int:
+    """Taille minimale d'un préfixe mis en cache pour le modèle (le double pour les modèles Haiku)"""
+    return 2 * MIN_CACHEABLE_TOKENS if "haiku" in model else MIN_CACHEABLE_TOKENS
+
+
+def compute_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    """
+    Calcule le coût en dollars d'un nombre de tokens d'entrée et de sortie.
+
+    Raises:
+        ValueError: Si le modèle n'a pas de tarif connu
+    """
+    if model not in PRICING:
+        raise ValueError(f"Tarif inconnu pour le modèle {model}")
+    input_price, output_price = PRICING[model]
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+def compute_usage_cost(
+    model: str,
+    input_tokens: int,
+    output_tokens: int,
+    cache_read_tokens: int = 0,
+    cache_write_tokens: int = 0
+) -> float:
+    """
+    Calcule le coût réel d'une réponse d'après son usage : input_tokens inclut les
+    tokens lus et écrits en cache, facturés à leur propre tarif.
+
+    Raises:
+        ValueError: Si le modèle n'a pas de tarif connu
+    """
+    cost = compute_cost(model, input_tokens - cache_read_tokens - cache_write_tokens, output_tokens)
+    read_factor, write_factor = CACHE_PRICING.get(model, (1.0, 1.0))
+    input_price = PRICING[model][0]
+    return cost + (cache_read_tokens * read_factor + cache_write_tokens * write_factor) * input_price / 1_000_000
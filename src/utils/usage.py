@@ -0,0 +1,96 @@
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from .metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+def _tokens(value: Any) -> int:
+    """Valeur entière d'un champ d'usage (0 si absent ou non renseigné)"""
+    return value if isinstance(value, int) else 0
+
+
+class UsageStats:
+    """
+    Compteurs de tokens d'entrée par fournisseur, dont ceux lus depuis le cache
+    de prompts du fournisseur, d'après les champs `usage` des réponses. Chaque
+    usage alimente aussi les métriques de tokens et de coût par modèle (utils.metrics).
+    """
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _add(
+        self,
+        provider: str,
+        model: Optional[str],
+        input_tokens: int,
+        cache_read: int,
+        cache_write: int,
+        output_tokens: int
+    ) -> None:
+        get_metrics().record_usage(provider, model, input_tokens, cache_read, cache_write, output_tokens)
+        with self._lock:
+            stats = self._stats.setdefault(provider, {
+                "requests": 0, "input_tokens": 0, "cache_read_tokens": 0,
+                "cache_write_tokens": 0, "output_tokens": 0
+            })
+            stats["requests"] += 1
+            stats["input_tokens"] += input_tokens
+            stats["cache_read_tokens"] += cache_read
+            stats["cache_write_tokens"] += cache_write
+            stats["output_tokens"] += output_tokens
+        if cache_read:
+            logger.debug(f"Cache de prompts {provider} : {cache_read}/{input_tokens} tokens d'entrée lus depuis le cache")
+
+    def record_anthropic(self, usage: Optional[Any], model: Optional[str] = None) -> None:
+        """Enregistre l'usage d'une réponse Anthropic (input_tokens exclut les tokens lus ou écrits en cache)"""
+        if usage is None or not isinstance(getattr(usage, "input_tokens", None), int):
+            return
+        cache_read = _tokens(getattr(usage, "cache_read_input_tokens", None))
+        cache_write = _tokens(getattr(usage, "cache_creation_input_tokens", None))
+        self._add(
+            "anthropic",
+            model,
+            usage.input_tokens + cache_read + cache_write,
+            cache_read,
+            cache_write,
+            _tokens(getattr(usage, "output_tokens", None))
+        )
+
+    def record_openai(self, usage: Optional[Any], model: Optional[str] = None) -> None:
+        """Enregistre l'usage d'une réponse OpenAI (prompt_tokens inclut les tokens lus en cache)"""
+        if usage is None or not isinstance(getattr(usage, "prompt_tokens", None), int):
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        self._add(
+            "openai",
+            model,
+            usage.prompt_tokens,
+            _tokens(getattr(details, "cached_tokens", None)),
+            0,
+            _tokens(getattr(usage, "completion_tokens", None))
+        )
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Renvoie les compteurs et le taux de lecture en cache des tokens d'entrée par fournisseur"""
+        with self._lock:
+            snapshot = {provider: dict(stats) for provider, stats in self._stats.items()}
+        for stats in snapshot.values():
+            stats["cache_hit_rate"] = stats["cache_read_tokens"] / stats["input_tokens"] if stats["input_tokens"] else 0.0
+        return snapshot
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+_usage_stats = UsageStats()
+
+
+def get_usage_stats() -> UsageStats:
+    """Renvoie les statistiques d'usage partagées du processus"""
+    return _usage_stats
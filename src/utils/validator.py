@@ -0,0 +1,54 @@
+from typing import Any, List, Optional, Tuple
+
+class SpecificationValidator:
+    """Validation des champs saisis avant tout appel aux agents"""
+
+    @staticmethod
+    def _validate_text(value: Any, label: str, type_error: str) -> List[str]:
+        if value is None:
+            return [f"{label} est obligatoire"]
+        if not isinstance(value, str):
+            return [type_error]
+        if not value.strip():
+            return [f"{label} ne peut pas être vide"]
+        return []
+
+    @staticmethod
+    def _validate_lines(value: Any, label: str, type_error: str) -> List[str]:
+        if value is None:
+            return [f"{label} sont obligatoires"]
+        if isinstance(value, list):
+            value = "\n".join(str(item) for item in value)
+        if not isinstance(value, str):
+            return [type_error]
+        if not value.strip():
+            return [f"{label} ne peuvent pas être vides"]
+        return []
+
+    @classmethod
+    def validate_specification(
+        cls,
+        title: Any,
+        description: Any,
+        requirements: Any,
+        constraints: Any
+    ) -> Tuple[bool, Optional[List[str]]]:
+        """
+        Valide les champs d'une spécification.
+
+        Args:
+            title: Le titre (chaîne non vide)
+            description: La description (chaîne non vide)
+            requirements: Les exigences (chaîne ou liste, une exigence par ligne)
+            constraints: Les contraintes (chaîne ou liste, une contrainte par ligne)
+
+        Returns:
+            (True, None) si la spécification est valide, (False, liste des erreurs) sinon
+        """
+        errors = (
+            cls._validate_text(title, "Le titre", "Le titre doit être une chaîne de caractères")
+            + cls._validate_text(description, "La description", "La description doit être une chaîne de caractères")
+            + cls._validate_lines(requirements, "Les exigences", "Les exigences doivent être une chaîne ou une liste")
+            + cls._validate_lines(constraints, "Les contraintes", "Les contraintes doivent être une chaîne ou une liste")
+        )
+        return (False, errors) if errors else (True, None)
@@ -0,0 +1,143 @@
+"""
+Workers de la file de travaux persistante.
+
+Usage :
+    python src/worker.py --workers 4
+
+Chaque worker est un processus qui réserve les travaux de la file SQLite
+(LLM_JOBS_PATH), exécute le pipeline et enregistre le résultat. Le nombre de
+workers est indépendant de l'interface et du service HTTP, qui ne font que
+soumettre les travaux et consulter leur état. Un worker arrêté brutalement est
+relancé, et son travail est repris à l'expiration de son bail.
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import List
+
+import structlog
+
+from pipeline import SpecificationProcessor, SpecificationValidationError
+from utils.jobs import Job, JobQueue
+from utils.metrics import start_metrics_server
+
+logger = structlog.get_logger(__name__)
+
+def _keep_lease(queue: JobQueue, job: Job, worker_id: str, done: threading.Event) -> None:
+    """Prolonge le bail du travail à chaque tiers de sa durée, jusqu'à la fin de l'exécution"""
+    while not done.wait(queue.lease / 3):
+        if not queue.heartbeat(job.id, worker_id):
+            logger.warning("Bail perdu pendant l'exécution", job_id=job.id)
+            return
+
+def process_job(queue: JobQueue, processor: SpecificationProcessor, job: Job, worker_id: str) -> None:
+    """Exécute un travail réservé et enregistre son résultat ou son erreur"""
+    done = threading.Event()
+    heartbeat = threading.Thread(target=_keep_lease, args=(queue, job, worker_id, done), daemon=True)
+    heartbeat.start()
+    try:
+        result = processor.run(**job.payload)
+    except SpecificationValidationError as e:
+        queue.fail(job.id, worker_id, str(e), retry=False)
+    except Exception as e:
+        logger.error("Erreur lors de l'exécution du travail", job_id=job.id, error=str(e))
+        queue.fail(job.id, worker_id, str(e))
+    else:
+        queue.complete(job.id, worker_id, result)
+    finally:
+        done.set()
+        heartbeat.join()
+
+def run_worker(
+    queue: JobQueue,
+    processor: SpecificationProcessor,
+    worker_id: str,
+    stop: threading.Event,
+    poll_interval: float = 0.5
+) -> int:
+    """
+    Boucle d'un worker : réserve et exécute les travaux jusqu'à l'arrêt demandé.
+
+    Returns:
+        Le nombre de travaux exécutés
+    """
+    processed = 0
+    while not stop.is_set():
+        job = queue.claim(worker_id)
+        if job is None:
+            stop.wait(poll_interval)
+            continue
+        logger.info("Travail réservé", job_id=job.id, attempt=job.attempts, worker=worker_id)
+        process_job(queue, processor, job, worker_id)
+        processed += 1
+    return processed
+
+def _worker_process(index: int, stop, poll_interval: float) -> None:
+    """Point d'entrée d'un processus worker"""
+    from dotenv import load_dotenv
+    from main import get_processor
+    from utils.logging_config import configure_logging
+
+    # L'arrêt est piloté par le superviseur : le travail en cours se termine
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    load_dotenv()
+    configure_logging()
+    if os.environ.get("METRICS_PORT"):
+        # Un port par worker : METRICS_PORT, METRICS_PORT + 1, ...
+        start_metrics_server(int(os.environ["METRICS_PORT"]) + index, host=os.environ.get("METRICS_HOST", "127.0.0.1"))
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    run_worker(JobQueue.from_env(), get_processor(), worker_id, stop, poll_interval)
+
+def supervise(workers: int, poll_interval: float = 0.5, restart_delay: float = 1.0) -> None:
+    """Lance les processus workers et relance ceux qui s'arrêtent, jusqu'à SIGINT ou SIGTERM"""
+    context = multiprocessing.get_context("spawn")
+    stop = context.Event()
+    # Le gestionnaire ne touche pas à `stop` : il interromprait un stop.wait() qui détient son verrou
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+
+    def start(index: int):
+        process = context.Process(target=_worker_process, args=(index, stop, poll_interval), daemon=False)
+        process.start()
+        return process
+
+    processes: List[multiprocessing.Process] = [start(index) for index in range(workers)]
+    logger.info("Workers démarrés", workers=workers)
+    try:
+        while not stopping:
+            time.sleep(restart_delay)
+            for index, process in enumerate(processes):
+                if not stopping and not process.is_alive():
+                    logger.warning("Worker arrêté, relance", index=index, exitcode=process.exitcode)
+                    processes[index] = start(index)
+    except KeyboardInterrupt:
+        pass
+    stop.set()
+    logger.info("Arrêt des workers : fin des travaux en cours")
+    for process in processes:
+        process.join()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Workers de la file de travaux d'évaluation")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("LLM_JOBS_WORKERS", 2)),
+                        help="Nombre de processus workers (LLM_JOBS_WORKERS)")
+    parser.add_argument("--poll-interval", type=float, default=0.5,
+                        help="Délai entre deux consultations d'une file vide, en secondes")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    from utils.logging_config import configure_logging
+
+    load_dotenv()
+    configure_logging()
+    supervise(max(1, args.workers), args.poll_interval)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import sys
+
+import pytest
+from unittest.mock import MagicMock
+
+@pytest.fixture(autouse=True)
+def reset_circuit_breakers():
+    """Isole les tests de l'état des disjoncteurs partagés par fournisseur"""
+    yield
+    module = sys.modules.get("utils.resilience")
+    if module is not None:
+        module.reset_circuit_breakers()
+
+@pytest.fixture
+def mock_anthropic_client():
+    client = MagicMock()
+    client.generate.return_value = "Points forts : ...\nPoints à améliorer : ..."
+    return client
+
+@pytest.fixture
+def mock_openai_client():
+    client = MagicMock()
+    client.generate.return_value = "Points forts : ...\nPoints à améliorer : ..."
+    return client
+
+@pytest.fixture
+def sample_valid_spec():
+    return {
+        "title": "Plateforme de réservation",
+        "description": "Application web de réservation de salles pour les entreprises.",
+        "requirements": "Réservation en ligne\nNotifications par email\nTemps de réponse < 200ms",
+        "constraints": "Budget de 50000€\nConformité RGPD"
+    }
+
+@pytest.fixture
+def expected_structured_spec(sample_valid_spec):
+    return {
+        "title": sample_valid_spec["title"],
+        "description": sample_valid_spec["description"],
+        "sections": [
+            {"title": "Exigences", "content": sample_valid_spec["requirements"].split("\n")},
+            {"title": "Contraintes", "content": sample_valid_spec["constraints"].split("\n")}
+        ]
+    }
+
+@pytest.fixture
+def sample_invalid_spec():
+    return {
+        "title": "",
+        "description": "Description sans titre",
+        "requirements": "Exigence 1",
+        "constraints": "Contrainte 1"
+    }
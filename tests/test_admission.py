@@ -0,0 +1,110 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from utils.admission import AdmissionController, AdmissionRejected
+
+
+def test_file_bornee_et_refus_immediat():
+    """Teste le refus immédiat, avec attente estimée, lorsque la file est pleine"""
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=1)
+        running = controller.enqueue("a")
+        waiting = controller.enqueue("b")
+        with pytest.raises(AdmissionRejected) as rejected:
+            controller.enqueue("c")
+
+        assert not running.queued and waiting.queued
+        assert rejected.value.estimated_wait > 0
+        assert "réessayez dans environ" in str(rejected.value)
+
+        running.release()
+        await waiting.wait()
+        waiting.release()
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["admitted"] == 2 and stats["rejected"] == 1
+    assert stats["queue_depth"] == 0 and stats["running"] == 0
+
+
+def test_equite_entre_sessions():
+    """Teste qu'une session très active ne passe pas devant les autres"""
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_per_session=3)
+        order = []
+
+        async def evaluate(session_id, label):
+            async with controller.admit(session_id):
+                order.append(label)
+                await asyncio.sleep(0.01)
+
+        tasks = [asyncio.create_task(evaluate("lourd", f"lourd-{i}")) for i in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(evaluate("leger", "leger")))
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()).index("leger") == 1
+
+
+def test_limite_par_session():
+    async def scenario():
+        controller = AdmissionController(max_per_session=1)
+        first = controller.enqueue("s")
+        second = controller.enqueue("s")
+        with pytest.raises(AdmissionRejected):
+            controller.enqueue("s")
+        other = controller.enqueue("autre")
+
+        assert not first.queued and second.queued and not other.queued
+        first.release()
+        await second.wait()
+        assert controller.stats()["running"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_annulation_en_attente():
+    """Teste qu'une demande abandonnée en attente libère sa place dans la file"""
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1)
+        running = controller.enqueue("a")
+        waiter = asyncio.create_task(controller.enqueue("b").wait())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert controller.stats()["queue_depth"] == 0
+        running.release()
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["running"] == 0 and stats["admitted"] == 1
+
+
+def test_limites_par_defaut():
+    async def scenario():
+        with patch.dict("os.environ", {}, clear=True):
+            controller = AdmissionController.from_env()
+        assert (controller.max_concurrent, controller.max_per_session, controller.max_queue) == (8, 1, 32)
+        tickets = [controller.enqueue(f"s{index}") for index in range(8)]
+        assert not any(ticket.queued for ticket in tickets)
+        assert controller.enqueue("s8").queued
+        with pytest.raises(AdmissionRejected):
+            controller.enqueue("s8")
+
+    asyncio.run(scenario())
+
+
+def test_limites_desactivees():
+    async def scenario():
+        environ = {"LLM_ADMISSION_MAX_CONCURRENT": "0", "LLM_ADMISSION_MAX_PER_SESSION": "0", "LLM_ADMISSION_MAX_QUEUE": "0"}
+        with patch.dict("os.environ", environ):
+            controller = AdmissionController.from_env()
+        tickets = [controller.enqueue("s") for _ in range(50)]
+        assert not any(ticket.queued for ticket in tickets)
+        assert controller.estimated_wait() == 0.0
+
+    asyncio.run(scenario())
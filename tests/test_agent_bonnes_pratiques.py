@@ -1,4 +1,4 @@
-from src.agents.agent_bonnes_pratiques import BonnesPratiquesAgent
+from agents.agent_bonnes_pratiques import BonnesPratiquesAgent
 import pytest
 
 @pytest.fixture
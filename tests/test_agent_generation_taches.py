@@ -1,7 +1,7 @@
 import unittest
 from unittest.mock import MagicMock
-from src.agents.agent_generation_taches import AgentGenerationTaches
-from src.utils.openai_client import OpenAIClient
+from agents.agent_generation_taches import AgentGenerationTaches
+from utils.openai_client import OpenAIClient
 
 class TestAgentGenerationTaches(unittest.TestCase):
     def setUp(self):
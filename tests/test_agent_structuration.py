@@ -1,4 +1,4 @@
-from src.agents.agent_structuration import StructurationAgent, Specification
+from agents.agent_structuration import StructurationAgent, Specification
 import pytest
 from unittest.mock import MagicMock
 
@@ -1,6 +1,6 @@
 import unittest
 from unittest.mock import patch, MagicMock
-from src.agents.agent_verification_coherence import AgentVerificationCoherence
+from agents.agent_verification_coherence import AgentVerificationCoherence
 
 class TestAgentVerificationCoherence(unittest.TestCase):
     def setUp(self):
@@ -0,0 +1,44 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+from utils.cache import ResponseCache
+from utils.openai_client import AsyncOpenAIClient
+from utils.anthropic_client import AsyncAnthropicClient
+
+@patch.dict("os.environ", {"OPENAI_API_KEY": "test", "ANTHROPIC_API_KEY": "test"})
+class TestAsyncClients(unittest.TestCase):
+    def test_openai_agenerate(self):
+        """Teste la génération asynchrone OpenAI"""
+        client = AsyncOpenAIClient(cache=ResponseCache())
+        client.client = MagicMock()
+        client.client.chat.completions.create = AsyncMock(return_value=MagicMock(
+            choices=[MagicMock(message=MagicMock(content="Réponse test"))]
+        ))
+
+        response = asyncio.run(client.agenerate("Test prompt", system_prompt="Système"))
+
+        self.assertEqual(response, "Réponse test")
+        params = client.client.chat.completions.create.await_args.kwargs
+        self.assertEqual(params["messages"][0], {"role": "system", "content": "Système"})
+        self.assertEqual(params["max_tokens"], 2048)
+
+    def test_anthropic_agenerate(self):
+        """Teste la génération asynchrone Anthropic et la réutilisation du cache"""
+        client = AsyncAnthropicClient(cache=ResponseCache())
+        client.client = MagicMock()
+        client.client.messages.create = AsyncMock(return_value=MagicMock(content=[MagicMock(text="Réponse test")]))
+
+        async def run():
+            return [await client.agenerate("Prompt suffisamment long") for _ in range(2)]
+
+        self.assertEqual(asyncio.run(run()), ["Réponse test", "Réponse test"])
+        client.client.messages.create.assert_awaited_once()
+
+    def test_anthropic_agenerate_prompt_invalide(self):
+        """Teste la validation du prompt en mode asynchrone"""
+        client = AsyncAnthropicClient(cache=ResponseCache())
+        with self.assertRaises(ValueError):
+            asyncio.run(client.agenerate("court"))
+
+if __name__ == '__main__':
+    unittest.main()
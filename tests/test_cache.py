@@ -0,0 +1,64 @@
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from utils.cache import ResponseCache, make_cache_key
+from utils.openai_client import OpenAIClient
+
+def test_make_cache_key_normalise_les_espaces():
+    key = make_cache_key("gpt-4o-mini", "Système", "Prompt de test  \r\nligne 2\n", 2048)
+    assert key == make_cache_key("gpt-4o-mini", "Système", "Prompt de test\nligne 2", 2048)
+    assert key != make_cache_key("gpt-4o", "Système", "Prompt de test\nligne 2", 2048)
+    assert key != make_cache_key("gpt-4o-mini", "Système", "Prompt de test\nligne 2", 4096)
+
+def test_lru_eviction_et_compteurs():
+    cache = ResponseCache(memory_max_entries=2)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert cache.get("a") == "A"
+    cache.set("c", "C")  # "b" est le moins récemment utilisé
+
+    assert cache.get("b") is None
+    assert cache.get("c") == "C"
+    stats = cache.stats()
+    assert stats["memory_hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 1
+
+def test_expiration_ttl():
+    cache = ResponseCache(ttl=0.01)
+    cache.set("a", "A")
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+def test_niveau_disque_persistant(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    ResponseCache(path=path).set("a", "Réponse")
+
+    cache = ResponseCache(path=path)
+    assert cache.get("a") == "Réponse"
+    assert cache.get("a") == "Réponse"
+    stats = cache.stats()
+    assert stats["disk_hits"] == 1
+    assert stats["memory_hits"] == 1
+
+def test_niveau_disque_eviction_par_taille(tmp_path):
+    cache = ResponseCache(memory_max_entries=0, path=str(tmp_path / "cache.sqlite3"), disk_max_bytes=10)
+    cache.set("a", "x" * 6)
+    cache.set("b", "y" * 6)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == "y" * 6
+
+@patch.dict("os.environ", {"OPENAI_API_KEY": "test"})
+def test_openai_client_utilise_le_cache():
+    client = OpenAIClient(cache=ResponseCache())
+    client.client = MagicMock()
+    client.client.chat.completions.create.return_value = MagicMock(
+        choices=[MagicMock(message=MagicMock(content="Réponse test"))]
+    )
+
+    assert client.generate("Test prompt") == "Réponse test"
+    assert client.generate("Test prompt") == "Réponse test"
+    client.client.chat.completions.create.assert_called_once()
+    assert client.cache.stats()["hits"] == 1
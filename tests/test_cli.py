@@ -0,0 +1,112 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import MagicMock
+from cli import iter_specifications, load_done_ids, run_bulk, truncate_partial_line
+
+def _write_jsonl(path, specs):
+    path.write_text("".join(json.dumps(spec) + "\n" for spec in specs), encoding="utf-8")
+
+def _spec(i):
+    return {"id": f"spec-{i}", "title": f"Titre {i}", "description": "D", "requirements": "R", "constraints": "C"}
+
+@pytest.fixture
+def processor():
+    state = {"running": 0, "max_running": 0}
+
+    async def arun(title, description, requirements, constraints, model_choice):
+        state["running"] += 1
+        state["max_running"] = max(state["max_running"], state["running"])
+        await asyncio.sleep(0.01)
+        state["running"] -= 1
+        if title == "Titre 3":
+            raise ValueError("échec")
+        return f"Évaluation de {title}"
+
+    processor = MagicMock()
+    processor.arun = arun
+    processor.state = state
+    return processor
+
+def test_run_bulk_concurrence_bornee(tmp_path, processor):
+    source, output = tmp_path / "specs.jsonl", tmp_path / "resultats.jsonl"
+    _write_jsonl(source, [_spec(i) for i in range(10)])
+
+    summary = asyncio.run(run_bulk(processor, iter_specifications(str(source)), str(output), concurrency=3))
+
+    records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert summary.processed == 10
+    assert summary.failed == 1
+    assert processor.state["max_running"] == 3
+    assert {record["id"] for record in records} == {f"spec-{i}" for i in range(10)}
+    assert next(r for r in records if r["id"] == "spec-3")["status"] == "error"
+
+def test_reprise_apres_interruption(tmp_path, processor):
+    source, output = tmp_path / "specs.jsonl", tmp_path / "resultats.jsonl"
+    _write_jsonl(source, [_spec(i) for i in range(5)])
+    # Deux résultats écrits puis une ligne tronquée par un arrêt brutal
+    output.write_text(
+        json.dumps({"id": "spec-0", "status": "ok"}) + "\n"
+        + json.dumps({"id": "spec-1", "status": "ok"}) + "\n"
+        + '{"id": "spec-2", "sta',
+        encoding="utf-8"
+    )
+    assert load_done_ids(str(output)) == {"spec-0", "spec-1"}
+
+    summary = asyncio.run(run_bulk(processor, iter_specifications(str(source)), str(output), resume=True))
+
+    assert summary.skipped == 2
+    assert summary.processed == 3
+    # La ligne tronquée est retirée : chaque ligne du fichier est un résultat complet
+    records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert [record["id"] for record in records[:2]] == ["spec-0", "spec-1"]
+    assert {record["id"] for record in records[2:]} == {"spec-2", "spec-3", "spec-4"}
+
+def test_reprise_reevalue_les_echecs(tmp_path, processor):
+    source, output = tmp_path / "specs.jsonl", tmp_path / "resultats.jsonl"
+    _write_jsonl(source, [_spec(i) for i in range(3)])
+    output.write_text(
+        json.dumps({"id": "spec-0", "status": "ok"}) + "\n"
+        + json.dumps({"id": "spec-1", "status": "error", "error": "Timeout"}) + "\n",
+        encoding="utf-8"
+    )
+
+    summary = asyncio.run(run_bulk(processor, iter_specifications(str(source)), str(output), resume=True))
+
+    assert summary.skipped == 1
+    assert summary.succeeded == 2
+    assert load_done_ids(str(output)) == {"spec-0", "spec-1", "spec-2"}
+
+def test_fichier_sans_ligne_complete(tmp_path):
+    output = tmp_path / "resultats.jsonl"
+    output.write_text('{"id": "spec-0"', encoding="utf-8")
+    truncate_partial_line(str(output))
+    assert output.read_text(encoding="utf-8") == ""
+
+def test_source_repertoire(tmp_path):
+    (tmp_path / "b.json").write_text(json.dumps({"title": "B"}), encoding="utf-8")
+    _write_jsonl(tmp_path / "a.jsonl", [_spec(1)])
+    (tmp_path / "notes.txt").write_text("ignoré", encoding="utf-8")
+
+    ids = [spec_id for spec_id, _ in iter_specifications(str(tmp_path))]
+
+    assert ids == ["spec-1", "b.json"]
+
+def test_entrees_illisibles(tmp_path, processor):
+    source, output = tmp_path / "archives", tmp_path / "resultats.jsonl"
+    source.mkdir()
+    (source / "a.jsonl").write_text(
+        json.dumps(_spec(0)) + "\n" + '{"id": "spec-1", "title": \n' + "[1, 2]\n" + json.dumps(_spec(2)) + "\n",
+        encoding="utf-8"
+    )
+    (source / "b.json").write_text("{pas du JSON", encoding="utf-8")
+    (source / "c.json").write_bytes(b"\xff\xfe\x00")
+
+    summary = asyncio.run(run_bulk(processor, iter_specifications(str(source)), str(output)))
+
+    records = {record["id"]: record for record in map(json.loads, output.read_text(encoding="utf-8").splitlines())}
+    assert summary.succeeded == 2
+    assert summary.failed == 4
+    assert {"a.jsonl:2", "a.jsonl:3", "b.json", "c.json"} <= records.keys()
+    assert records["a.jsonl:2"]["status"] == "error"
+    assert records["spec-2"]["status"] == "ok"
@@ -0,0 +1,49 @@
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+from utils.client_registry import ClientRegistry, PoolConfig
+
+@patch.dict("os.environ", {"OPENAI_API_KEY": "test", "ANTHROPIC_API_KEY": "test"})
+class TestClientRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = ClientRegistry(PoolConfig(max_connections=8, max_keepalive_connections=4))
+
+    def tearDown(self):
+        self.registry.close()
+
+    def test_client_unique_entre_threads(self):
+        """Teste qu'un seul client est construit malgré des accès concurrents"""
+        clients = []
+        threads = [threading.Thread(target=lambda: clients.append(self.registry.openai())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len({id(client) for client in clients}), 1)
+        self.assertIsNot(self.registry.openai("gpt-4o"), clients[0])
+        self.assertIs(self.registry.anthropic(), self.registry.anthropic())
+
+    def test_pool_configure(self):
+        """Teste que les clients reçoivent un client HTTP configuré avec les limites du pool"""
+        with patch("openai.DefaultHttpxClient") as http_client, \
+                patch("utils.client_registry.OpenAIClient") as client_class:
+            self.registry.openai()
+
+        limits = http_client.call_args.kwargs["limits"]
+        self.assertEqual(limits.max_connections, 8)
+        self.assertEqual(limits.max_keepalive_connections, 4)
+        self.assertIs(client_class.call_args.kwargs["http_client"], http_client.return_value)
+
+    def test_warm_up_tolere_les_echecs(self):
+        """Teste que le préchauffage journalise les échecs sans lever d'exception"""
+        self.registry.openai().client = MagicMock()
+        self.registry.anthropic().client = MagicMock()
+        self.registry.anthropic().client.with_options.return_value.models.list.side_effect = Exception("réseau")
+
+        status = self.registry.warm_up()
+
+        self.assertEqual(status, {"openai": True, "anthropic": False})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from agents.agent_verification_coherence import AgentVerificationCoherence
+from utils.coherence_rules import check_specification
+
+
+def _spec(exigences, contraintes, *autres):
+    return {
+        "title": "Plateforme e-commerce",
+        "description": "Vente en ligne",
+        "sections": [
+            {"title": "Exigences", "content": exigences},
+            {"title": "Contraintes", "content": contraintes},
+            *autres
+        ]
+    }
+
+
+class TestRegles(unittest.TestCase):
+    def test_contraintes_numeriques(self):
+        """Teste la détection des bornes incompatibles sur une même métrique, toutes unités confondues"""
+        report = check_specification(_spec(
+            ["Temps de réponse < 200ms", "Disponibilité > 99%"],
+            ["Le temps de réponse doit être inférieur à 2s", "Budget de 50 000 €", "Budget de 50k€"]
+        ))
+
+        self.assertEqual(report.findings, [
+            "Contraintes numériques contradictoires : « Temps de réponse < 200ms » et "
+            "« Le temps de réponse doit être inférieur à 2s »"
+        ])
+        self.assertEqual(report.passed_sections, [])
+
+    def test_bornes_compatibles(self):
+        report = check_specification(_spec(
+            ["Temps de réponse > 100 ms", "Disponibilité de 99.9%"],
+            ["Temps de réponse au plus 0,5 s", "Couverture de tests > 80%"]
+        ))
+        self.assertEqual(report.findings, [])
+        self.assertEqual(len(report.passed_sections), 2)
+
+    def test_doublons_et_sections_vides(self):
+        report = check_specification(_spec(
+            ["Paiement par carte", "paiement  par Carte", "TODO"], [],
+            {"title": "exigences", "content": ["Suivi des commandes"]}
+        ))
+        self.assertEqual(report.findings, [
+            "Élément en double dans « Exigences » : paiement  par Carte",
+            "Section en double : exigences",
+            "Élément vide dans « Exigences » : TODO",
+            "Section vide : Contraintes"
+        ])
+        self.assertEqual(report.passed_sections, [])
+
+    def test_references_non_definies(self):
+        """Teste les références aux sections, aux exigences numérotées et aux identifiants"""
+        report = check_specification(_spec(
+            ["REQ-1 : Paiement par carte", "REQ-2 : Remboursement, voir REQ-1 et REQ-7"],
+            ["Voir la section Sécurité", "Respecter l'exigence 2 et l'exigence n° 5", "Voir section Exigences",
+             "Norme ISO-27001"]
+        ))
+        self.assertEqual(report.findings, [
+            "Référence non définie dans « Exigences » : REQ-7",
+            "Référence non définie dans « Contraintes » : section Sécurité",
+            "Référence non définie dans « Contraintes » : exigence n° 5"
+        ])
+
+    def test_sections_saines_seules_retenues(self):
+        report = check_specification(_spec(["Paiement par carte"], ["Hébergement en France", "Hébergement en France"]))
+        self.assertEqual([section["title"] for section in report.passed_sections], ["Exigences"])
+
+
+class TestAgentAvecRegles(unittest.TestCase):
+    def setUp(self):
+        self.client = MagicMock()
+        self.client.generate.return_value = "- Incohérence : exigence ambiguë"
+        self.agent = AgentVerificationCoherence(client=self.client)
+
+    def test_reponse_locale_sans_appel(self):
+        """Teste qu'une spécification dont aucune section ne passe les règles est traitée sans appel"""
+        spec = _spec(["Temps de réponse < 200ms"], ["Temps de réponse < 2s"])
+
+        started = time.perf_counter()
+        errors = self.agent.verify_coherence(spec)
+
+        self.assertLess(time.perf_counter() - started, 0.05)
+        self.assertEqual(len(errors), 1)
+        self.client.generate.assert_not_called()
+
+    def test_analyse_des_sections_saines(self):
+        errors = self.agent.verify_coherence(_spec(["Paiement par carte", "TBD"], ["Hébergement en France"]))
+
+        self.assertEqual(errors, ["Élément vide dans « Exigences » : TBD", "- Incohérence : exigence ambiguë"])
+        prompt = self.client.generate.call_args.args[0]
+        self.assertIn("Hébergement en France", prompt)
+        self.assertNotIn("Paiement par carte", prompt)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock
+
+from utils.hedging import Hedger, HedgingConfig, LatencyTracker
+from utils.resilience import CircuitBreaker, Resilience
+
+
+def _config(**kwargs):
+    return HedgingConfig(**{"default_delay": 0.05, "min_samples": 3, **kwargs})
+
+
+def _provider(chunks, delay=0.0, error=None, closed=None):
+    """Flux de test : attend `delay` avant le premier fragment ou échoue avec `error`"""
+    async def stream():
+        try:
+            await asyncio.sleep(delay)
+            if error is not None:
+                raise error
+            for chunk in chunks:
+                yield chunk
+        finally:
+            if closed is not None:
+                closed.append(True)
+    return stream
+
+
+def _collect(hedger, primary, secondary):
+    async def run():
+        return [chunk async for chunk in hedger.stream(primary, secondary)]
+    return asyncio.run(run())
+
+
+class TestLatencyTracker(unittest.TestCase):
+    def test_quantile(self):
+        """Teste le calcul du quantile des délais observés"""
+        tracker = LatencyTracker()
+        self.assertIsNone(tracker.quantile(0.95))
+        for latency in range(1, 101):
+            tracker.record(float(latency))
+        self.assertEqual(tracker.quantile(0.95), 95.0)
+        self.assertEqual(tracker.quantile(0.5), 50.0)
+
+    def test_delai_de_couverture(self):
+        """Teste que le délai suit le p95 une fois assez de mesures collectées"""
+        hedger = Hedger(_config(min_delay=0.1, max_delay=10.0))
+        self.assertEqual(hedger.hedge_delay("anthropic"), 0.05)
+        for latency in (1.0, 2.0, 3.0):
+            hedger.tracker("anthropic").record(latency)
+        self.assertEqual(hedger.hedge_delay("anthropic"), 3.0)
+
+
+class TestHedger(unittest.TestCase):
+    def test_principal_rapide(self):
+        """Teste qu'aucune requête de couverture n'est envoyée si le principal répond à temps"""
+        secondary = MagicMock(side_effect=_provider(["B"]))
+        chunks = _collect(Hedger(_config(default_delay=1.0)), ("a", _provider(["A", "1"])), ("b", secondary))
+
+        self.assertEqual(chunks, ["A", "1"])
+        secondary.assert_not_called()
+
+    def test_couverture_gagnante(self):
+        """Teste que le secondaire l'emporte quand le principal est lent, et que le perdant est annulé"""
+        closed = []
+        hedger = Hedger(_config())
+        chunks = _collect(hedger, ("a", _provider(["A"], delay=2.0, closed=closed)), ("b", _provider(["B", "2"])))
+
+        self.assertEqual(chunks, ["B", "2"])
+        self.assertEqual(closed, [True])
+        self.assertEqual(len(hedger.tracker("b")), 1)
+        # Le délai du perdant annulé est conservé comme borne inférieure
+        self.assertEqual(len(hedger.tracker("a")), 1)
+        self.assertGreaterEqual(hedger.tracker("a").quantile(0.5), 0.05)
+
+    def test_annulation_via_resilience(self):
+        """Teste qu'une couverture annulant l'appel d'essai du principal libère son disjoncteur"""
+        breaker = CircuitBreaker("a", failure_threshold=1, recovery_timeout=0.0)
+        breaker.record_failure()
+        resilience = Resilience("a", breaker=breaker)
+
+        async def primary():
+            # L'ouverture du flux passe par la résilience, comme dans les clients
+            yield await resilience.acall(lambda: asyncio.sleep(2.0, result="A"))
+
+        chunks = _collect(Hedger(_config()), ("a", primary), ("b", _provider(["B"])))
+
+        self.assertEqual(chunks, ["B"])
+        self.assertEqual(breaker.state, "half_open")
+        self.assertTrue(breaker.before_call())
+
+    def test_principal_gagne_apres_couverture(self):
+        """Teste que le principal est conservé s'il répond avant le secondaire"""
+        chunks = _collect(
+            Hedger(_config()),
+            ("a", _provider(["A"], delay=0.1)),
+            ("b", _provider(["B"], delay=2.0))
+        )
+        self.assertEqual(chunks, ["A"])
+
+    def test_bascule_sur_echec(self):
+        """Teste la bascule immédiate sur le secondaire quand le principal échoue"""
+        chunks = _collect(
+            Hedger(_config(default_delay=10.0)),
+            ("a", _provider([], error=ConnectionError("indisponible"))),
+            ("b", _provider(["B"]))
+        )
+        self.assertEqual(chunks, ["B"])
+
+    def test_echec_des_deux(self):
+        """Teste que l'erreur est remontée si aucun fournisseur ne répond"""
+        with self.assertRaises(RuntimeError):
+            _collect(
+                Hedger(_config()),
+                ("a", _provider([], error=ConnectionError("indisponible"))),
+                ("b", _provider([], error=RuntimeError("surcharge")))
+            )
+
+    def test_failover_synchrone(self):
+        """Teste la bascule synchrone sur échec avant le premier token"""
+        def failing():
+            raise ConnectionError("indisponible")
+            yield
+
+        hedger = Hedger(_config())
+        chunks = list(hedger.failover_stream(("a", failing), ("b", lambda: iter(["B", "2"]))))
+        self.assertEqual(chunks, ["B", "2"])
+
+    def test_ordre_par_latence(self):
+        """Teste que le fournisseur le plus rapide devient principal une fois mesuré"""
+        hedger = Hedger(_config())
+        self.assertEqual(hedger.order(["a", "b"]), ["a", "b"])
+        for latency in (1.0, 1.5, 2.0):
+            hedger.tracker("a").record(latency * 3)
+            hedger.tracker("b").record(latency)
+        self.assertEqual(hedger.order(["a", "b"]), ["b", "a"])
+
+
+class TestFastestMode(unittest.TestCase):
+    def test_pipeline_fastest(self):
+        """Teste le mode fastest du pipeline avec bascule de l'évaluation asynchrone"""
+        from pipeline import FASTEST, SpecificationProcessor
+
+        async_anthropic = MagicMock()
+        async_anthropic.agenerate_stream.side_effect = lambda **kwargs: _provider([], error=ConnectionError("panne"))()
+        async_openai = MagicMock()
+        async_openai.agenerate_stream.side_effect = lambda **kwargs: _provider(["Réponse", " OpenAI"])()
+        processor = SpecificationProcessor(
+            MagicMock(), MagicMock(), async_anthropic, async_openai, hedger=Hedger(_config())
+        )
+
+        response = asyncio.run(processor._aevaluate("Prompt d'évaluation", FASTEST))
+
+        self.assertEqual(response, "Réponse OpenAI")
+        async_anthropic.agenerate_stream.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
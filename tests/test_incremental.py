@@ -0,0 +1,142 @@
+import asyncio
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from agents.orchestrator import Orchestrator, Stage
+from pipeline import SessionMemo, SpecificationProcessor
+
+
+@pytest.fixture
+def agents(sample_valid_spec):
+    return {
+        'coherence_verifier': Mock(verify_coherence=Mock(return_value=[])),
+        'structuration_agent': Mock(structurer=Mock(return_value=sample_valid_spec)),
+        'task_generator': Mock(generer_taches=Mock(return_value="# Liste des tâches\n- [ ] Tâche 1")),
+        'best_practices_agent': Mock(appliquer_bonnes_pratiques=Mock(return_value=sample_valid_spec))
+    }
+
+
+@pytest.fixture
+def processor(mock_anthropic_client, mock_openai_client, agents):
+    processor = SpecificationProcessor(mock_anthropic_client, mock_openai_client)
+    processor._initialize_agents = lambda: agents
+    return processor
+
+
+def test_orchestrateur_saute_les_sorties_fournies():
+    """Teste qu'une étape dont la sortie figure dans le contexte n'est pas exécutée"""
+    stage_a = Mock(return_value="A")
+    orchestrator = Orchestrator([
+        Stage("a", stage_a, ["specification"], "a"),
+        Stage("b", lambda a: a + "B", ["a"], "b")
+    ])
+
+    result = orchestrator.run({"specification": "x", "a": "mémorisé "})
+
+    stage_a.assert_not_called()
+    assert result.outputs["b"] == "mémorisé B"
+    assert result.reused == ["a"]
+    assert set(result.durations) == {"b"}
+
+
+def test_modification_des_contraintes(processor, agents, sample_valid_spec):
+    """Teste que modifier les contraintes ne régénère pas les tâches"""
+    session = SessionMemo()
+    processor.run(**sample_valid_spec, session=session)
+    report = processor.run(**{**sample_valid_spec, "constraints": "Budget de 80000€"}, session=session)
+
+    assert agents['task_generator'].generer_taches.call_count == 1
+    assert agents['coherence_verifier'].verify_coherence.call_count == 2
+    assert agents['structuration_agent'].structurer.call_count == 2
+    assert agents['best_practices_agent'].appliquer_bonnes_pratiques.call_count == 2
+    assert "Génération des tâches (résultat réutilisé)" in report
+    assert "Budget de 80000€" in processor.anthropic_client.generate.call_args.kwargs["prompt"][-1]["text"]
+
+
+def test_modification_du_titre(processor, agents, sample_valid_spec):
+    """Teste que modifier le titre invalide toutes les étapes"""
+    session = SessionMemo()
+    processor.run(**sample_valid_spec, session=session)
+    processor.run(**{**sample_valid_spec, "title": "Plateforme de location"}, session=session)
+
+    for agent, method in (('task_generator', 'generer_taches'), ('coherence_verifier', 'verify_coherence'),
+                          ('structuration_agent', 'structurer')):
+        assert getattr(agents[agent], method).call_count == 2
+
+
+def test_sessions_independantes(processor, agents, sample_valid_spec):
+    """Teste que la mémoire est propre à chaque session, et absente sans session"""
+    processor.run(**sample_valid_spec, session=SessionMemo())
+    processor.run(**{**sample_valid_spec, "constraints": "Autre contrainte"}, session=SessionMemo())
+    processor.run(**{**sample_valid_spec, "constraints": "Encore une autre"})
+
+    assert agents['task_generator'].generer_taches.call_count == 3
+
+
+def test_etape_en_echec_non_memorisee(processor, agents, sample_valid_spec):
+    """Teste qu'une étape optionnelle en échec est réexécutée à l'évaluation suivante"""
+    agents['structuration_agent'].structurer.side_effect = [RuntimeError("panne"), sample_valid_spec]
+    session = SessionMemo()
+    processor.run(**sample_valid_spec, session=session)
+    processor.run(**sample_valid_spec, session=session)
+
+    assert agents['structuration_agent'].structurer.call_count == 2
+    assert agents['coherence_verifier'].verify_coherence.call_count == 1
+
+
+def test_flux_asynchrone(processor, agents, sample_valid_spec):
+    """Teste la réutilisation des tâches dans le flux asynchrone utilisé par l'interface"""
+    session = SessionMemo()
+
+    async def run(spec):
+        return [partial async for partial in processor.aprocess_stream(**spec, session=session)]
+
+    asyncio.run(run(sample_valid_spec))
+    partials = asyncio.run(run({**sample_valid_spec, "constraints": "Hébergement en France"}))
+
+    assert agents['task_generator'].generer_taches.call_count == 1
+    assert "(résultat réutilisé)" in partials[-1]
+
+
+def test_session_des_appels_regroupes(processor, agents, sample_valid_spec):
+    """Teste qu'un appel regroupé avec un calcul en cours reprend ses résultats dans sa session"""
+    started = threading.Event()
+
+    def generer_taches(*args, **kwargs):
+        started.set()
+        time.sleep(0.2)
+        return "# Liste des tâches\n- [ ] Tâche 1"
+
+    agents['task_generator'].generer_taches.side_effect = generer_taches
+    follower = SessionMemo()
+    leader = threading.Thread(target=processor.process, kwargs={**sample_valid_spec, "session": SessionMemo()})
+    leader.start()
+    started.wait()
+    processor.process(**sample_valid_spec, session=follower)
+    leader.join()
+
+    report = processor.run(**{**sample_valid_spec, "constraints": "Hébergement en France"}, session=follower)
+
+    assert agents['task_generator'].generer_taches.call_count == 1
+    assert "(résultat réutilisé)" in report
+
+
+def test_session_des_flux_regroupes(processor, agents, sample_valid_spec):
+    """Teste que chaque lecteur d'un flux regroupé reprend les résultats dans sa session"""
+    sessions = [SessionMemo(), SessionMemo()]
+
+    async def read(session):
+        return [partial async for partial in processor.aprocess_stream(**sample_valid_spec, session=session)]
+
+    async def run():
+        return await asyncio.gather(*(read(session) for session in sessions))
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert not any(isinstance(partial, SessionMemo) for partial in first)
+    for session in sessions:
+        processor.run(**{**sample_valid_spec, "constraints": "Hébergement en France"}, session=session)
+    assert agents['task_generator'].generer_taches.call_count == 1
@@ -1,13 +1,13 @@
 import pytest
 from unittest.mock import Mock
-from src.main import SpecificationProcessor
-from src.utils.validator import SpecificationValidator
-from src.agents.agent_structuration import AgentStructuration
-from src.agents.agent_verification_coherence import AgentVerificationCoherence
-from src.agents.agent_generation_taches import AgentGenerationTaches
-from src.agents.agent_bonnes_pratiques import AgentBonnesPratiques
-from src.utils.openai_client import OpenAIClient
-from src.utils.anthropic_client import AnthropicClient
+from main import SpecificationProcessor
+from utils.validator import SpecificationValidator
+from agents.agent_structuration import AgentStructuration
+from agents.agent_verification_coherence import AgentVerificationCoherence
+from agents.agent_generation_taches import AgentGenerationTaches
+from agents.agent_bonnes_pratiques import AgentBonnesPratiques
+from utils.openai_client import OpenAIClient
+from utils.anthropic_client import AnthropicClient
 
 class TestIntegration:
     @pytest.fixture
@@ -209,14 +209,17 @@ class TestIntegration:
             model_choice="anthropic"
         )
         
-        # Vérifier l'ordre d'exécution
-        expected_order = [
+        # Vérifier l'ordre d'exécution : les agents indépendants s'exécutent en parallèle,
+        # seules les dépendances du graphe imposent un ordre
+        assert sorted(execution_order) == sorted([
             'verify_coherence',
             'structurer',
             'generer_taches',
             'appliquer_bonnes_pratiques'
-        ]
-        assert execution_order == expected_order
+        ])
+        # Les bonnes pratiques se fondent sur la spécification brute, sans attendre la structuration
+        spec = best_practices_agent.appliquer_bonnes_pratiques.call_args.args[0]
+        assert spec["title"] == sample_valid_spec["title"]
 
     def test_error_handling_workflow(self, processor, sample_invalid_spec):
         """Test la gestion des erreurs dans le flux"""
@@ -393,3 +396,50 @@ class TestIntegration:
         assert sample_valid_spec["title"] in prompt
         assert "Exigences" in prompt
         assert "Contraintes" in prompt
+
+    def test_rapport_de_structuration(self, processor, sample_valid_spec):
+        """Teste que les métriques et recommandations de la structuration figurent dans le rapport"""
+        analysis = {
+            "quality_score": 0.5,
+            "requirements_analysis": {"count": 3, "specificity": True},
+            "constraints_analysis": {"count": 2, "has_legal": True},
+            "recommendations": ["Préciser les volumes attendus"]
+        }
+        agents = {
+            'coherence_verifier': Mock(verify_coherence=Mock(return_value=None)),
+            'structuration_agent': Mock(structurer=Mock(return_value={**sample_valid_spec, "analysis": analysis})),
+            'task_generator': Mock(generer_taches=Mock(return_value="# Liste des tâches\n- [ ] Tâche 1")),
+            'best_practices_agent': Mock(appliquer_bonnes_pratiques=Mock(return_value=sample_valid_spec))
+        }
+        processor._initialize_agents = lambda: agents
+
+        report = processor.run(**sample_valid_spec)
+
+        assert "#### Structuration" in report
+        assert "- Qualité de la description : 50%" in report
+        assert "- Contraintes : 2 (dont contraintes légales)" in report
+        assert "- Préciser les volumes attendus" in report
+
+    def test_process_stream(self, processor, sample_valid_spec):
+        """Test la diffusion progressive du rapport"""
+        agents = {
+            'coherence_verifier': Mock(verify_coherence=Mock(return_value=None)),
+            'structuration_agent': Mock(structurer=Mock(return_value=sample_valid_spec)),
+            'task_generator': Mock(generer_taches=Mock(return_value="# Liste des tâches\n- [ ] Tâche 1")),
+            'best_practices_agent': Mock(appliquer_bonnes_pratiques=Mock(return_value=sample_valid_spec))
+        }
+        processor._initialize_agents = lambda: agents
+        processor.anthropic_client.generate_stream.return_value = iter(["Points forts", " et Points à améliorer"])
+
+        partials = list(processor.process_stream(
+            title=sample_valid_spec["title"],
+            description=sample_valid_spec["description"],
+            requirements=sample_valid_spec["requirements"],
+            constraints=sample_valid_spec["constraints"],
+            model_choice="anthropic"
+        ))
+
+        assert "Évaluation en cours" in partials[0]
+        assert "Points à améliorer" not in partials[-2]
+        assert "Points forts et Points à améliorer" in partials[-1]
+        assert "Agents impliqués" in partials[-1]
@@ -0,0 +1,173 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from pipeline import SpecificationValidationError
+from service import EvaluationService
+from utils.jobs import DONE, FAILED, QUEUED, RUNNING, JobNotFound, JobQueue
+from worker import process_job, run_worker
+from tests.test_service import _request
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "jobs.sqlite3")
+
+
+@pytest.fixture
+def queue(path):
+    queue = JobQueue(path)
+    yield queue
+    queue.close()
+
+
+def test_soumission_et_resultat(queue):
+    job_id = queue.submit({"title": "Spécification"})
+    assert queue.get(job_id).status == QUEUED
+
+    job = queue.claim("w1")
+    assert job.id == job_id and job.status == RUNNING and job.attempts == 1
+    assert job.payload == {"title": "Spécification"}
+    assert queue.claim("w2") is None
+
+    queue.complete(job_id, "w1", "# Rapport")
+    job = queue.get(job_id)
+    assert job.finished and job.status == DONE and job.result == "# Rapport"
+    assert queue.stats() == {QUEUED: 0, RUNNING: 0, DONE: 1, FAILED: 0}
+
+
+def test_travail_inconnu(queue):
+    with pytest.raises(JobNotFound):
+        queue.get("inconnu")
+
+
+def test_ordre_de_soumission(queue):
+    first, second = queue.submit({"n": 1}), queue.submit({"n": 2})
+    assert queue.claim("w").id == first
+    assert queue.claim("w").id == second
+
+
+def test_reprise_apres_expiration_du_bail(path):
+    """Un worker arrêté en cours d'exécution : le travail est repris, puis abandonné"""
+    queue = JobQueue(path, lease=0.05, max_attempts=2)
+    job_id = queue.submit({})
+    assert queue.claim("w1").attempts == 1
+    time.sleep(0.1)
+
+    job = queue.claim("w2")
+    assert job.id == job_id and job.attempts == 2
+    # Le premier worker a perdu son bail : ses écritures sont ignorées
+    assert not queue.heartbeat(job_id, "w1")
+    queue.complete(job_id, "w1", "trop tard")
+    assert queue.get(job_id).status == RUNNING
+
+    time.sleep(0.1)
+    assert queue.claim("w3") is None
+    job = queue.get(job_id)
+    assert job.status == FAILED and "2 tentative(s)" in job.error
+    queue.close()
+
+
+def test_heartbeat_prolonge_le_bail(path):
+    queue = JobQueue(path, lease=0.1)
+    job_id = queue.submit({})
+    queue.claim("w1")
+    for _ in range(3):
+        time.sleep(0.05)
+        assert queue.heartbeat(job_id, "w1")
+    assert queue.claim("w2") is None
+    queue.close()
+
+
+def test_echec_avec_et_sans_reprise(path):
+    queue = JobQueue(path, max_attempts=2)
+    job_id = queue.submit({})
+    queue.fail(queue.claim("w").id, "w", "Timeout")
+    assert queue.get(job_id).status == QUEUED
+    queue.fail(queue.claim("w").id, "w", "Timeout")
+    assert queue.get(job_id).status == FAILED
+
+    other = queue.submit({})
+    queue.fail(queue.claim("w").id, "w", "Spécification invalide", retry=False)
+    job = queue.get(other)
+    assert job.status == FAILED and job.attempts == 1
+    queue.close()
+
+
+def test_persistance_entre_processus(path):
+    """Les travaux survivent à la fermeture de la file (redémarrage)"""
+    queue = JobQueue(path)
+    job_id = queue.submit({"title": "T"})
+    queue.close()
+
+    reopened = JobQueue(path)
+    assert reopened.claim("w").id == job_id
+    reopened.close()
+
+
+def test_attente(queue):
+    job_id = queue.submit({})
+    assert queue.wait(job_id, timeout=0.05, poll_interval=0.01).status == QUEUED
+
+    queue.claim("w")
+    threading.Timer(0.05, queue.complete, args=(job_id, "w", "ok")).start()
+    assert queue.wait(job_id, timeout=2, poll_interval=0.01).result == "ok"
+
+
+def test_worker(queue):
+    processor = MagicMock()
+    processor.run.side_effect = lambda **spec: f"Rapport : {spec['title']}"
+    ids = [queue.submit({"title": f"Spec {i}", "model_choice": "openai"}) for i in range(3)]
+
+    stop = threading.Event()
+    thread = threading.Thread(target=run_worker, args=(queue, processor, "w", stop, 0.01))
+    thread.start()
+    try:
+        results = [queue.wait(job_id, timeout=5, poll_interval=0.01) for job_id in ids]
+    finally:
+        stop.set()
+        thread.join()
+
+    assert [job.result for job in results] == ["Rapport : Spec 0", "Rapport : Spec 1", "Rapport : Spec 2"]
+    processor.run.assert_any_call(title="Spec 0", model_choice="openai")
+
+
+def test_worker_erreurs(queue):
+    processor = MagicMock()
+    invalid, transient = queue.submit({"title": ""}), queue.submit({"title": "T"})
+
+    processor.run.side_effect = SpecificationValidationError(["Le titre ne peut pas être vide"])
+    process_job(queue, processor, queue.claim("w"), "w")
+    assert queue.get(invalid).status == FAILED
+
+    processor.run.side_effect = RuntimeError("API indisponible")
+    process_job(queue, processor, queue.claim("w"), "w")
+    job = queue.get(transient)
+    assert job.status == QUEUED and job.error == "API indisponible"
+
+
+def test_routes_du_service(queue, sample_valid_spec):
+    processor = MagicMock()
+    app = EvaluationService(lambda: processor, job_queue_factory=lambda: queue)
+
+    response = _request(app, "POST", "/jobs", json=sample_valid_spec)
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    assert queue.get(job_id).payload == {**sample_valid_spec, "model_choice": "anthropic"}
+
+    status = _request(app, "GET", f"/jobs/{job_id}").json()
+    assert status["status"] == QUEUED and "payload" not in status
+    assert _request(app, "GET", "/jobs/inconnu").status_code == 404
+    assert _request(app, "DELETE", f"/jobs/{job_id}").status_code == 405
+
+    invalid = _request(app, "POST", "/jobs", json={**sample_valid_spec, "title": ""})
+    assert invalid.status_code == 422
+    assert queue.stats()[QUEUED] == 1
+    processor.arun.assert_not_called()
+
+
+def test_routes_absentes_sans_file():
+    app = EvaluationService(MagicMock)
+    assert _request(app, "POST", "/jobs", json={}).status_code == 404
@@ -0,0 +1,121 @@
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from agents.agent_bonnes_pratiques import BEST_PRACTICES_FORMAT, BonnesPratiquesAgent
+from utils.cache import ResponseCache
+from utils.json_stream import JsonItemParser, parse_json, repair_json
+from utils.openai_client import JSON_OBJECT, OpenAIClient
+from utils.practices import PracticesCatalog
+
+PRATIQUES = [
+    {"titre": "Chiffrement", "description": "Chiffrer les données {au repos}", "tags": ["RGPD", "]"]},
+    {"titre": "Journalisation", "description": "Tracer les accès \"sensibles\"", "tags": []},
+]
+
+
+def _chunks(text, size=7):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class TestJsonItemParser(unittest.TestCase):
+    def test_elements_au_fil_du_flux(self):
+        """Teste que chaque objet est renvoyé dès que sa fermeture est reçue"""
+        text = json.dumps({"meta": {"liste": [{"x": 1}]}, "pratiques": PRATIQUES}, ensure_ascii=False)
+        first_end = text.index('"]"]}') + len('"]"]}')
+        parser = JsonItemParser("pratiques")
+
+        self.assertEqual(parser.feed(text[:first_end - 1]), [])
+        self.assertEqual(parser.feed(text[first_end - 1:first_end + 2]), [PRATIQUES[0]])
+        self.assertEqual(parser.feed(text[first_end + 2:]), [PRATIQUES[1]])
+
+    def test_fragments_quelconques(self):
+        """Teste un découpage arbitraire, un bloc de code Markdown et un tableau racine"""
+        text = "```json\n" + json.dumps({"pratiques": PRATIQUES}) + "\n```"
+        self.assertEqual(list(JsonItemParser("pratiques").items(_chunks(text))), PRATIQUES)
+        self.assertEqual(list(JsonItemParser("pratiques").items(_chunks(json.dumps(PRATIQUES), 3))), PRATIQUES)
+
+    def test_dernier_element_tronque(self):
+        """Teste la réparation locale du dernier objet d'une réponse interrompue"""
+        text = json.dumps({"pratiques": PRATIQUES}, ensure_ascii=False)
+        truncated = text[:text.index("sensibles")]
+
+        parser = JsonItemParser("pratiques")
+        items = list(parser.items(_chunks(truncated)))
+
+        self.assertEqual(items[0], PRATIQUES[0])
+        self.assertEqual(items[1]["titre"], "Journalisation")
+        self.assertEqual(parser.repaired, [items[1]])
+
+
+class TestRepairJson(unittest.TestCase):
+    def test_virgules_et_texte_autour(self):
+        self.assertEqual(parse_json('Voici :\n{"a": [1, 2,], "b": {"c": 3,},}\nBonne lecture'),
+                         {"a": [1, 2], "b": {"c": 3}})
+
+    def test_reponse_tronquee(self):
+        self.assertEqual(json.loads(repair_json('{"a": 1, "b": "tex')), {"a": 1, "b": "tex"})
+        self.assertEqual(json.loads(repair_json('{"a": 1, "tit')), {"a": 1})
+        self.assertEqual(json.loads(repair_json('[{"a": 1}, {"b":')), [{"a": 1}, {"b": None}])
+
+    def test_irreparable(self):
+        with self.assertRaises(ValueError):
+            parse_json("Aucune donnée structurée")
+
+
+@patch.dict("os.environ", {"OPENAI_API_KEY": "test"})
+class TestSortiesStructurees(unittest.TestCase):
+    def test_generate_json(self):
+        """Teste le mode JSON, la clé de cache propre au format et la réparation locale"""
+        client = OpenAIClient(cache=ResponseCache())
+        client.client = MagicMock()
+        client.client.chat.completions.create.return_value = MagicMock(
+            choices=[MagicMock(message=MagicMock(content='{"pratiques": [{"titre": "A"},'))]
+        )
+
+        self.assertEqual(client.generate_json("Réponds en JSON"), {"pratiques": [{"titre": "A"}]})
+        self.assertEqual(client.client.chat.completions.create.call_args.kwargs["response_format"], JSON_OBJECT)
+
+        client.client.chat.completions.create.return_value = MagicMock(
+            choices=[MagicMock(message=MagicMock(content="Texte libre"))]
+        )
+        self.assertEqual(client.generate("Réponds en JSON"), "Texte libre")
+        self.assertEqual(client.client.chat.completions.create.call_count, 2)
+
+
+def test_agent_bonnes_pratiques_progressif():
+    """Teste que l'agent renvoie les pratiques au fil du flux, avec le schéma imposé"""
+    client = MagicMock()
+    text = json.dumps({"pratiques": PRATIQUES}, ensure_ascii=False)
+    client.generate_stream.return_value = iter(_chunks(text))
+    agent = BonnesPratiquesAgent(client=client, catalog=PracticesCatalog())
+
+    stream = agent.rechercher_stream({"technologies": ["Python"], "domaine": "sécurité", "contraintes": ["RGPD"]})
+
+    assert next(stream) == PRATIQUES[0]
+    assert list(stream) == [PRATIQUES[1]]
+    kwargs = client.generate_stream.call_args.kwargs
+    assert kwargs["response_format"] is BEST_PRACTICES_FORMAT
+    assert "model" not in kwargs
+
+
+def test_agent_bonnes_pratiques_reponse_interrompue():
+    """Teste que la pratique réparée d'une réponse interrompue est renvoyée sans être apprise"""
+    client = MagicMock()
+    text = json.dumps({"pratiques": PRATIQUES}, ensure_ascii=False)
+    client.generate_stream.return_value = iter(_chunks(text[:text.index("sensibles")]))
+    catalog = PracticesCatalog()
+    agent = BonnesPratiquesAgent(client=client, catalog=catalog)
+
+    with patch.object(catalog, "add", wraps=catalog.add) as add, patch.object(catalog, "persist"):
+        pratiques = agent.rechercher({"technologies": ["Python"], "domaine": "sécurité", "contraintes": ["RGPD"]})
+
+    assert [pratique["titre"] for pratique in pratiques] == [PRATIQUES[0]["titre"], "Journalisation"]
+    assert add.call_args.args[0] == [PRATIQUES[0]]
+
+
+def test_agent_bonnes_pratiques_erreur():
+    """Teste qu'une erreur du fournisseur donne une liste vide"""
+    client = MagicMock()
+    client.generate_stream.side_effect = ConnectionError("panne")
+    assert BonnesPratiquesAgent(client=client, catalog=PracticesCatalog()).rechercher({"technologies": [], "domaine": "web", "contraintes": []}) == []
@@ -0,0 +1,25 @@
+import sys
+from unittest.mock import patch
+
+from bench_import import measure
+from utils.lazy import lazy_import
+
+
+def test_import_a_froid_sans_dependances_lourdes():
+    """Teste que l'import de l'application ne charge ni gradio ni les SDK, même sans clé d'API"""
+    for module in ("main", "cli"):
+        assert measure(module, runs=1)["loaded"] == []
+
+
+def test_chemin_d_import_unique():
+    """Teste que l'application n'est chargée que par son chemin d'import sans préfixe"""
+    import pipeline  # noqa: F401
+
+    assert not [name for name in sys.modules if name == "src" or name.startswith("src.")]
+
+
+def test_module_differe():
+    module = lazy_import("json")
+    assert module.dumps([1]) == "[1]"
+    with patch("json.dumps", return_value="patché"):
+        assert module.dumps([1]) == "patché"
@@ -0,0 +1,202 @@
+import asyncio
+import gc
+import threading
+import time
+import urllib.request
+from unittest.mock import MagicMock
+
+import pytest
+
+from utils.cache import ResponseCache
+from utils.metrics import (
+    AGENT_DURATION, AGENT_ERRORS, COST, REQUEST_DURATION, REQUEST_ERRORS, TIME_TO_FIRST_TOKEN, TOKENS,
+    Metrics, format_gauges, get_metrics, start_metrics_server
+)
+from utils.openai_client import OpenAIClient
+from utils.tokens import compute_usage_cost
+from utils.usage import UsageStats
+
+MODEL = (("provider", "openai"), ("model", "gpt-4o-mini"))
+
+
+@pytest.fixture
+def metrics():
+    metrics = get_metrics()
+    metrics.reset()
+    yield metrics
+    metrics.reset()
+
+
+def test_agregation_des_threads():
+    metrics = Metrics(buckets=(1.0, 10.0))
+
+    def work():
+        for _ in range(1000):
+            metrics.inc("llm_requests_total", MODEL)
+        metrics.observe(REQUEST_DURATION, MODEL, 0.5)
+        metrics.observe(REQUEST_DURATION, MODEL, 5.0)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    counters, histograms = metrics.snapshot()
+    assert counters[("llm_requests_total", MODEL)] == 4000
+    # Effectifs par intervalle (≤ 1, ≤ 10, +Inf) puis somme
+    assert histograms[(REQUEST_DURATION, MODEL)] == [4, 4, 0, 22.0]
+
+
+def test_registres_des_threads_termines_liberes():
+    """Teste que les registres des threads terminés sont libérés sans perdre leurs valeurs"""
+    metrics = Metrics(buckets=(1.0,))
+
+    def work():
+        metrics.inc("llm_requests_total", MODEL)
+        metrics.observe(REQUEST_DURATION, MODEL, 0.5)
+
+    for _ in range(50):
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+    gc.collect()
+
+    assert len(metrics._shards) == 1
+    counters, histograms = metrics.snapshot()
+    assert counters[("llm_requests_total", MODEL)] == 50
+    assert histograms[(REQUEST_DURATION, MODEL)] == [50, 0, 25.0]
+
+
+def test_exposition_prometheus():
+    metrics = Metrics(buckets=(0.1, 1.0))
+    metrics.observe(REQUEST_DURATION, MODEL + (("operation", "generate"),), 0.05)
+    metrics.observe(REQUEST_DURATION, MODEL + (("operation", "generate"),), 2.0)
+    metrics.inc(REQUEST_ERRORS, (("type", 'Erreur "rare"'),))
+
+    lines = metrics.render().splitlines()
+    labels = 'provider="openai",model="gpt-4o-mini",operation="generate"'
+    assert "# TYPE llm_request_duration_seconds histogram" in lines
+    assert f'llm_request_duration_seconds_bucket{{{labels},le="0.1"}} 1' in lines
+    assert f'llm_request_duration_seconds_bucket{{{labels},le="1.0"}} 1' in lines
+    assert f'llm_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in lines
+    assert f"llm_request_duration_seconds_sum{{{labels}}} 2.05" in lines
+    assert f"llm_request_duration_seconds_count{{{labels}}} 2" in lines
+    assert 'llm_request_errors_total{type="Erreur \\"rare\\""} 1' in lines
+    assert Metrics().render() == ""
+
+
+def test_cout_reel():
+    """Les tokens lus et écrits en cache sont facturés à leur propre tarif"""
+    assert compute_usage_cost("gpt-4o-mini", 1000, 100) == pytest.approx((1000 * 0.15 + 100 * 0.6) / 1e6)
+    assert compute_usage_cost("claude-3-5-sonnet-20241022", 2000, 0, cache_read_tokens=1000, cache_write_tokens=500) \
+        == pytest.approx((500 * 3.0 + 1000 * 0.3 + 500 * 3.75) / 1e6)
+    with pytest.raises(ValueError):
+        compute_usage_cost("modele-inconnu", 10, 10)
+
+
+def test_usage_et_cout(metrics):
+    stats = UsageStats()
+    stats.record_openai(MagicMock(prompt_tokens=2000, completion_tokens=100,
+                                  prompt_tokens_details=MagicMock(cached_tokens=1000)), "gpt-4o-mini")
+    stats.record_openai(MagicMock(prompt_tokens=10, completion_tokens=1, prompt_tokens_details=None), "modele-inconnu")
+
+    counters, _ = metrics.snapshot()
+    assert counters[(TOKENS, MODEL + (("kind", "input"),))] == 2000
+    assert counters[(TOKENS, MODEL + (("kind", "cache_read"),))] == 1000
+    assert counters[(TOKENS, MODEL + (("kind", "output"),))] == 100
+    assert counters[(COST, MODEL)] == pytest.approx(compute_usage_cost("gpt-4o-mini", 2000, 100, 1000))
+    # Modèle sans tarif : tokens comptés, sans coût
+    unknown = (("provider", "openai"), ("model", "modele-inconnu"))
+    assert counters[(TOKENS, unknown + (("kind", "input"),))] == 10
+    assert (COST, unknown) not in counters
+
+
+def test_instrumentation_des_agents():
+    metrics = Metrics()
+
+    class Agent:
+        @metrics.instrument
+        def analyser(self, valeur):
+            if valeur is None:
+                raise ValueError("valeur manquante")
+            return valeur
+
+        @metrics.instrument
+        async def aanalyser(self, valeur):
+            return valeur
+
+    agent = Agent()
+    assert agent.analyser(1) == 1
+    with pytest.raises(ValueError):
+        agent.analyser(None)
+    assert asyncio.run(agent.aanalyser(2)) == 2
+
+    counters, histograms = metrics.snapshot()
+    labels = (("agent", "test_instrumentation_des_agents.<locals>.Agent"), ("method", "analyser"))
+    assert histograms[(AGENT_DURATION, labels)][:-1].count(0) == len(metrics.buckets)
+    assert sum(histograms[(AGENT_DURATION, labels)][:-1]) == 2
+    assert counters[(AGENT_ERRORS, labels + (("type", "ValueError"),))] == 1
+    async_labels = (("agent", labels[0][1]), ("method", "aanalyser"))
+    assert sum(histograms[(AGENT_DURATION, async_labels)][:-1]) == 1
+
+
+def test_appels_du_client(metrics, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    client = OpenAIClient(cache=ResponseCache())
+    client.client = MagicMock()
+    client.client.chat.completions.create.return_value = MagicMock(
+        choices=[MagicMock(message=MagicMock(content="Réponse"))],
+        usage=MagicMock(prompt_tokens=100, completion_tokens=10, prompt_tokens_details=None)
+    )
+    client.generate("Prompt de test")
+
+    client.client.chat.completions.create.return_value = iter([
+        MagicMock(choices=[MagicMock(delta=MagicMock(content="Réponse"))], usage=None),
+        MagicMock(choices=[MagicMock(delta=MagicMock(content=" en flux"))], usage=None)
+    ])
+    assert list(client.generate_stream("Autre prompt de test")) == ["Réponse", " en flux"]
+
+    client.client.chat.completions.create.side_effect = ValueError("réponse invalide")
+    with pytest.raises(ValueError):
+        client.generate("Troisième prompt de test")
+
+    counters, histograms = metrics.snapshot()
+    generate, stream = MODEL + (("operation", "generate"),), MODEL + (("operation", "stream"),)
+    assert histograms[(REQUEST_DURATION, generate)][-1] > 0
+    assert sum(histograms[(REQUEST_DURATION, generate)][:-1]) == 2
+    assert sum(histograms[(REQUEST_DURATION, stream)][:-1]) == 1
+    assert sum(histograms[(TIME_TO_FIRST_TOKEN, MODEL)][:-1]) == 1
+    assert counters[(REQUEST_ERRORS, generate + (("type", "ValueError"),))] == 1
+    assert counters[(TOKENS, MODEL + (("kind", "input"),))] == 100
+
+
+def test_cout_d_enregistrement():
+    """L'enregistrement reste de l'ordre de la microseconde"""
+    metrics = Metrics()
+    labels = MODEL + (("operation", "generate"),)
+    started = time.perf_counter()
+    for _ in range(100_000):
+        metrics.inc(REQUEST_ERRORS, labels)
+        metrics.observe(REQUEST_DURATION, labels, 0.3)
+    assert (time.perf_counter() - started) / 200_000 < 5e-6
+
+
+def test_jauges():
+    exposition = format_gauges("llm_jobs", {"queued": 2, "done": 5, "label": "x", "enabled": True}, "Travaux")
+    assert "llm_jobs_queued 2" in exposition.splitlines()
+    assert "# TYPE llm_jobs_done gauge" in exposition
+    assert "label" not in exposition and "enabled" not in exposition
+
+
+def test_serveur_de_collecte():
+    server = start_metrics_server(0, collect=lambda: "llm_test 1\n")
+    assert server.server_address[0] == "127.0.0.1"
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/metrics"
+        with urllib.request.urlopen(url) as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert response.read() == b"llm_test 1\n"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -1,6 +1,6 @@
 import unittest
 from unittest.mock import patch, MagicMock
-from src.utils.openai_client import OpenAIClient
+from utils.openai_client import OpenAIClient
 
 class TestOpenAIClient(unittest.TestCase):
     def setUp(self):
@@ -0,0 +1,66 @@
+import asyncio
+import threading
+import pytest
+from agents.orchestrator import Orchestrator, Stage
+
+def test_etapes_independantes_en_parallele():
+    # Les deux étapes ne peuvent franchir la barrière que si elles tournent en même temps
+    barrier = threading.Barrier(2, timeout=2)
+
+    def stage(specification):
+        barrier.wait()
+        return specification.upper()
+
+    orchestrator = Orchestrator([
+        Stage("a", stage, ["specification"], "a"),
+        Stage("b", stage, ["specification"], "b"),
+        Stage("c", lambda a, b: a + b, ["a", "b"], "c")
+    ])
+    result = orchestrator.run({"specification": "x"})
+
+    assert result.outputs["c"] == "XX"
+    assert set(result.durations) == {"a", "b", "c"}
+
+def test_cycle_detecte():
+    with pytest.raises(ValueError):
+        Orchestrator([
+            Stage("a", lambda b: b, ["b"], "a"),
+            Stage("b", lambda a: a, ["a"], "b")
+        ])
+
+def test_entree_manquante():
+    orchestrator = Orchestrator([Stage("a", lambda inconnue: inconnue, ["inconnue"], "a")])
+    with pytest.raises(ValueError):
+        orchestrator.run({})
+
+def test_etape_optionnelle_en_echec():
+    def echec(specification):
+        raise RuntimeError("panne")
+
+    orchestrator = Orchestrator([
+        Stage("a", echec, ["specification"], "a", optional=True),
+        Stage("b", lambda a: a is None, ["a"], "b")
+    ])
+    result = orchestrator.run({"specification": "x"})
+
+    assert result.errors == {"a": "panne"}
+    assert result.outputs["b"] is True
+
+def test_etape_obligatoire_en_echec():
+    def echec(specification):
+        raise RuntimeError("panne")
+
+    with pytest.raises(RuntimeError):
+        Orchestrator([Stage("a", echec, ["specification"], "a")]).run({"specification": "x"})
+
+def test_arun_utilise_la_version_asynchrone():
+    async def agenerer(specification):
+        return "async:" + specification
+
+    orchestrator = Orchestrator([
+        Stage("a", lambda specification: "sync:" + specification, ["specification"], "a", async_func=agenerer),
+        Stage("b", lambda a: a.upper(), ["a"], "b")
+    ])
+    result = asyncio.run(orchestrator.arun({"specification": "x"}))
+
+    assert result.outputs["b"] == "ASYNC:X"
@@ -0,0 +1,161 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+from agents.agent_bonnes_pratiques import BonnesPratiquesAgent
+from utils.practices import DEFAULT_PATH, PracticesCatalog
+
+PRATIQUES = [
+    {"titre": "Requêtes paramétrées", "description": "D1", "source": "OWASP",
+     "technologies": ["PHP", "Java"], "domaines": ["sécurité"], "tags": ["OWASP", "injection SQL"]},
+    {"titre": "Hacher les mots de passe", "description": "D2", "source": "OWASP",
+     "technologies": ["PHP"], "domaines": ["Sécurité"], "tags": ["mots de passe"]},
+    {"titre": "OPcache", "description": "D3", "source": "Manuel PHP",
+     "technologies": ["PHP"], "domaines": ["performance"], "tags": ["caching"]},
+]
+
+
+class TestPracticesCatalog(unittest.TestCase):
+    def test_recherche_classee(self):
+        """Teste le filtre par technologie et domaine et le classement par contraintes"""
+        catalog = PracticesCatalog(PRATIQUES)
+
+        titres = [p["titre"] for p in catalog.search(["php"], "securite", ["Conformité OWASP"])]
+        self.assertEqual(titres, ["Requêtes paramétrées", "Hacher les mots de passe"])
+        self.assertEqual([p["titre"] for p in catalog.search(["Java"], "performance", ["caching"])], [])
+        self.assertEqual([p["titre"] for p in catalog.search([], "performance", [])], ["OPcache"])
+
+    def test_mentions(self):
+        """Teste le repérage des valeurs du vocabulaire citées dans un texte libre"""
+        catalog = PracticesCatalog(PRATIQUES)
+        texte = "API en php et JAVA ; exigences de Sécurité (javascript exclu)"
+        self.assertEqual(catalog.mentions("technologies", texte), ["PHP", "Java"])
+        self.assertEqual(catalog.mentions("domaines", texte), ["sécurité"])
+        self.assertEqual(catalog.mentions("technologies", "Application JavaScript"), [])
+
+    def test_mentions_unites(self):
+        """Teste qu'une unité (« 10 Go ») ou un mot courant n'est pas pris pour une technologie"""
+        catalog = PracticesCatalog.load(DEFAULT_PATH)
+        self.assertEqual(catalog.mentions("technologies", "Stockage limité à 10 Go par utilisateur"), [])
+        self.assertEqual(catalog.mentions("technologies", "Quota de 5Go, go/no go en comité"), [])
+        self.assertIn("Go", catalog.mentions("technologies", "Microservices écrits en Go"))
+
+    def test_contrainte_de_stockage_sans_appel(self):
+        """Teste qu'une contrainte « 10 Go » ne déclenche pas de recherche de pratiques Go"""
+        client = MagicMock()
+        agent = BonnesPratiquesAgent(client=client, catalog=PracticesCatalog.load(DEFAULT_PATH))
+        spec = {
+            "title": "Partage de fichiers",
+            "description": "Espace de dépôt de documents pour les équipes",
+            "sections": [{"title": "Contraintes", "content": ["Stockage limité à 10 Go par utilisateur"]}]
+        }
+
+        agent.appliquer_bonnes_pratiques(spec)
+
+        client.generate_stream.assert_not_called()
+
+    def test_technologies_manquantes(self):
+        catalog = PracticesCatalog(PRATIQUES)
+        self.assertEqual(catalog.missing_technologies(["PHP", "Java", "Go"], "sécurité"), ["Go"])
+        self.assertEqual(catalog.missing_technologies(["Java"], "performance"), ["Java"])
+
+    def test_format_compact(self):
+        """Teste l'aller-retour par le fichier compact et l'élimination des doublons"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "pratiques.json")
+            PracticesCatalog(PRATIQUES + PRATIQUES[:1]).save(path)
+
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.assertEqual(data["vocabulaire"]["technologies"], ["PHP", "Java"])
+            self.assertEqual(len(data["pratiques"]), 3)
+            self.assertEqual(PracticesCatalog.load(path).practices(), PracticesCatalog(PRATIQUES).practices())
+
+    def test_ecritures_simultanees(self):
+        """Teste que des enregistrements simultanés laissent un fichier complet et aucun fichier temporaire"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "pratiques.json")
+            catalog = PracticesCatalog(PRATIQUES)
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(lambda _: catalog.save(path), range(32)))
+
+            self.assertEqual(PracticesCatalog.load(path).practices(), catalog.practices())
+            self.assertEqual(os.listdir(tmpdir), ["pratiques.json"])
+
+    def test_catalogue_livre_rapide(self):
+        """Teste que le catalogue livré répond en bien moins d'une milliseconde"""
+        catalog = PracticesCatalog.load(DEFAULT_PATH)
+        started = time.perf_counter()
+        for _ in range(1000):
+            resultats = catalog.search(["Java", "Python", "PHP"], "architecture", ["POO"])
+        elapsed = (time.perf_counter() - started) / 1000
+
+        self.assertTrue(any("SOLID" in p["tags"] for p in resultats))
+        self.assertLess(elapsed, 0.001)
+
+
+class TestAgentAvecCatalogue(unittest.TestCase):
+    def test_appel_au_modele_uniquement_sur_absence(self):
+        """Teste que le modèle n'est appelé que pour les technologies absentes, puis plus du tout"""
+        client = MagicMock()
+        client.generate_stream.return_value = iter([json.dumps({"pratiques": [
+            {"titre": "Goroutines bornées", "description": "D", "technologies": ["Go"], "domaines": [],
+             "tags": ["concurrency"], "source": "Effective Go"}
+        ]})])
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "appris.json")
+            agent = BonnesPratiquesAgent(client=client, catalog=PracticesCatalog(PRATIQUES, path=path))
+            spec = {"technologies": ["PHP", "Go"], "domaine": "sécurité", "contraintes": []}
+
+            first = agent.rechercher(spec)
+            second = agent.rechercher(spec)
+
+            self.assertEqual([p["titre"] for p in first][-1], "Goroutines bornées")
+            self.assertEqual({p["titre"] for p in first}, {p["titre"] for p in second})
+            client.generate_stream.assert_called_once()
+            self.assertIn("Technologies : Go\n", client.generate_stream.call_args.args[0])
+            self.assertEqual(len(PracticesCatalog.load(path)), 4)
+
+    def test_application_a_la_specification_brute(self):
+        """Teste que technologies, domaine et contraintes sont tirés du texte de la spécification"""
+        client = MagicMock()
+        agent = BonnesPratiquesAgent(client=client, catalog=PracticesCatalog(PRATIQUES))
+        spec = {
+            "title": "Portail PHP",
+            "description": "Refonte axée sur la performance",
+            "sections": [
+                {"title": "Exigences", "content": ["Pages servies en moins de 200 ms"]},
+                {"title": "Contraintes", "content": ["Mise en caching des pages"]}
+            ]
+        }
+
+        resultat = agent.appliquer_bonnes_pratiques(spec)
+
+        self.assertEqual([p["titre"] for p in resultat["bonnes_pratiques"]], ["OPcache"])
+        self.assertEqual(resultat["title"], "Portail PHP")
+        client.generate_stream.assert_not_called()
+
+    def test_sans_technologie_sans_appel(self):
+        client = MagicMock()
+        agent = BonnesPratiquesAgent(client=client, catalog=PracticesCatalog(PRATIQUES))
+        spec = {"title": "Outil interne", "description": "Gestion des congés", "sections": []}
+
+        self.assertEqual(agent.appliquer_bonnes_pratiques(spec)["bonnes_pratiques"], [])
+        client.generate_stream.assert_not_called()
+
+    def test_reponse_du_catalogue_sans_appel(self):
+        client = MagicMock()
+        agent = BonnesPratiquesAgent(client=client, catalog=PracticesCatalog(PRATIQUES))
+
+        resultats = agent.rechercher({"technologies": ["PHP"], "domaine": "performance", "contraintes": []})
+
+        self.assertEqual([p["titre"] for p in resultats], ["OPcache"])
+        client.generate_stream.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
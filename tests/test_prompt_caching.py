@@ -0,0 +1,157 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from utils.anthropic_client import AnthropicClient
+from utils.cache import ResponseCache
+from utils.openai_client import OpenAIClient
+from utils.prompts import BEST_PRACTICES, COHERENCE, EVALUATION, STRUCTURATION, TASKS
+from utils.rate_limiter import estimate_request_tokens
+from utils.tokens import content_text
+from utils.usage import UsageStats, get_usage_stats
+
+
+class TestPrefixeStatique(unittest.TestCase):
+    def test_champs_variables_en_fin(self):
+        """Teste que chaque modèle commence par un préfixe statique commun à tous les rendus"""
+        for template, fields in (
+            (EVALUATION, {"specification": "Titre : A", "tasks": "- [ ] B"}),
+            (TASKS, {"specification": "Titre : A"}),
+            (STRUCTURATION, {"specification": "Titre : A"}),
+            (BEST_PRACTICES, {"technologies": "Python", "domaine": "Web", "contraintes": "RGPD"}),
+            (COHERENCE, {"specification": "Titre : A"}),
+        ):
+            self.assertNotIn("$", template.prefix)
+            self.assertTrue(template.render(**fields).startswith(template.prefix), template.name)
+
+    def test_blocs(self):
+        """Teste le découpage en un bloc statique mis en cache et un bloc variable"""
+        prompt = EVALUATION.render(specification="Titre : Plateforme", tasks="- [ ] Tâche")
+        blocks = EVALUATION.blocks(prompt)
+
+        self.assertEqual(blocks[0], {"type": "text", "text": EVALUATION.prefix, "cache_control": {"type": "ephemeral"}})
+        self.assertNotIn("cache_control", blocks[1])
+        self.assertEqual(blocks[0]["text"] + blocks[1]["text"], prompt)
+        self.assertNotIn("cache_control", EVALUATION.blocks(prompt, cache=False)[0])
+        self.assertEqual(EVALUATION.blocks("Autre prompt"), [{"type": "text", "text": "Autre prompt"}])
+
+
+class TestUsageStats(unittest.TestCase):
+    def test_taux_de_lecture_anthropic(self):
+        """Teste que les tokens lus et écrits en cache s'ajoutent aux tokens d'entrée Anthropic"""
+        stats = UsageStats()
+        stats.record_anthropic(MagicMock(input_tokens=100, cache_creation_input_tokens=900,
+                                         cache_read_input_tokens=None, output_tokens=50))
+        stats.record_anthropic(MagicMock(input_tokens=100, cache_creation_input_tokens=0,
+                                         cache_read_input_tokens=900, output_tokens=50))
+
+        anthropic = stats.stats()["anthropic"]
+        self.assertEqual((anthropic["requests"], anthropic["input_tokens"]), (2, 2000))
+        self.assertEqual((anthropic["cache_read_tokens"], anthropic["cache_write_tokens"]), (900, 900))
+        self.assertAlmostEqual(anthropic["cache_hit_rate"], 0.45)
+
+    def test_taux_de_lecture_openai(self):
+        """Teste la lecture de prompt_tokens_details.cached_tokens et l'ignorance des usages incomplets"""
+        stats = UsageStats()
+        stats.record_openai(MagicMock(prompt_tokens=2000, completion_tokens=10,
+                                      prompt_tokens_details=MagicMock(cached_tokens=1536)))
+        stats.record_openai(MagicMock())
+        stats.record_openai(None)
+
+        self.assertEqual(stats.stats()["openai"]["requests"], 1)
+        self.assertAlmostEqual(stats.stats()["openai"]["cache_hit_rate"], 0.768)
+
+
+@patch.dict("os.environ", {"OPENAI_API_KEY": "test", "ANTHROPIC_API_KEY": "test"})
+class TestClients(unittest.TestCase):
+    def setUp(self):
+        get_usage_stats().reset()
+
+    def test_anthropic_blocs_et_systeme_en_cache(self):
+        """Teste l'envoi des blocs de contenu et du prompt système marqués pour le cache"""
+        client = AnthropicClient(cache=ResponseCache())
+        client.client = MagicMock()
+        client.client.messages.create.return_value = MagicMock(
+            content=[MagicMock(text="Réponse")],
+            usage=MagicMock(input_tokens=20, cache_creation_input_tokens=0, cache_read_input_tokens=1200, output_tokens=5)
+        )
+        prompt = EVALUATION.render(specification="Titre : Plateforme", tasks="- [ ] Tâche")
+        system = "Référentiel de rédaction des spécifications techniques. " * 150
+
+        self.assertEqual(client.generate(EVALUATION.blocks(prompt), system_prompt=system), "Réponse")
+
+        params = client.client.messages.create.call_args.kwargs
+        self.assertEqual(params["system"], [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}])
+        self.assertEqual(params["messages"][0]["content"], EVALUATION.blocks(prompt))
+        self.assertEqual(get_usage_stats().stats()["anthropic"]["cache_read_tokens"], 1200)
+        # La clé du cache de réponses ne dépend que du texte
+        self.assertEqual(client.generate(prompt, system_prompt=system), "Réponse")
+        client.client.messages.create.assert_called_once()
+
+    def test_anthropic_prefixe_trop_court(self):
+        """Teste qu'aucun point d'arrêt n'est envoyé sous la taille minimale mise en cache"""
+        client = AnthropicClient(cache=ResponseCache())
+        client.client = MagicMock()
+        client.client.messages.create.return_value = MagicMock(content=[MagicMock(text="Réponse")])
+        prompt = EVALUATION.render(specification="Titre : Plateforme", tasks="- [ ] Tâche")
+
+        client.generate(EVALUATION.blocks(prompt), system_prompt="Système")
+
+        params = client.client.messages.create.call_args.kwargs
+        self.assertEqual(params["system"], [{"type": "text", "text": "Système"}])
+        self.assertFalse(any("cache_control" in block for block in params["messages"][0]["content"]))
+        self.assertEqual(content_text(params["messages"][0]["content"]), prompt)
+
+    def test_anthropic_cache_de_prompts_desactive(self):
+        """Teste le retrait des marques cache_control lorsque le cache de prompts est désactivé"""
+        client = AnthropicClient(cache=ResponseCache(), prompt_caching=False)
+        client.client = MagicMock()
+        client.client.messages.create.return_value = MagicMock(content=[MagicMock(text="Réponse")])
+        prompt = EVALUATION.render(specification="Titre : Plateforme", tasks="- [ ] Tâche")
+
+        client.generate(EVALUATION.blocks(prompt), system_prompt="Système")
+
+        params = client.client.messages.create.call_args.kwargs
+        self.assertEqual(params["system"], "Système")
+        self.assertFalse(any("cache_control" in block for block in params["messages"][0]["content"]))
+
+    def test_openai_prefixe_et_usage(self):
+        """Teste l'aplatissement des blocs, le prompt système en tête et le relevé des tokens lus en cache"""
+        client = OpenAIClient(cache=ResponseCache())
+        client.client = MagicMock()
+        client.client.chat.completions.create.return_value = MagicMock(
+            choices=[MagicMock(message=MagicMock(content="Réponse"))],
+            usage=MagicMock(prompt_tokens=1500, completion_tokens=10, prompt_tokens_details=MagicMock(cached_tokens=1024))
+        )
+        prompt = TASKS.render(specification="Titre : Plateforme")
+
+        client.generate(TASKS.blocks(prompt), system_prompt="Système")
+
+        messages = client.client.chat.completions.create.call_args.kwargs["messages"]
+        self.assertEqual(messages, [{"role": "system", "content": "Système"}, {"role": "user", "content": prompt}])
+        self.assertEqual(get_usage_stats().stats()["openai"]["cache_read_tokens"], 1024)
+
+    def test_openai_flux_avec_usage(self):
+        """Teste que l'usage est demandé et relevé sur le dernier chunk d'un flux"""
+        client = OpenAIClient(cache=ResponseCache())
+        client.client = MagicMock()
+        client.client.chat.completions.create.return_value = iter([
+            MagicMock(choices=[MagicMock(delta=MagicMock(content="Réponse"))], usage=None),
+            MagicMock(choices=[], usage=MagicMock(prompt_tokens=1100, prompt_tokens_details=MagicMock(cached_tokens=1024)))
+        ])
+
+        self.assertEqual(list(client.generate_stream("Prompt de test")), ["Réponse"])
+        self.assertEqual(client.client.chat.completions.create.call_args.kwargs["stream_options"], {"include_usage": True})
+        self.assertEqual(get_usage_stats().stats()["openai"]["cache_read_tokens"], 1024)
+
+
+def test_estimation_avec_blocs():
+    """Teste que l'estimation du limiteur de débit compte le texte des blocs"""
+    text = "Analyse détaillée de la spécification " * 20
+    as_string = estimate_request_tokens({"model": "gpt-4o-mini", "max_tokens": 0, "system": "Système",
+                                         "messages": [{"role": "user", "content": text}]})
+    as_blocks = estimate_request_tokens({
+        "model": "gpt-4o-mini", "max_tokens": 0,
+        "system": [{"type": "text", "text": "Système", "cache_control": {"type": "ephemeral"}}],
+        "messages": [{"role": "user", "content": [{"type": "text", "text": text[:100]}, {"type": "text", "text": text[100:]}]}]
+    })
+    assert as_blocks == as_string
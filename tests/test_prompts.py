@@ -0,0 +1,87 @@
+import unittest
+
+from utils.prompts import COHERENCE, EVALUATION, PromptTemplate, join_items, serialize_spec
+from utils.tokens import count_tokens
+
+
+class TestSerializeSpec(unittest.TestCase):
+    def test_specification_formulaire(self):
+        """Teste la sérialisation compacte d'une spécification du formulaire"""
+        spec = {
+            "title": "Plateforme",
+            "description": "Application   web\n de réservation",
+            "sections": [
+                {"title": "Exigences", "content": ["Réservation en ligne", " ", "Notifications"]},
+                {"title": "Contraintes", "content": []}
+            ]
+        }
+        self.assertEqual(
+            serialize_spec(spec),
+            "Titre : Plateforme\nDescription : Application web de réservation\n"
+            "Exigences :\n- Réservation en ligne\n- Notifications"
+        )
+
+    def test_specification_agents(self):
+        """Teste que le format des agents (titre, exigences) donne la même sérialisation"""
+        self.assertEqual(
+            serialize_spec({"titre": "Plateforme", "description": "Web", "exigences": "A\nB"}),
+            serialize_spec({"title": "Plateforme", "description": "Web",
+                            "sections": [{"title": "Exigences", "content": ["A", "B"]}]})
+        )
+
+
+class TestPromptTemplate(unittest.TestCase):
+    def test_modele_dedente(self):
+        """Teste que l'indentation du code source n'apparaît pas dans le prompt"""
+        prompt = COHERENCE.render(specification="Titre : Plateforme")
+        self.assertTrue(prompt.startswith("Analysez cette spécification"))
+        self.assertNotIn("\n    ", prompt)
+
+    def test_champ_manquant(self):
+        """Teste qu'un champ manquant est signalé"""
+        with self.assertRaises(KeyError):
+            EVALUATION.render(specification="Titre : Plateforme")
+
+    def test_budget_respecte(self):
+        """Teste que les champs les plus volumineux sont réduits en premier"""
+        template = PromptTemplate("test", "Spécification :\n$specification\n\nTâches :\n$tasks", budget=400)
+        specification = "Titre : Plateforme\nDescription : Application web"
+        tasks = "\n".join(f"- [ ] Tâche numéro {i} à réaliser" for i in range(500))
+
+        prompt = template.render(specification=specification, tasks=tasks)
+
+        self.assertLessEqual(count_tokens(prompt), 400)
+        self.assertIn(specification, prompt)
+        self.assertIn("- [ ] Tâche numéro 0 à réaliser", prompt)
+        self.assertRegex(prompt, r"\[… \d+ élément\(s\) omis\]")
+
+    def test_budget_par_section(self):
+        """Teste que chaque section réduite garde son titre, ses premiers éléments et le nombre d'omissions"""
+        template = PromptTemplate("test", "Spécification :\n$specification", budget=300)
+        specification = "\n".join(
+            ["Titre : Plateforme", "Exigences :"]
+            + [f"- Exigence numéro {i} à respecter" for i in range(200)]
+            + ["Contraintes :", "- Hébergement en Europe"]
+        )
+
+        with self.assertLogs(level="WARNING"):
+            prompt = template.render(specification=specification)
+
+        self.assertLessEqual(count_tokens(prompt), 300)
+        self.assertIn("- Exigence numéro 0 à respecter", prompt)
+        self.assertRegex(prompt, r"- Exigence numéro \d+ à respecter\n\[… \d+ élément\(s\) omis\]\nContraintes :")
+        # La dernière section n'est pas sacrifiée à la première
+        self.assertTrue(prompt.endswith("Contraintes :\n- Hébergement en Europe"))
+
+    def test_sous_le_budget(self):
+        """Teste qu'un prompt sous le budget n'est pas modifié"""
+        template = PromptTemplate("test", "Tâches :\n$tasks", budget=400)
+        self.assertEqual(template.render(tasks="- [ ] Une tâche"), "Tâches :\n- [ ] Une tâche")
+
+    def test_join_items(self):
+        self.assertEqual(join_items(["RGPD", " ", "Budget"]), "RGPD, Budget")
+        self.assertEqual(join_items([]), "Aucune")
+
+
+if __name__ == '__main__':
+    unittest.main()
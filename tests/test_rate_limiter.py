@@ -0,0 +1,225 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import openai
+
+from utils.cache import ResponseCache
+from utils.openai_client import OpenAIClient
+from utils.rate_limiter import AdaptiveConcurrency, RateLimiter, estimate_request_tokens
+
+
+def _rate_limit_error():
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    return openai.RateLimitError("limite", response=httpx.Response(429, request=request), body=None)
+
+
+class TestBudgets(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "limits.sqlite3")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_budget_rpm(self):
+        """Teste qu'au-delà du budget RPM la réservation renvoie un délai d'attente"""
+        limiter = RateLimiter("test", rpm=2, path=self.path)
+
+        self.assertEqual(limiter._reserve(100), 0)
+        self.assertEqual(limiter._reserve(100), 0)
+        wait = limiter._reserve(100)
+        self.assertGreater(wait, 0)
+        self.assertLessEqual(wait, 30.0)
+
+    def test_budget_partage_entre_processus(self):
+        """Teste que deux limiteurs sur le même fichier partagent le budget TPM"""
+        first = RateLimiter("test", tpm=1000, path=self.path)
+        second = RateLimiter("test", tpm=1000, path=self.path)
+
+        self.assertEqual(first._reserve(600), 0)
+        self.assertGreater(second._reserve(600), 0)
+        self.assertEqual(second._reserve(400), 0)
+
+    def test_restitution_tokens_non_consommes(self):
+        """Teste que les tokens réservés mais non consommés sont restitués"""
+        limiter = RateLimiter("test", tpm=1000, path=self.path)
+
+        limiter.call(lambda: "ok", tokens=900, usage=lambda result: 100)
+        self.assertEqual(limiter._reserve(900), 0)
+
+    def test_sans_budget(self):
+        """Teste que le limiteur n'est pas construit sans budget configuré"""
+        with patch.dict("os.environ", {}, clear=True):
+            self.assertIsNone(RateLimiter.from_env("openai"))
+        with patch.dict("os.environ", {"OPENAI_RPM_LIMIT": "500", "LLM_RATE_LIMIT_PATH": self.path}):
+            limiter = RateLimiter.from_env("openai")
+        self.assertEqual((limiter.rpm, limiter.tpm), (500, None))
+
+
+class TestAdaptiveConcurrency(unittest.TestCase):
+    def test_augmentation_additive(self):
+        """Teste que la fenêtre croît d'environ une place par fenêtre réussie"""
+        concurrency = AdaptiveConcurrency(initial=4, maximum=8)
+        for _ in range(4):
+            concurrency.acquire()
+        for _ in range(4):
+            concurrency.release(latency=0.1)
+        self.assertEqual(concurrency.limit, 4)
+        concurrency.acquire()
+        concurrency.release(latency=0.1)
+        self.assertEqual(concurrency.limit, 5)
+
+    def test_reduction_multiplicative(self):
+        """Teste que la fenêtre est divisée par deux sur limite de débit ou latence excessive"""
+        concurrency = AdaptiveConcurrency(initial=16, latency_target=5.0, cooldown=0.0)
+        for _ in range(3):
+            concurrency.acquire()
+
+        concurrency.release(latency=0.1, throttled=True)
+        self.assertEqual(concurrency.limit, 8)
+        concurrency.release(latency=10.0)
+        self.assertEqual(concurrency.limit, 4)
+        self.assertEqual(concurrency.in_flight, 1)
+
+    def test_une_reduction_par_rafale(self):
+        """Teste que des erreurs simultanées ne réduisent la fenêtre qu'une fois"""
+        concurrency = AdaptiveConcurrency(initial=16, cooldown=60.0)
+        for _ in range(4):
+            concurrency.acquire()
+        for _ in range(4):
+            concurrency.release(latency=0.1, throttled=True)
+        self.assertEqual(concurrency.limit, 8)
+
+    def test_latence_cible_proportionnelle(self):
+        """Teste qu'une longue génération n'est pas prise pour une surcharge"""
+        concurrency = AdaptiveConcurrency(initial=16, latency_target=30.0, cooldown=0.0)
+        self.assertEqual(concurrency.target(4096), 120.0)
+        self.assertEqual(concurrency.target(256), 30.0)
+        concurrency.acquire()
+        concurrency.release(latency=60.0, max_tokens=4096)
+        self.assertGreater(concurrency.limit, 15)
+
+    def test_fenetre_pleine(self):
+        """Teste qu'aucune place n'est accordée au-delà de la fenêtre"""
+        concurrency = AdaptiveConcurrency(initial=1)
+        self.assertTrue(concurrency.try_acquire())
+        self.assertFalse(concurrency.try_acquire())
+
+
+class TestRateLimiterCall(unittest.TestCase):
+    def test_erreur_429_reduit_la_fenetre(self):
+        """Teste qu'une erreur 429 est remontée et réduit la fenêtre de concurrence"""
+        limiter = RateLimiter("test", concurrency=AdaptiveConcurrency(initial=8))
+
+        with self.assertRaises(openai.RateLimitError):
+            limiter.call(MagicMock(side_effect=_rate_limit_error()), tokens=10)
+        self.assertEqual(limiter.concurrency.limit, 4)
+        self.assertEqual(limiter.concurrency.in_flight, 0)
+
+    def test_acall(self):
+        """Teste la version asynchrone"""
+        limiter = RateLimiter("test")
+        func = AsyncMock(return_value="ok")
+
+        self.assertEqual(asyncio.run(limiter.acall(func, tokens=10)), "ok")
+        self.assertEqual(limiter.concurrency.in_flight, 0)
+
+    def test_acall_budget_hors_boucle(self):
+        """Teste que la réservation SQLite de la version asynchrone est faite dans un thread"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            limiter = RateLimiter("test", rpm=10, path=os.path.join(tmpdir, "limits.sqlite3"))
+            with patch("utils.rate_limiter.asyncio.to_thread", wraps=asyncio.to_thread) as to_thread:
+                asyncio.run(limiter.acall(AsyncMock(return_value="ok"), tokens=10))
+            self.assertIn(limiter._reserve, [call.args[0] for call in to_thread.call_args_list])
+
+    def test_echec_de_reservation_sans_effet_sur_la_fenetre(self):
+        """Teste qu'une réservation de budget interrompue libère la place sans agrandir la fenêtre"""
+        limiter = RateLimiter("test", concurrency=AdaptiveConcurrency(initial=8))
+
+        with patch.object(limiter, "acquire_budget", side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                limiter.call(MagicMock(), tokens=10)
+        with patch.object(limiter, "aacquire_budget", AsyncMock(side_effect=asyncio.CancelledError)):
+            with self.assertRaises(asyncio.CancelledError):
+                asyncio.run(limiter.acall(AsyncMock(), tokens=10))
+        self.assertEqual(limiter.concurrency._limit, 8.0)
+        self.assertEqual(limiter.concurrency.in_flight, 0)
+
+    def test_annulation_restitue_hors_boucle(self):
+        """Teste qu'une requête annulée règle son budget dans un thread"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            limiter = RateLimiter("test", tpm=1000, path=os.path.join(tmpdir, "limits.sqlite3"))
+            func = AsyncMock(side_effect=asyncio.CancelledError)
+            with patch("utils.rate_limiter.asyncio.to_thread", wraps=asyncio.to_thread) as to_thread:
+                with self.assertRaises(asyncio.CancelledError):
+                    asyncio.run(limiter.acall(func, tokens=900))
+            self.assertIn(limiter.settle, [call.args[0] for call in to_thread.call_args_list])
+            self.assertEqual(limiter.concurrency.in_flight, 0)
+
+    def test_estimation_tokens(self):
+        """Teste que l'estimation réserve les tokens d'entrée et max_tokens"""
+        params = {
+            "model": "gpt-4o-mini",
+            "messages": [{"role": "user", "content": "Bonjour le monde"}],
+            "max_tokens": 2048
+        }
+        tokens = estimate_request_tokens(params)
+        self.assertGreater(tokens, 2048)
+        self.assertLess(tokens, 2048 + 20)
+
+    @patch.dict("os.environ", {"OPENAI_API_KEY": "test"})
+    def test_client_openai(self):
+        """Teste que le client OpenAI passe par le limiteur configuré"""
+        limiter = MagicMock(wraps=RateLimiter("test"))
+        client = OpenAIClient(cache=ResponseCache(), rate_limiter=limiter)
+        client.client = MagicMock()
+        client.client.chat.completions.create.return_value = MagicMock(
+            choices=[MagicMock(message=MagicMock(content="Réponse test"))],
+            usage=MagicMock(total_tokens=42)
+        )
+
+        self.assertEqual(client.generate("Test prompt"), "Réponse test")
+        limiter.call.assert_called_once()
+        self.assertGreater(limiter.call.call_args.args[1], 2048)
+
+
+    @patch.dict("os.environ", {"OPENAI_API_KEY": "test"})
+    def test_flux_openai(self):
+        """Teste que la place est tenue jusqu'à la fin du flux et que l'usage final est restitué"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            limiter = RateLimiter("test", tpm=10000, path=os.path.join(tmpdir, "limits.sqlite3"))
+            client = OpenAIClient(cache=ResponseCache(), rate_limiter=limiter)
+            client.client = MagicMock()
+            chunk = MagicMock(choices=[MagicMock(delta=MagicMock(content="Réponse"))], usage=None)
+            final = MagicMock(choices=[], usage=MagicMock(total_tokens=100))
+            client.client.chat.completions.create.return_value = iter([chunk, final])
+
+            stream = client.generate_stream("Test prompt")
+            self.assertEqual(next(stream), "Réponse")
+            self.assertEqual(limiter.concurrency.in_flight, 1)
+            self.assertEqual(list(stream), [])
+            self.assertEqual(limiter.concurrency.in_flight, 0)
+            # Seuls les 100 tokens consommés restent prélevés
+            self.assertEqual(limiter._reserve(9900), 0)
+
+    @patch.dict("os.environ", {"OPENAI_API_KEY": "test"})
+    def test_flux_ferme(self):
+        """Teste qu'un flux abandonné libère sa place"""
+        limiter = RateLimiter("test")
+        client = OpenAIClient(cache=ResponseCache(), rate_limiter=limiter)
+        client.client = MagicMock()
+        chunk = MagicMock(choices=[MagicMock(delta=MagicMock(content="Réponse"))], usage=None)
+        client.client.chat.completions.create.return_value = iter([chunk, chunk])
+
+        stream = client.generate_stream("Test prompt")
+        next(stream)
+        stream.close()
+        self.assertEqual(limiter.concurrency.in_flight, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
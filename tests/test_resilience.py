@@ -0,0 +1,172 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import openai
+import pytest
+
+from utils.cache import ResponseCache
+from utils.openai_client import OpenAIClient
+from utils.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    Resilience,
+    RetryPolicy,
+    retry_after,
+)
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+def _status_error(status_code, headers=None):
+    response = httpx.Response(status_code, headers=headers or {}, request=REQUEST)
+    error_class = openai.RateLimitError if status_code == 429 else openai.APIStatusError
+    return error_class("erreur", response=response, body=None)
+
+
+def _resilience(max_attempts=3, failure_threshold=5, recovery_timeout=30.0):
+    return Resilience(
+        "test",
+        policy=RetryPolicy(max_attempts=max_attempts, base_delay=0.01, max_delay=5.0),
+        breaker=CircuitBreaker("test", failure_threshold=failure_threshold, recovery_timeout=recovery_timeout)
+    )
+
+
+@patch("utils.resilience.time.sleep")
+class TestRetry(unittest.TestCase):
+    def test_retry_puis_succes(self, sleep):
+        """Teste qu'une erreur transitoire est retentée jusqu'au succès"""
+        func = MagicMock(side_effect=[_status_error(503), openai.APIConnectionError(request=REQUEST), "ok"])
+
+        self.assertEqual(_resilience().call(func), "ok")
+        self.assertEqual(func.call_count, 3)
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_retry_after_respecte(self, sleep):
+        """Teste que le délai Retry-After du fournisseur remplace le backoff"""
+        func = MagicMock(side_effect=[_status_error(429, {"retry-after": "2"}), "ok"])
+
+        self.assertEqual(_resilience().call(func), "ok")
+        sleep.assert_called_once_with(2.0)
+
+    def test_erreur_non_retentable(self, sleep):
+        """Teste qu'une erreur de requête est remontée immédiatement"""
+        func = MagicMock(side_effect=_status_error(400))
+
+        with self.assertRaises(openai.APIStatusError):
+            _resilience().call(func)
+        func.assert_called_once()
+        sleep.assert_not_called()
+
+    def test_tentatives_epuisees(self, sleep):
+        """Teste que la dernière erreur est remontée après max_attempts tentatives"""
+        func = MagicMock(side_effect=_status_error(500))
+
+        with self.assertRaises(openai.APIStatusError):
+            _resilience(max_attempts=3).call(func)
+        self.assertEqual(func.call_count, 3)
+
+
+class TestRetryAfter(unittest.TestCase):
+    def test_en_tetes(self):
+        """Teste la lecture des différents en-têtes de délai"""
+        self.assertEqual(retry_after(_status_error(429, {"retry-after-ms": "1500"})), 1.5)
+        self.assertEqual(retry_after(_status_error(429, {"x-ratelimit-reset-requests": "1m30s"})), 90.0)
+        self.assertEqual(retry_after(_status_error(429, {"x-ratelimit-reset-tokens": "250ms"})), 0.25)
+        self.assertIsNone(retry_after(_status_error(429)))
+        self.assertIsNone(retry_after(ValueError("sans réponse")))
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    @patch("utils.resilience.time.sleep")
+    def test_ouverture_puis_echec_rapide(self, sleep):
+        """Teste que le disjoncteur s'ouvre et refuse les appels sans les envoyer"""
+        resilience = _resilience(max_attempts=1, failure_threshold=2)
+        func = MagicMock(side_effect=_status_error(503))
+
+        for _ in range(2):
+            with self.assertRaises(openai.APIStatusError):
+                resilience.call(func)
+        self.assertEqual(resilience.breaker.state, "open")
+
+        with self.assertRaises(CircuitOpenError):
+            resilience.call(func)
+        self.assertEqual(func.call_count, 2)
+
+    @patch("utils.resilience.time.monotonic")
+    def test_semi_ouvert_puis_fermeture(self, monotonic):
+        """Teste qu'un appel d'essai réussi après le délai de récupération referme le disjoncteur"""
+        monotonic.return_value = 100.0
+        breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=30.0)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+
+        monotonic.return_value = 131.0
+        self.assertEqual(breaker.state, "half_open")
+        breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+        breaker.before_call()
+
+    def test_erreur_de_requete_ne_compte_pas(self):
+        """Teste qu'une erreur 4xx ne fait pas ouvrir le disjoncteur"""
+        resilience = _resilience(failure_threshold=1)
+        with self.assertRaises(openai.APIStatusError):
+            resilience.call(MagicMock(side_effect=_status_error(400)))
+        self.assertEqual(resilience.breaker.state, "closed")
+
+
+@pytest.mark.parametrize("failures", [0, 2])
+def test_acall(failures):
+    """Teste la version asynchrone avec et sans nouvelles tentatives"""
+    func = AsyncMock(side_effect=[_status_error(502)] * failures + ["ok"])
+    with patch("utils.resilience.asyncio.sleep", new=AsyncMock()) as sleep:
+        assert asyncio.run(_resilience().acall(func)) == "ok"
+    assert func.await_count == failures + 1
+    assert sleep.await_count == failures
+
+
+def test_essai_semi_ouvert_annule():
+    """Teste qu'un appel d'essai annulé libère le disjoncteur semi-ouvert"""
+    resilience = _resilience(failure_threshold=1, recovery_timeout=0.0)
+    resilience.breaker.record_failure()
+
+    async def scenario():
+        started = asyncio.Event()
+
+        async def trial():
+            started.set()
+            await asyncio.sleep(10)
+
+        task = asyncio.create_task(resilience.acall(trial))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return await resilience.acall(AsyncMock(return_value="ok"))
+
+    assert asyncio.run(scenario()) == "ok"
+    assert resilience.breaker.state == "closed"
+
+
+@patch.dict("os.environ", {"OPENAI_API_KEY": "test"})
+@patch("utils.resilience.time.sleep")
+def test_client_openai_retente(sleep):
+    """Teste que le client OpenAI retente les erreurs transitoires du SDK"""
+    client = OpenAIClient(cache=ResponseCache(), resilience=_resilience())
+    client.client = MagicMock()
+    client.client.chat.completions.create.side_effect = [
+        _status_error(429),
+        MagicMock(choices=[MagicMock(message=MagicMock(content="Réponse test"))])
+    ]
+
+    assert client.generate("Test prompt") == "Réponse test"
+    assert client.client.chat.completions.create.call_count == 2
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+
+from pipeline import SpecificationValidationError
+from service import EvaluationService
+
+
+def _request(app, method, path, **kwargs):
+    async def send():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://service") as client:
+            return await client.request(method, path, **kwargs)
+    return asyncio.run(send())
+
+
+@pytest.fixture
+def processor():
+    processor = MagicMock()
+    processor.arun = AsyncMock(return_value="# Évaluation\n" + "Points forts : ...\n" * 100)
+    return processor
+
+
+@pytest.fixture
+def app(processor):
+    return EvaluationService(lambda: processor, max_body_bytes=2048)
+
+
+def test_evaluation(app, processor, sample_valid_spec):
+    """Teste l'appel du pipeline et la compression gzip de la réponse"""
+    response = _request(app, "POST", "/evaluate", json=sample_valid_spec, headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json()["evaluation"].startswith("# Évaluation")
+    processor.arun.assert_awaited_once_with(**sample_valid_spec, model_choice="anthropic")
+
+
+def test_sans_compression_pour_les_petites_reponses(app):
+    response = _request(app, "GET", "/health", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"status": "ok"}
+
+
+def test_requetes_invalides(app, processor, sample_valid_spec):
+    assert _request(app, "POST", "/evaluate", content=b"{pas du json").status_code == 400
+    assert _request(app, "POST", "/evaluate", json={"title": "T"}).json()["error"].startswith("Champs manquants")
+    assert _request(app, "POST", "/evaluate", json={**sample_valid_spec, "model_choice": "autre"}).status_code == 400
+    assert _request(app, "POST", "/evaluate", content=b"x" * 4096).status_code == 413
+    assert _request(app, "GET", "/evaluate").status_code == 405
+    assert _request(app, "GET", "/inconnue").status_code == 404
+    processor.arun.assert_not_awaited()
+
+
+def test_erreurs_du_pipeline(app, processor, sample_valid_spec):
+    processor.arun.side_effect = SpecificationValidationError(["Le titre ne peut pas être vide"])
+    response = _request(app, "POST", "/evaluate", json=sample_valid_spec)
+    assert response.status_code == 422
+    assert response.json() == {"errors": ["Le titre ne peut pas être vide"]}
+
+    processor.arun.side_effect = ConnectionError("panne")
+    assert _request(app, "POST", "/evaluate", json=sample_valid_spec).status_code == 502
+
+
+def test_disponibilite():
+    """Teste que /ready échoue tant que les clients ne peuvent pas être créés"""
+    def factory():
+        raise ValueError("La clé API OpenAI n'est pas définie")
+
+    app = EvaluationService(factory)
+    assert _request(app, "GET", "/health").status_code == 200
+    response = _request(app, "GET", "/ready")
+    assert response.status_code == 503
+    assert "clé API" in json.loads(response.content)["error"]
+
+
+def test_metriques(app):
+    response = _request(app, "GET", "/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
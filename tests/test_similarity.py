@@ -0,0 +1,113 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from utils.similarity import SimilarityIndex, normalize_text, shingles
+
+SPEC = (
+    "Plateforme de réservation\n"
+    "Application web de réservation de salles pour les entreprises avec gestion des calendriers partagés.\n"
+    "Réservation en ligne des salles\nNotifications par email aux participants\n"
+    "Temps de réponse inférieur à 200ms\nAuthentification unique via SSO\n"
+    "Export des réservations au format CSV\nTableau de bord d'occupation par site"
+)
+
+
+class TestNormalisation(unittest.TestCase):
+    def test_normalize_text(self):
+        """Teste la suppression de la casse, des accents, de la ponctuation et des espaces multiples"""
+        self.assertEqual(normalize_text("  Réservation,   en LIGNE !\n"), "reservation en ligne")
+
+    def test_shingles_invariants(self):
+        """Teste que la mise en forme ne change pas les n-grammes"""
+        self.assertEqual(shingles(SPEC), shingles(SPEC.upper().replace("\n", "   ").replace(".", " ;")))
+
+
+class TestSimilarityIndex(unittest.TestCase):
+    def test_doublon_mise_en_forme(self):
+        """Teste qu'une variante d'espaces et de ponctuation est retrouvée à l'identique"""
+        index = SimilarityIndex()
+        spec_id = index.add(SPEC, "rapport")
+
+        match = index.query(SPEC.replace("\n", "\n\n  ").replace(".", " ."))
+        self.assertEqual((match.id, match.similarity, match.payload), (spec_id, 1.0, "rapport"))
+
+    def test_exigence_modifiee(self):
+        """Teste qu'une ligne d'exigence modifiée reste au-dessus du seuil"""
+        index = SimilarityIndex(threshold=0.8)
+        index.add(SPEC, "rapport")
+
+        match = index.query(SPEC.replace("format CSV", "format Excel"))
+        self.assertIsNotNone(match)
+        self.assertGreater(match.similarity, 0.8)
+        self.assertLess(match.similarity, 1.0)
+
+    def test_specification_differente(self):
+        """Teste qu'une spécification sans rapport n'est pas retournée"""
+        index = SimilarityIndex()
+        index.add(SPEC, "rapport")
+        self.assertIsNone(index.query("Outil interne de suivi des stocks d'entrepôt avec scanners mobiles"))
+
+    def test_espaces_separes(self):
+        """Teste que les entrées d'un autre espace (modèle) ne sont pas retournées"""
+        index = SimilarityIndex()
+        index.add(SPEC, "rapport", namespace="openai")
+        self.assertIsNone(index.query(SPEC, namespace="anthropic"))
+        self.assertIsNotNone(index.query(SPEC, namespace="openai"))
+
+    def test_persistance(self):
+        """Teste le rechargement de l'index depuis SQLite"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "similarity.sqlite3")
+            SimilarityIndex(path=path).add(SPEC, "rapport persistant")
+
+            reloaded = SimilarityIndex(path=path)
+            self.assertEqual(len(reloaded), 1)
+            self.assertEqual(reloaded.query(SPEC).payload, "rapport persistant")
+            self.assertEqual(reloaded.add("Autre spécification", "autre"), 2)
+
+    def test_recherche_rapide(self):
+        """Teste que la recherche reste rapide avec de nombreuses entrées"""
+        index = SimilarityIndex()
+        for i in range(5000):
+            index.add(f"Spécification numéro {i} pour le client {i * 7} et le projet {i * 13}", "rapport")
+        index.add(SPEC, "cible")
+
+        started = time.perf_counter()
+        for _ in range(100):
+            match = index.query(SPEC)
+        elapsed = (time.perf_counter() - started) / 100
+
+        self.assertEqual(match.payload, "cible")
+        self.assertLess(elapsed, 0.005)
+
+
+def test_processor_reutilise_une_evaluation_similaire(mock_anthropic_client, mock_openai_client, sample_valid_spec):
+    """Teste que le pipeline sert l'évaluation d'une spécification quasi identique sans appel aux agents"""
+    from pipeline import SpecificationProcessor
+
+    processor = SpecificationProcessor(mock_anthropic_client, mock_openai_client, similarity_index=SimilarityIndex())
+    with patch.object(processor, "_build_orchestrator", wraps=processor._build_orchestrator) as build:
+        first = processor.run(**sample_valid_spec)
+        variant = {**sample_valid_spec, "description": sample_valid_spec["description"].upper() + "  "}
+        second = processor.run(**variant)
+
+    assert "Évaluation similaire réutilisée" in second
+    assert first in second
+    assert build.call_count == 1
+
+
+def test_processor_contraintes_differentes(mock_anthropic_client, mock_openai_client, sample_valid_spec):
+    """Teste qu'une évaluation n'est pas réutilisée quand seules les contraintes changent"""
+    from pipeline import SpecificationProcessor
+
+    processor = SpecificationProcessor(mock_anthropic_client, mock_openai_client, similarity_index=SimilarityIndex())
+    with patch.object(processor, "_build_orchestrator", wraps=processor._build_orchestrator) as build:
+        processor.run(**sample_valid_spec)
+        variant = {**sample_valid_spec, "constraints": "- Hébergement sur site uniquement"}
+        second = processor.run(**variant)
+
+    assert "Évaluation similaire réutilisée" not in second
+    assert build.call_count == 2
@@ -0,0 +1,174 @@
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+from utils.cache import ResponseCache
+from utils.anthropic_client import AsyncAnthropicClient
+from utils.single_flight import AsyncSingleFlight, SingleFlight, make_flight_key
+
+
+class TestFlightKey(unittest.TestCase):
+    def test_normalisation(self):
+        """Teste que les différences de fins de ligne et d'espaces ne changent pas la clé"""
+        self.assertEqual(
+            make_flight_key("Titre", "Ligne 1\r\nLigne 2  ", ["a", "b"]),
+            make_flight_key("Titre ", "Ligne 1\nLigne 2", "a\nb")
+        )
+        self.assertNotEqual(make_flight_key("Titre", "anthropic"), make_flight_key("Titre", "openai"))
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_appels_regroupes(self):
+        """Teste que des appels simultanés identiques n'exécutent qu'un calcul"""
+        group = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        func = MagicMock(side_effect=lambda: (started.set(), release.wait(), "résultat")[2])
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            leader = pool.submit(group.do, "clé", func)
+            started.wait()
+            followers = [pool.submit(group.do, "clé", func) for _ in range(3)]
+            while group.coalesced < 3:
+                time.sleep(0.01)
+            release.set()
+            results = [leader.result()] + [future.result() for future in followers]
+
+        self.assertEqual(results, ["résultat"] * 4)
+        func.assert_called_once()
+
+    def test_erreur_partagee(self):
+        """Teste que l'erreur du calcul partagé est remontée à tous les appelants"""
+        group = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+
+        def failing():
+            started.set()
+            release.wait()
+            raise ValueError("échec")
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            leader = pool.submit(group.do, "clé", failing)
+            started.wait()
+            follower = pool.submit(group.do, "clé", failing)
+            while group.coalesced < 1:
+                time.sleep(0.01)
+            release.set()
+            for future in (leader, follower):
+                with self.assertRaises(ValueError):
+                    future.result()
+
+    def test_flux_partage(self):
+        """Teste que deux lecteurs du même flux reçoivent les mêmes fragments d'une seule source"""
+        group = SingleFlight()
+        factory = MagicMock(side_effect=lambda: iter(["a", "b", "c"]))
+
+        first = group.stream("clé", factory)
+        self.assertEqual(next(first), "a")
+        second = group.stream("clé", factory)
+
+        self.assertEqual(list(second), ["a", "b", "c"])
+        self.assertEqual(list(first), ["b", "c"])
+        factory.assert_called_once()
+
+    def test_flux_abandonne(self):
+        """Teste que la source est fermée lorsque tous les lecteurs abandonnent"""
+        group = SingleFlight()
+        closed = []
+
+        def source():
+            try:
+                yield "a"
+                yield "b"
+            finally:
+                closed.append(True)
+
+        stream = group.stream("clé", source)
+        next(stream)
+        stream.close()
+
+        self.assertEqual(closed, [True])
+        self.assertEqual(list(group.stream("clé", source)), ["a", "b"])
+
+
+class TestAsyncSingleFlight(unittest.TestCase):
+    def test_appels_regroupes(self):
+        """Teste le regroupement des appels asynchrones simultanés"""
+        group = AsyncSingleFlight()
+        calls = []
+
+        async def compute():
+            calls.append(True)
+            await asyncio.sleep(0.05)
+            return "résultat"
+
+        async def run():
+            return await asyncio.gather(*[group.do("clé", compute) for _ in range(5)])
+
+        self.assertEqual(asyncio.run(run()), ["résultat"] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(group.coalesced, 4)
+
+    def test_flux_partage(self):
+        """Teste qu'un seul flux source alimente tous les lecteurs asynchrones"""
+        group = AsyncSingleFlight()
+        calls = []
+
+        async def source():
+            calls.append(True)
+            for chunk in ("a", "b", "c"):
+                await asyncio.sleep(0.01)
+                yield chunk
+
+        async def read():
+            return [chunk async for chunk in group.stream("clé", source)]
+
+        async def run():
+            return await asyncio.gather(*[read() for _ in range(3)])
+
+        self.assertEqual(asyncio.run(run()), [["a", "b", "c"]] * 3)
+        self.assertEqual(len(calls), 1)
+
+
+@patch.dict("os.environ", {"ANTHROPIC_API_KEY": "test"})
+def test_client_regroupe_les_appels_identiques():
+    """Teste qu'une rafale de requêtes identiques ne produit qu'un appel au fournisseur"""
+    client = AsyncAnthropicClient(cache=ResponseCache())
+    client.client = MagicMock()
+
+    async def create(**kwargs):
+        await asyncio.sleep(0.05)
+        return MagicMock(content=[MagicMock(text="Réponse test")])
+
+    client.client.messages.create = MagicMock(side_effect=create)
+
+    async def run():
+        return await asyncio.gather(*[client.agenerate("Prompt suffisamment long") for _ in range(5)])
+
+    assert asyncio.run(run()) == ["Réponse test"] * 5
+    client.client.messages.create.assert_called_once()
+
+
+def test_processor_regroupe_les_evaluations(mock_anthropic_client, mock_openai_client, sample_valid_spec):
+    """Teste que des évaluations identiques simultanées partagent un seul traitement"""
+    from pipeline import SpecificationProcessor
+
+    processor = SpecificationProcessor(mock_anthropic_client, mock_openai_client)
+    calls = []
+
+    async def aprocess(*args):
+        calls.append(args)
+        await asyncio.sleep(0.05)
+        return "rapport"
+
+    processor._aprocess = aprocess
+
+    async def run():
+        return await asyncio.gather(*[processor.aprocess(**sample_valid_spec) for _ in range(3)])
+
+    assert asyncio.run(run()) == ["rapport"] * 3
+    assert len(calls) == 1
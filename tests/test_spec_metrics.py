@@ -0,0 +1,45 @@
+from unittest.mock import MagicMock
+
+from agents.agent_structuration import Specification, StructurationAgent
+from utils.spec_metrics import analyze, analyze_batch
+
+
+def test_metriques_exactes():
+    metrics = analyze(
+        "Objectif : vendre en ligne. Fonctionnalités : panier, paiement.",
+        ["Temps de réponse < 200ms", "", "Paiement par carte"],
+        "Conformité RGPD\nBudget limité"
+    )
+    assert metrics == {
+        "quality_score": 0.75,
+        "requirements_analysis": {"count": 2, "specificity": True},
+        "constraints_analysis": {"count": 2, "has_legal": True}
+    }
+
+
+def test_lot_identique_aux_analyses_unitaires():
+    """Teste que l'analyse par lot donne exactement les métriques de chaque spécification"""
+    specs = [
+        ("", [], []),
+        ("Description sans notion", ["Exigence"], ["Budget de 10k€"]),
+        ("Objectif, fonctionnalité et contrainte", ["99.9% de disponibilité"], ["Soumis à la loi"]),
+    ] * 50
+
+    assert analyze_batch(specs) == [analyze(*spec) for spec in specs]
+    assert analyze_batch([]) == []
+
+
+def test_prompt_reduit_aux_recommandations():
+    """Teste que le modèle n'est sollicité que pour les recommandations"""
+    client = MagicMock()
+    client.generate.return_value = "- Chiffrer les exigences\n\n* Préciser le budget"
+    agent = StructurationAgent(client=client)
+    spec = Specification("Boutique", "Objectif : vendre", ["Paiement"], ["RGPD"])
+
+    analysis = agent.analyze_specification(spec)
+
+    assert analysis["recommendations"] == ["Chiffrer les exigences", "Préciser le budget"]
+    assert analysis["constraints_analysis"]["has_legal"] is True
+    assert "count" not in client.generate.call_args.args[0]
+    assert agent.analyze_batch([spec]) == [{k: v for k, v in analysis.items() if k != "recommendations"}]
+    client.generate.assert_called_once()
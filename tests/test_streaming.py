@@ -0,0 +1,52 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from utils.cache import ResponseCache
+from utils.openai_client import OpenAIClient
+from utils.anthropic_client import AnthropicClient
+
+def _openai_chunk(text):
+    return MagicMock(choices=[MagicMock(delta=MagicMock(content=text))])
+
+@patch.dict("os.environ", {"OPENAI_API_KEY": "test", "ANTHROPIC_API_KEY": "test"})
+class TestStreaming(unittest.TestCase):
+    def test_openai_generate_stream(self):
+        """Teste le streaming OpenAI et l'enregistrement de la réponse complète en cache"""
+        client = OpenAIClient(cache=ResponseCache())
+        client.client = MagicMock()
+        client.client.chat.completions.create.return_value = iter(
+            [_openai_chunk("Réponse"), _openai_chunk(None), _openai_chunk(" test")]
+        )
+
+        self.assertEqual(list(client.generate_stream("Test prompt")), ["Réponse", " test"])
+        self.assertTrue(client.client.chat.completions.create.call_args.kwargs["stream"])
+
+        # La réponse complète est ensuite servie depuis le cache
+        self.assertEqual(list(client.generate_stream("Test prompt")), ["Réponse test"])
+        self.assertEqual(client.generate("Test prompt"), "Réponse test")
+        client.client.chat.completions.create.assert_called_once()
+
+    def test_anthropic_generate_stream(self):
+        """Teste le streaming Anthropic via messages.stream"""
+        client = AnthropicClient(cache=ResponseCache())
+        client.client = MagicMock()
+        stream = client.client.messages.stream.return_value.__enter__.return_value
+        stream.text_stream = iter(["Réponse", " test"])
+
+        self.assertEqual(list(client.generate_stream("Prompt suffisamment long")), ["Réponse", " test"])
+        self.assertNotIn("system", client.client.messages.stream.call_args.kwargs)
+        self.assertEqual(client.generate("Prompt suffisamment long"), "Réponse test")
+
+    def test_flux_interrompu_non_mis_en_cache(self):
+        """Teste qu'un flux abandonné en cours de route n'est pas mis en cache"""
+        client = OpenAIClient(cache=ResponseCache())
+        client.client = MagicMock()
+        client.client.chat.completions.create.return_value = iter([_openai_chunk("Début"), _openai_chunk(" fin")])
+
+        stream = client.generate_stream("Test prompt")
+        next(stream)
+        stream.close()
+
+        self.assertEqual(client.cache.stats()["memory_entries"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
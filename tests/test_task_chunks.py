@@ -0,0 +1,121 @@
+import asyncio
+import re
+import threading
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+from agents.agent_generation_taches import AgentGenerationTaches, _partition, fusionner_taches
+
+
+def _spec(count):
+    return {"titre": "ERP", "description": "Gestion", "exigences": [f"Exigence {i}" for i in range(count)]}
+
+
+def _reponse(prompt):
+    numeros = re.findall(r"- Exigence (\d+)", prompt)
+    taches = "\n".join(f"- [ ] Implémenter l'exigence {n}" for n in numeros)
+    return f"# Liste des tâches\n## Développement\n{taches}\n## Qualité\n- [ ] Écrire les tests.\n  - [ ] Tests unitaires"
+
+
+def test_partition_equilibree():
+    chunks = _partition(list(range(45)), 20)
+    assert [len(chunk) for chunk in chunks] == [15, 15, 15]
+    assert sum(chunks, []) == list(range(45))
+
+
+def test_fusion_par_categorie():
+    """Teste le regroupement par catégorie et l'élimination des doublons normalisés"""
+    merged = fusionner_taches([
+        "# Liste des tâches\n## Développement\n- [ ] Créer l'API\n## Qualité\n- [ ] Écrire les tests",
+        "# Liste des tâches\n## développement\n- [ ] créer l'API.\n- [ ] Créer le front\n## Déploiement\n- [x] Configurer la CI"
+    ])
+    assert merged == (
+        "# Liste des tâches\n\n## Développement\n- [ ] Créer l'API\n- [ ] Créer le front\n\n"
+        "## Qualité\n- [ ] Écrire les tests\n\n## Déploiement\n- [x] Configurer la CI"
+    )
+
+
+def test_generation_simultanee():
+    """Teste que les parties sont générées simultanément puis fusionnées"""
+    actifs, pic, lock = [0], [0], threading.Lock()
+
+    def generate(prompt):
+        with lock:
+            actifs[0] += 1
+            pic[0] = max(pic[0], actifs[0])
+        time.sleep(0.05)
+        with lock:
+            actifs[0] -= 1
+        return _reponse(prompt)
+
+    client = MagicMock(generate=MagicMock(side_effect=generate))
+    agent = AgentGenerationTaches(client=client, chunk_size=20, max_workers=8)
+
+    taches = agent.generer_taches(_spec(150))
+
+    assert client.generate.call_count == 8
+    assert pic[0] > 1
+    assert taches.count("Implémenter l'exigence") == 150
+    assert taches.count("## Qualité") == 1
+    assert taches.count("Écrire les tests") == 1
+    assert "  - [ ] Tests unitaires" in taches
+
+
+def test_partie_relancee_une_fois():
+    client = MagicMock(generate=MagicMock(side_effect=[_reponse("- Exigence 1"), ConnectionError("panne"), _reponse("- Exigence 7")]))
+    agent = AgentGenerationTaches(client=client, chunk_size=5, max_workers=1)
+
+    taches = agent.generer_taches(_spec(10))
+
+    assert client.generate.call_count == 3
+    assert "Implémenter l'exigence 7" in taches
+    assert "Tâches manquantes" not in taches
+
+
+def test_partie_en_echec_signalee():
+    """Teste qu'une partie sur trois toujours en échec est signalée avec ses exigences"""
+    def generate(prompt):
+        if "- Exigence 5\n" in prompt:
+            raise ConnectionError("panne")
+        return _reponse(prompt)
+
+    client = MagicMock(generate=MagicMock(side_effect=generate))
+    agent = AgentGenerationTaches(client=client, chunk_size=5, max_workers=3)
+
+    taches = agent.generer_taches(_spec(15))
+
+    assert client.generate.call_count == 4
+    assert taches.count("Implémenter l'exigence") == 10
+    assert taches.endswith("## Tâches manquantes\n- Tâches manquantes pour les exigences 6–10 (génération en échec)")
+
+
+def test_petite_specification_en_un_appel():
+    client = MagicMock(generate=MagicMock(return_value="- [ ] Tâche"))
+    assert AgentGenerationTaches(client=client, chunk_size=20).generer_taches(_spec(20)) == "- [ ] Tâche"
+    client.generate.assert_called_once()
+
+
+def test_version_asynchrone():
+    async_client = AsyncMock()
+    async_client.agenerate.side_effect = _reponse
+    agent = AgentGenerationTaches(client=MagicMock(), async_client=async_client, chunk_size=10)
+
+    taches = asyncio.run(agent.agenerer_taches(_spec(35)))
+
+    assert async_client.agenerate.await_count == 4
+    assert taches.count("Implémenter l'exigence") == 35
+
+
+def test_version_asynchrone_partie_en_echec():
+    async def agenerate(prompt):
+        if "- Exigence 0\n" in prompt:
+            raise ConnectionError("panne")
+        return _reponse(prompt)
+
+    async_client = AsyncMock(agenerate=AsyncMock(side_effect=agenerate))
+    agent = AgentGenerationTaches(client=MagicMock(), async_client=async_client, chunk_size=5)
+
+    taches = asyncio.run(agent.agenerer_taches(_spec(15)))
+
+    assert async_client.agenerate.await_count == 4
+    assert taches.endswith("- Tâches manquantes pour les exigences 1–5 (génération en échec)")
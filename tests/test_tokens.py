@@ -0,0 +1,77 @@
+import pytest
+from unittest.mock import patch
+from utils.tokens import PRICING, TokenCounter, compute_cost, count_tokens, count_tokens_batch
+from utils.anthropic_client import AnthropicClient
+
+def test_count_tokens_texte_vide():
+    assert count_tokens("") == 0
+    assert count_tokens(None) == 0
+
+def test_count_tokens_francais_plus_couteux_que_les_mots():
+    texte = "Le temps de réponse doit être inférieur à 200ms pour 95% des requêtes."
+    assert count_tokens(texte) > len(texte.split())
+
+def test_count_tokens_nombres_par_groupes_de_trois_chiffres():
+    assert count_tokens("1234567") == 3
+
+def test_count_tokens_batch_coherent():
+    textes = ["Exigence de performance", "", "Conformité RGPD obligatoire"]
+    assert count_tokens_batch(textes) == [count_tokens(texte) for texte in textes]
+
+def test_count_messages_inclut_l_enveloppe():
+    counter = TokenCounter("gpt-4o-mini")
+    assert counter.count_messages("Bonjour", "Système") > counter.count("Bonjour") + counter.count("Système")
+
+def test_compute_cost():
+    input_price, output_price = PRICING["gpt-4o"]
+    assert compute_cost("gpt-4o", 1_000_000, 1_000_000) == pytest.approx(input_price + output_price)
+    with pytest.raises(ValueError):
+        compute_cost("modele-inconnu", 1, 1)
+
+@patch.dict("os.environ", {"ANTHROPIC_API_KEY": "test"})
+def test_anthropic_estimate_cost():
+    client = AnthropicClient()
+    prompt = "Évalue cette spécification technique détaillée."
+    input_tokens = client.count_tokens(prompt)
+
+    cost = client.estimate_cost(prompt, expected_output_tokens=100)
+
+    assert cost == pytest.approx(compute_cost(client.default_model, input_tokens, 100))
+    assert client.estimate_cost(prompt) > cost
+
+# Corpus de calibration : exigences représentatives en français et en anglais
+CALIBRATION_CORPUS = {
+    "fr": [
+        "Le système doit répondre en moins de 200 ms pour 95 % des requêtes et chiffrer les données des utilisateurs au repos.",
+        "L'application permettra aux utilisateurs de gérer leurs réservations, de recevoir des notifications et de consulter l'historique de leurs paiements.",
+        "Les données personnelles sont conservées trois ans au maximum, conformément au RGPD.",
+    ],
+    "en": [
+        "The system must respond within 200 ms for 95% of requests and store user data encrypted at rest.",
+        "Users can create projects, invite collaborators, and export reports as PDF or CSV files from the dashboard.",
+        "Personal data is kept for at most three years, in compliance with the GDPR.",
+    ],
+}
+
+# Caractères par token observés avec o200k_base sur des textes courants
+CHARS_PER_TOKEN = {"fr": (3.0, 4.6), "en": (3.5, 5.0)}
+
+@pytest.mark.parametrize("langue", sorted(CALIBRATION_CORPUS))
+def test_estimation_calibree_en_caracteres_par_token(langue):
+    counter = TokenCounter("claude-3-5-sonnet-20241022")
+    assert not counter.exact
+    low, high = CHARS_PER_TOKEN[langue]
+    for texte in CALIBRATION_CORPUS[langue]:
+        assert low <= len(texte) / counter.count(texte) <= high, texte
+
+@pytest.mark.parametrize("langue", sorted(CALIBRATION_CORPUS))
+def test_estimation_proche_de_tiktoken(langue):
+    tiktoken = pytest.importorskip("tiktoken")
+    try:
+        encoding = tiktoken.get_encoding("o200k_base")
+    except Exception:
+        pytest.skip("encodage o200k_base indisponible")
+    counter = TokenCounter("claude-3-5-sonnet-20241022")
+    for texte in CALIBRATION_CORPUS[langue]:
+        exact = len(encoding.encode_ordinary(texte))
+        assert counter.count(texte) == pytest.approx(exact, rel=0.15), texte